@@ -1,14 +1,41 @@
 from flask import Flask
 from .config import Config
+from .json_provider import FastJSONProvider
+from .uploads import UploadRequest
+
+class EcoBiteFlask(Flask):
+    json_provider_class = FastJSONProvider
+    request_class = UploadRequest
+
+    def send_static_file(self, filename):
+        from . import assets
+        return assets.send_asset(self, filename)
 
 def create_app(config_class=Config):
-    app = Flask(__name__, template_folder="../templates", static_folder="../static")
+    app = EcoBiteFlask(__name__, template_folder="../templates", static_folder="../static")
     app.config.from_object(config_class)
 
     # Initialize Database
     from . import db
     db.init_app(app)
 
+    # Opt-in SQL Tracing
+    from . import sqltrace
+    sqltrace.init_app(app)
+
+    # Initialize Caches
+    from . import cache
+    cache.init_app(app)
+
+    # Initialize Feed Event Stream
+    from . import events
+    events.init_app(app)
+
+    # Initialize Upload Storage and Image Workers
+    from . import storage, images
+    storage.init_app(app)
+    images.init_app(app)
+
     # Register Blueprints
     from .blueprints import auth, main, posts, claims, api
     app.register_blueprint(auth.bp)
@@ -17,4 +44,20 @@ def create_app(config_class=Config):
     app.register_blueprint(claims.bp)
     app.register_blueprint(api.bp)
 
+    # Compress Responses
+    from . import compression
+    compression.init_app(app)
+
+    # Fingerprint Static Assets
+    from . import assets
+    assets.init_app(app)
+
+    # Template Caches
+    from . import templating
+    templating.init_app(app)
+
+    # Start Background Jobs
+    from . import jobs
+    jobs.init_app(app)
+
     return app
@@ -0,0 +1,112 @@
+import hashlib
+import json
+import os
+
+from flask import current_app, url_for
+from markupsafe import Markup
+
+from app.compression import SUFFIXES, send_static
+
+HASH_LENGTH = 12
+
+def fingerprint(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(64 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:HASH_LENGTH]
+
+def build_manifest(folder, exclude=()):
+    """
+    Maps every static file (relative path, forward slashes) to a name with its
+    content hash before the extension: "js/app.js" -> "js/app.3f2a1b9c8d7e.js".
+    Directories in `exclude` (e.g. uploads) and pre-compressed copies are skipped.
+    """
+    manifest = {}
+    for root, dirs, files in os.walk(folder):
+        rel_root = os.path.relpath(root, folder).replace(os.sep, "/")
+        if rel_root == ".":
+            dirs[:] = [d for d in dirs if d not in exclude]
+            rel_root = ""
+        for name in files:
+            if name.endswith(tuple(SUFFIXES.values())):
+                continue
+            stem, ext = os.path.splitext(name)
+            rel = f"{rel_root}/{name}" if rel_root else name
+            hashed = f"{stem}.{fingerprint(os.path.join(root, name))}{ext}"
+            manifest[rel] = f"{rel_root}/{hashed}" if rel_root else hashed
+    return manifest
+
+
+class AssetManifest:
+    """
+    Fingerprinted static file names, computed once at startup.
+    A fingerprinted URL never changes meaning, so it can be cached forever.
+    """
+
+    def __init__(self, manifest):
+        self.manifest = manifest
+        self.originals = {hashed: name for name, hashed in manifest.items()}
+
+    def resolve(self, filename):
+        """Returns the real file behind a fingerprinted name, or None."""
+        return self.originals.get(filename)
+
+
+def get_manifest(app=None):
+    app = app or current_app
+    # In debug, files change under a running server; plain URLs avoid stale fingerprints.
+    if app.debug:
+        return None
+    return app.extensions.get('assets')
+
+def asset_url(filename):
+    """
+    Template helper: url_for('static', ...) with the fingerprinted file name.
+    """
+    manifest = get_manifest()
+    if manifest is not None:
+        filename = manifest.manifest.get(filename, filename)
+    return url_for('static', filename=filename)
+
+def asset_importmap():
+    """
+    Template helper: an import map sending the plain URL of every JS module
+    to its fingerprinted one, so relative imports inside modules (e.g.
+    app.js importing './api.js') get cache-forever URLs too.
+    Must come before the first <script type="module">.
+    """
+    manifest = get_manifest()
+    if manifest is None:
+        return ""
+    imports = {
+        url_for('static', filename=name): url_for('static', filename=hashed)
+        for name, hashed in manifest.manifest.items() if name.endswith(".js")
+    }
+    # "</" can't appear in the JSON; escape it anyway for safety inside <script>.
+    body = json.dumps({"imports": imports}).replace("</", "<\\/")
+    return Markup(f'<script type="importmap">{body}</script>')
+
+def send_asset(app, filename):
+    """
+    Serves a static file. Fingerprinted names are mapped back to the real file
+    and marked immutable; plain names keep the default revalidation.
+    """
+    manifest = get_manifest(app)
+    original = manifest.resolve(filename) if manifest is not None else None
+    response = send_static(app, original or filename)
+    if original:
+        response.headers["Cache-Control"] = f"public, max-age={app.config['ASSET_MAX_AGE']}, immutable"
+    return response
+
+def init_app(app):
+    app.add_template_global(asset_url)
+    app.add_template_global(asset_importmap)
+    if not app.config['ASSETS_FINGERPRINT'] or not app.static_folder:
+        return
+    try:
+        manifest = build_manifest(app.static_folder, exclude=("uploads",))
+    except OSError as e:
+        print(f"❌ Asset manifest failed: {e}")
+        return
+    app.extensions['assets'] = AssetManifest(manifest)
@@ -1,13 +1,30 @@
-from flask import Blueprint, jsonify, request, session, current_app
+from flask import Blueprint, jsonify, request, session, current_app, Response
 from datetime import datetime
-import os
 import json
-from app.db import get_cursor, get_db
-from app.utils import require_login, dict_rows
+from app.db import get_cursor, get_db, get_pool
+from app.utils import require_login, dict_rows, parse_tags, save_post_tags, batch_load, stream_rows, lock_post_of_claim
+from app.feed import feed_filters, cached_feed_page, page_size, InvalidCursor, SORTS
+from app.fields import (POST_FIELDS, MY_CLAIM_FIELDS, INCOMING_CLAIM_FIELDS, InvalidFields,
+                        requested_fields, select_list, wants_columnar, columnar)
+from app.cache import get_feed_cache, get_user_stats_cache, invalidate_feed, invalidate_user_stats
+from app import stats as impact
+from app import events
+from app import images
+from app.storage import get_storage
+from app.uploads import InvalidUpload
+from werkzeug.exceptions import RequestEntityTooLarge
+from app.changelog import log_change, changes_since, current_version
+from app.conditional import conditional_get, touch
 
 bp = Blueprint('api', __name__, url_prefix='/api')
 
+@bp.errorhandler(InvalidUpload)
+@bp.errorhandler(RequestEntityTooLarge)
+def api_upload_rejected(e):
+    return jsonify({"error": e.description}), e.code
+
 @bp.route("/food-posts", methods=["GET", "POST"])
+@conditional_get("posts")
 def api_food_posts():
     cur = get_cursor()
     if not cur: return jsonify({"error": "Database error"}), 500
@@ -46,18 +63,17 @@ def api_food_posts():
             
             # Handle Image Upload
             image_file = request.files.get("image") or request.files.get("photo")
-            image_url = None
-            if image_file and image_file.filename:
+            image_key = image_url = None
+            # A blank file input still sends an empty part; its spool has no format.
+            if image_file and image_file.filename and image_file.stream.ext:
                 try:
-                    ext = os.path.splitext(image_file.filename)[1].lower()
-                    if ext in [".jpg", ".jpeg", ".png", ".webp"]:
-                        filename = f"{session['user_id']}_{int(datetime.now().timestamp())}{ext}"
-                        upload_path = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
-                        os.makedirs(os.path.dirname(upload_path), exist_ok=True)
-                        image_file.save(upload_path)
-                        image_url = f"/static/uploads/{filename}"
+                    # The format was checked from the file's first bytes while it was parsed (app/uploads.py).
+                    storage = get_storage()
+                    image_key = storage.save(image_file.stream, image_file.stream.ext)
+                    image_url = storage.url(image_key)
                 except Exception as e:
                     print(f"❌ Image upload error: {e}")
+                    image_key = image_url = None
 
             # Estimate weight if not provided
             if not weight:
@@ -78,9 +94,17 @@ def api_food_posts():
                 session["user_id"], title, desc, category, quantity, 
                 weight, dietary_json, location, pickup_start, pickup_end, expires_at, image_url
             ))
-            conn.commit()
-            
             post_id = cur.lastrowid
+            save_post_tags(cur, post_id, parse_tags(dietary))
+            impact.record_post_created(cur)
+            log_change(cur, post_id, "insert")
+            conn.commit()
+            invalidate_feed()
+            invalidate_user_stats(session["user_id"])
+            if image_key:
+                # Resized variants replace the original in the background.
+                images.submit(post_id, image_key)
+
             cur.execute("SELECT * FROM posts WHERE id=?", (post_id,))
             new_post = dict_rows(cur.fetchall(), cur.description)[0]
             return jsonify(new_post), 201
@@ -89,45 +113,22 @@ def api_food_posts():
             conn.rollback()
             return jsonify({"error": str(e)}), 500
 
-    # GET - List posts
+    # GET - List posts, one keyset page at a time
     try:
-        status_filter = request.args.get("status", "available")
-        search = request.args.get("search", "").strip()
-        cat_filter = request.args.get("type", "All Types")
-        diet_filter = request.args.get("dietary", "")
-        sort_order = request.args.get("sort", "newest")
-
-        query = "SELECT p.*, u.email as owner_email FROM posts p JOIN users u ON p.user_id=u.id WHERE 1=1"
-        params = []
-
-        if status_filter == "available":
-            query += " AND p.status='active' AND (p.expires_at IS NULL OR p.expires_at > NOW())"
-        elif status_filter == "claimed":
-            query += " AND p.status='claimed'"
-        elif status_filter == "expired":
-            query += " AND (p.status='expired' OR p.expires_at <= NOW())"
-
-        if search:
-            query += " AND (p.title LIKE ? OR p.description LIKE ?)"
-            params.extend([f"%{search}%", f"%{search}%"])
-
-        if cat_filter and cat_filter.lower() != "all types" and cat_filter.lower() != "all":
-            query += " AND p.category = ?"
-            params.append(cat_filter)
-
-        if diet_filter:
-            query += " AND p.dietary_json LIKE ?"
-            params.append(f"%{diet_filter}%")
-
-        if sort_order == "endingSoon":
-            query += " ORDER BY p.expires_at ASC"
-        else: # newest
-            query += " ORDER BY p.created_at DESC"
-
-        cur.execute(query, tuple(params))
-        posts = dict_rows(cur.fetchall(), cur.description)
-        return jsonify(posts)
-
+        filters = feed_filters(request.args)
+        limit = page_size(request.args.get("limit"), current_app.config['FEED_PAGE_SIZE'], current_app.config['FEED_MAX_PAGE_SIZE'])
+        # The cursor is built from the sort column and id, so those are always selected.
+        fields = requested_fields(request.args, POST_FIELDS, required=("id", SORTS[filters["sort"]][0]))
+        posts, next_cursor = cached_feed_page(cur, filters, request.args.get("cursor"), limit,
+                                              columns=select_list(fields, POST_FIELDS))
+        if wants_columnar(request.args):
+            if filters["sort"] == "relevance":
+                fields.append("relevance")
+            return jsonify(dict(columnar(posts, fields), next=next_cursor))
+        return jsonify({"items": posts, "next": next_cursor})
+
+    except (InvalidCursor, InvalidFields) as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -135,31 +136,55 @@ def api_food_posts():
 def api_my_posts():
     need = require_login()
     if need: return jsonify({"error": "Unauthorized"}), 401
-    cur = get_cursor()
+    cur = get_cursor(buffered=False)
     if not cur: return jsonify({"error": "Database error"}), 500
 
     try:
+        # Claim counts come from the same statement so the rows can stream.
         cur.execute("""
-            SELECT * FROM posts WHERE user_id=? ORDER BY created_at DESC
+            SELECT p.*,
+                COUNT(CASE WHEN c.status='pending' THEN 1 END) as claims_pending,
+                COUNT(CASE WHEN c.status='approved' THEN 1 END) as claims_accepted,
+                COUNT(CASE WHEN c.status='rejected' THEN 1 END) as claims_rejected
+            FROM posts p LEFT JOIN claims c ON c.post_id=p.id
+            WHERE p.user_id=?
+            GROUP BY p.id
+            ORDER BY p.created_at DESC
         """, (session["user_id"],))
-        posts = dict_rows(cur.fetchall(), cur.description)
 
-        for p in posts:
-            cur.execute("""
-                SELECT 
-                    COUNT(CASE WHEN status='pending' THEN 1 END) as pending,
-                    COUNT(CASE WHEN status='approved' THEN 1 END) as accepted,
-                    COUNT(CASE WHEN status='rejected' THEN 1 END) as rejected
-                FROM claims WHERE post_id=?
-            """, (p['id'],))
-            counts = dict_rows(cur.fetchall(), cur.description)[0]
-            p['claims_summary'] = counts
-            
-        return jsonify(posts)
+        def with_summary(p):
+            p['claims_summary'] = {
+                "pending": p.pop('claims_pending'),
+                "accepted": p.pop('claims_accepted'),
+                "rejected": p.pop('claims_rejected'),
+            }
+            return p
+
+        return stream_rows(cur, with_summary)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@bp.get("/food-posts/changes")
+def api_post_changes():
+    """
+    Delta sync: posts inserted, updated or removed since a version from a previous call.
+    Without `since`, or when it has been compacted away, answers {"resync": true}
+    with the current version to continue from after a full fetch.
+    """
+    cur = get_cursor()
+    if not cur: return jsonify({"error": "Database error"}), 500
+    try:
+        since = request.args.get("since", type=int)
+        limit = page_size(request.args.get("limit"), 500, 1000)
+        delta = changes_since(cur, since, limit) if since is not None else None
+        if delta is None:
+            return jsonify({"resync": True, "version": current_version(cur)})
+        return jsonify(delta)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @bp.get("/food-posts/<int:id>")
+@conditional_get("posts", "claims", per_user=True)
 def api_get_post(id):
     cur = get_cursor()
     if not cur: return jsonify({"error": "Database error"}), 500
@@ -170,12 +195,12 @@ def api_get_post(id):
         post = dict_rows(rows, cur.description)[0]
 
         if "user_id" in session and session["user_id"] == post["user_id"]:
-            cur.execute("""
-                SELECT c.*, u.email as claimer_email 
-                FROM claims c JOIN users u ON c.claimer_id=u.id 
-                WHERE c.post_id=?
-            """, (id,))
-            post["claims"] = dict_rows(cur.fetchall(), cur.description)
+            claims = batch_load(cur, """
+                SELECT c.*, u.email as claimer_email
+                FROM claims c JOIN users u ON c.claimer_id=u.id
+                WHERE c.post_id IN ({ids})
+            """, [id], "post_id", many=True)
+            post["claims"] = claims.get(id, [])
         
         return jsonify(post)
     except Exception as e:
@@ -185,22 +210,27 @@ def api_get_post(id):
 def api_update_post_status(id):
     need = require_login()
     if need: return jsonify({"error": "Unauthorized"}), 401
-    conn = get_db()
-    cur = get_cursor()
-    if not cur: return jsonify({"error": "Database error"}), 500
-    
     data = request.get_json() or {}
     new_status = data.get("status")
     if not new_status: return jsonify({"error": "Status required"}), 400
+    if new_status not in impact.POST_STATUSES: return jsonify({"error": "Invalid status"}), 400
+
+    conn = get_db()
+    cur = get_cursor()
+    if not cur: return jsonify({"error": "Database error"}), 500
 
     try:
-        cur.execute("SELECT user_id FROM posts WHERE id=?", (id,))
+        cur.execute("SELECT user_id, status, estimated_weight_kg FROM posts WHERE id=? FOR UPDATE", (id,))
         row = cur.fetchone()
         if not row: return jsonify({"error": "Post not found"}), 404
         if row[0] != session["user_id"]: return jsonify({"error": "Forbidden"}), 403
 
         cur.execute("UPDATE posts SET status=? WHERE id=?", (new_status, id))
+        impact.record_transition(cur, row[1], new_status, row[2])
+        log_change(cur, id, "update")
         conn.commit()
+        invalidate_feed()
+        invalidate_user_stats(session["user_id"])
         return jsonify({"success": True, "status": new_status})
     except Exception as e:
         conn.rollback()
@@ -232,7 +262,9 @@ def api_create_claim(id):
             INSERT INTO claims (post_id, claimer_id, message, requested_quantity, status, created_at)
             VALUES (?, ?, ?, ?, 'pending', NOW())
         """, (id, session["user_id"], msg, req_qty))
+        touch(cur, "claims")
         conn.commit()
+        invalidate_user_stats(session["user_id"])
         
         claim_id = cur.lastrowid
         cur.execute("SELECT * FROM claims WHERE id=?", (claim_id,))
@@ -244,42 +276,48 @@ def api_create_claim(id):
         return jsonify({"error": str(e)}), 500
 
 @bp.get("/claims/mine")
+@conditional_get("posts", "claims", per_user=True)
 def api_my_claims():
     need = require_login()
     if need: return jsonify({"error": "Unauthorized"}), 401
-    cur = get_cursor()
+    cur = get_cursor(buffered=False)
     if not cur: return jsonify({"error": "Database error"}), 500
     try:
-        cur.execute("""
-            SELECT c.*, p.title as post_title, p.location, p.expires_at, u.email as owner_email
+        fields = requested_fields(request.args, MY_CLAIM_FIELDS)
+        cur.execute(f"""
+            SELECT {select_list(fields, MY_CLAIM_FIELDS)}
             FROM claims c
             JOIN posts p ON c.post_id=p.id
             JOIN users u ON p.user_id=u.id
             WHERE c.claimer_id=?
             ORDER BY c.created_at DESC
         """, (session["user_id"],))
-        claims = dict_rows(cur.fetchall(), cur.description)
-        return jsonify(claims)
+        return stream_rows(cur, columnar=wants_columnar(request.args))
+    except InvalidFields as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @bp.get("/claims/for-my-posts")
+@conditional_get("posts", "claims", per_user=True)
 def api_incoming_claims():
     need = require_login()
     if need: return jsonify({"error": "Unauthorized"}), 401
-    cur = get_cursor()
+    cur = get_cursor(buffered=False)
     if not cur: return jsonify({"error": "Database error"}), 500
     try:
-        cur.execute("""
-            SELECT c.*, p.title as post_title, u.email as claimer_email, u.id as claimer_id
+        fields = requested_fields(request.args, INCOMING_CLAIM_FIELDS)
+        cur.execute(f"""
+            SELECT {select_list(fields, INCOMING_CLAIM_FIELDS)}
             FROM claims c
             JOIN posts p ON c.post_id=p.id
             JOIN users u ON c.claimer_id=u.id
             WHERE p.user_id=?
             ORDER BY c.created_at DESC
         """, (session["user_id"],))
-        claims = dict_rows(cur.fetchall(), cur.description)
-        return jsonify(claims)
+        return stream_rows(cur, columnar=wants_columnar(request.args))
+    except InvalidFields as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -296,19 +334,22 @@ def api_update_claim(id):
     if action not in ["accepted", "rejected"]: return jsonify({"error": "Invalid status"}), 400
 
     try:
+        if lock_post_of_claim(cur, id) is None: return jsonify({"error": "Claim not found"}), 404
         cur.execute("""
-            SELECT c.post_id, p.user_id, c.requested_quantity, p.quantity
+            SELECT c.post_id, p.user_id, c.requested_quantity, p.quantity, p.status, p.estimated_weight_kg, c.claimer_id
             FROM claims c JOIN posts p ON c.post_id=p.id
             WHERE c.id=?
+            FOR UPDATE
         """, (id,))
         row = cur.fetchone()
         if not row: return jsonify({"error": "Claim not found"}), 404
-        post_id, owner_id, req_qty, post_qty = row
+        post_id, owner_id, req_qty, post_qty, post_status, post_weight, claimer_id = row
         
         if owner_id != session["user_id"]: return jsonify({"error": "Forbidden"}), 403
 
         new_status = "approved" if action == "accepted" else "rejected"
-        
+        post_changed = False
+
         cur.execute("UPDATE claims SET status=?, decided_at=NOW() WHERE id=?", (new_status, id))
         
         if new_status == "approved":
@@ -316,15 +357,27 @@ def api_update_claim(id):
                 p_q = float(str(post_qty).split()[0]) 
                 r_q = float(str(req_qty).split()[0])
                 rem_q = max(0, p_q - r_q)
-                
-                if rem_q <= 0:
-                    cur.execute("UPDATE posts SET status='claimed', quantity='0' WHERE id=?", (post_id,))
-                else:
-                    cur.execute("UPDATE posts SET quantity=? WHERE id=?", (str(rem_q), post_id))
-            except:
+            except (ValueError, IndexError):
+                # Free-text quantities can't be subtracted; the post is left as it is.
+                rem_q = None
+
+            # Database errors here must reach the rollback below, or the counters drift.
+            if rem_q is None:
                 pass
+            elif rem_q <= 0:
+                cur.execute("UPDATE posts SET status='claimed', quantity='0' WHERE id=?", (post_id,))
+                impact.record_transition(cur, post_status, "claimed", post_weight)
+                post_changed = True
+            else:
+                cur.execute("UPDATE posts SET quantity=? WHERE id=?", (str(rem_q), post_id))
+                post_changed = True
+        if post_changed:
+            log_change(cur, post_id, "update")
+        touch(cur, "claims")
 
         conn.commit()
+        invalidate_feed()
+        invalidate_user_stats(owner_id, claimer_id)
         return jsonify({"success": True, "status": new_status})
     except Exception as e:
         conn.rollback()
@@ -345,27 +398,20 @@ def api_cancel_claim(id):
         if row[0] != session["user_id"]: return jsonify({"error": "Forbidden"}), 403
 
         cur.execute("UPDATE claims SET status='cancelled' WHERE id=?", (id,))
+        touch(cur, "claims")
         conn.commit()
+        invalidate_user_stats(session["user_id"])
         return jsonify({"success": True})
     except Exception as e:
         conn.rollback()
         return jsonify({"error": str(e)}), 500
 
 @bp.get("/stats/global")
+@conditional_get("stats")
 def api_stats_global():
-    cur = get_cursor()
-    if not cur: return jsonify({"error": "Database error"}), 500
     try:
-        stats = {}
-        cur.execute("SELECT COUNT(*) FROM posts WHERE status='active' AND (expires_at IS NULL OR expires_at > NOW())")
-        stats["available_now"] = cur.fetchone()[0]
-        cur.execute("SELECT COUNT(*) FROM posts WHERE status IN ('claimed', 'completed')")
-        stats["successfully_shared"] = cur.fetchone()[0]
-        cur.execute("SELECT COUNT(*) FROM posts")
-        stats["total_posts"] = cur.fetchone()[0]
-        cur.execute("SELECT SUM(estimated_weight_kg) FROM posts WHERE status IN ('claimed', 'completed')")
-        weight = cur.fetchone()[0]
-        stats["food_waste_prevented_kg"] = float(weight) if weight else 0.0
+        stats = impact.global_stats()
+        if stats is None: return jsonify({"error": "Database error"}), 500
         return jsonify(stats)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -374,28 +420,36 @@ def api_stats_global():
 def api_stats_me():
     need = require_login()
     if need: return jsonify({"error": "Unauthorized"}), 401
-    cur = get_cursor()
-    if not cur: return jsonify({"error": "Database error"}), 500
-    
-    uid = session["user_id"]
     try:
-        stats = {}
-        cur.execute("SELECT COUNT(*) FROM posts WHERE user_id=?", (uid,))
-        stats["posts_created"] = cur.fetchone()[0]
-        cur.execute("SELECT COUNT(*) FROM posts WHERE user_id=? AND status IN ('claimed', 'completed')", (uid,))
-        stats["posts_shared"] = cur.fetchone()[0]
-        cur.execute("SELECT SUM(estimated_weight_kg) FROM posts WHERE user_id=? AND status IN ('claimed', 'completed')", (uid,))
-        weight = cur.fetchone()[0]
-        stats["weight_shared_kg"] = float(weight) if weight else 0.0
-        cur.execute("SELECT COUNT(*) FROM claims WHERE claimer_id=?", (uid,))
-        stats["claims_made"] = cur.fetchone()[0]
-        cur.execute("SELECT COUNT(*) FROM claims WHERE claimer_id=? AND status='approved'", (uid,))
-        stats["claims_accepted"] = cur.fetchone()[0]
-        cur.execute("SELECT COUNT(*) FROM claims WHERE claimer_id=? AND status='rejected'", (uid,))
-        stats["claims_rejected"] = cur.fetchone()[0]
-        cur.execute("SELECT created_at FROM users WHERE id=?", (uid,))
-        row = cur.fetchone()
-        stats["join_date"] = row[0] if row else None
+        stats = impact.user_stats(session["user_id"])
+        if stats is None: return jsonify({"error": "Database error"}), 500
+        stats = {k: stats[k] for k in ("posts_created", "posts_shared", "weight_shared_kg",
+                                       "claims_made", "claims_accepted", "claims_rejected", "join_date")}
         return jsonify(stats)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
+
+@bp.get("/stream")
+def api_stream():
+    """
+    Server-Sent Events stream of feed changes: post-created, post-claimed,
+    post-expired, post-updated and stats-changed. Holds no database connection.
+    """
+    last_event_id = request.headers.get("Last-Event-ID") or request.args.get("lastEventId")
+    return Response(
+        events.get_broker().stream(last_event_id),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@bp.get("/health/db")
+def api_db_health():
+    return jsonify({"pool": get_pool().stats()})
+
+@bp.get("/health/cache")
+def api_cache_health():
+    return jsonify({"feed": get_feed_cache().stats(), "user_stats": get_user_stats_cache().stats()})
+
+@bp.get("/health/events")
+def api_events_health():
+    return jsonify(events.get_broker().stats())
@@ -1,6 +1,11 @@
 from flask import Blueprint, render_template, request, redirect, url_for, session, flash
 from app.db import get_cursor, get_db
-from app.utils import require_login, dict_rows
+from app.cache import invalidate_feed, invalidate_user_stats
+from app import stats as impact
+from app.changelog import log_change
+from app.conditional import touch
+from app.utils import require_login, dict_rows, lock_post_of_claim
+from datetime import datetime
 import mariadb
 
 bp = Blueprint('claims', __name__)
@@ -16,17 +21,20 @@ def claim_post(post_id):
         flash("Database connection error. Please try again.","error")
         return redirect(url_for("main.home"))
     try:
-        cur.execute("SELECT user_id,status FROM posts WHERE id=?", (post_id,))
+        cur.execute("SELECT user_id,status,expires_at FROM posts WHERE id=?", (post_id,))
         row = cur.fetchone()
         if not row: flash("Post not found.","error"); return redirect(url_for("main.home"))
         if row[0]==session["user_id"]: flash("You cannot claim your own post.","error"); return redirect(url_for("main.home"))
-        if row[1]!="active": flash("Post is not available.","error"); return redirect(url_for("main.home"))
+        # Overdue posts may not have been swept to 'expired' yet.
+        if row[1]!="active" or (row[2] and row[2] <= datetime.now()): flash("Post is not available.","error"); return redirect(url_for("main.home"))
 
         cur.execute("""
             INSERT INTO claims (post_id, claimer_id, message)
             VALUES (?, ?, ?)
         """,(post_id, session["user_id"], message or None))
+        touch(cur, "claims")
         conn.commit()
+        invalidate_user_stats(session["user_id"])
         flash("Request sent to owner!","success")
     except mariadb.IntegrityError:
         conn.rollback()
@@ -48,14 +56,16 @@ def update_claim_status(claim_id, action):
         flash("Database connection error. Please try again.","error")
         return redirect(url_for("posts.myposts"))
     try:
+        if lock_post_of_claim(cur, claim_id) is None: flash("Claim not found.","error"); return redirect(url_for("posts.myposts"))
         cur.execute("""
-            SELECT c.post_id,p.user_id
+            SELECT c.post_id,p.user_id,p.status,p.estimated_weight_kg,c.claimer_id
             FROM claims c JOIN posts p ON c.post_id=p.id
             WHERE c.id=?
+            FOR UPDATE
         """,(claim_id,))
         claim = cur.fetchone()
         if not claim: flash("Claim not found.","error"); return redirect(url_for("posts.myposts"))
-        post_id, owner_id = claim
+        post_id, owner_id, post_status, post_weight, claimer_id = claim
         if owner_id != session["user_id"]:
             flash("You are not authorized.","error")
             return redirect(url_for("posts.myposts"))
@@ -66,7 +76,12 @@ def update_claim_status(claim_id, action):
         
         if new_status=="approved":
             cur.execute("UPDATE posts SET status='claimed' WHERE id=?", (post_id,))
+            impact.record_transition(cur, post_status, "claimed", post_weight)
+            log_change(cur, post_id, "update")
+        touch(cur, "claims")
         conn.commit()
+        invalidate_feed()
+        invalidate_user_stats(owner_id, claimer_id)
         flash(f"Claim {new_status}.","success")
     except Exception as e:
         conn.rollback()
@@ -1,6 +1,8 @@
-from flask import Blueprint, render_template, redirect, url_for, session, flash
+from flask import Blueprint, render_template, stream_template, redirect, url_for, session, flash, current_app
 from app.db import get_cursor
 from app.utils import require_login, compute_stats, dict_rows
+from app.feed import feed_filters, FeedStream
+from app.stats import user_stats
 
 bp = Blueprint('main', __name__)
 
@@ -14,27 +16,22 @@ def landing():
 @bp.route("/home")
 def home():
     if "user_id" not in session: return redirect(url_for("auth.login"))
-    cur = get_cursor()
+    # Stats first: once the feed query starts, the connection is busy until the page is read.
+    stats = compute_stats()
+    cur = get_cursor(buffered=False)
     posts = []
     if cur:
-        try:
-            cur.execute("""
-                SELECT p.id,p.description,p.category,p.quantity,p.status,p.location,
-                       p.expires_at,u.email AS owner_email
-                FROM posts p
-                JOIN users u ON p.user_id=u.id
-                WHERE p.status='active' AND (p.expires_at IS NULL OR p.expires_at > NOW())
-                ORDER BY p.created_at DESC
-            """)
-            posts = dict_rows(cur.fetchall(), cur.description)
-        except Exception as e:
-            print("❌ Feed error:", e); posts=[]
-    stats = compute_stats()
-    return render_template("index.html", posts=posts, stats=stats, email=session.get("email"))
+        posts = FeedStream(cur, feed_filters({}), limit=current_app.config['FEED_PAGE_SIZE'], columns="""
+            p.id,p.title,p.description,p.category,p.quantity,p.status,p.location,
+            p.image_url,p.image_thumb_url,p.expires_at,p.created_at,u.email AS owner_email
+        """)
+    # Streaming sends the shell and stats before the feed is read; cards follow as rows arrive.
+    render = stream_template if current_app.config['STREAM_HTML'] else render_template
+    return render("index.html", posts=posts, stats=stats, email=session.get("email"))
 
 @bp.route("/profile")
 def profile():
     need = require_login(); 
     if need: return need
-    stats = compute_stats(session["user_id"])
+    stats = user_stats(session["user_id"]) or {}
     return render_template("profile.html", stats=stats)
@@ -2,7 +2,10 @@ from flask import Blueprint, render_template, request, redirect, url_for, sessio
 from datetime import datetime, timedelta
 import json
 from app.db import get_cursor, get_db
-from app.utils import require_login, compute_stats, dict_rows
+from app.cache import invalidate_feed, invalidate_user_stats
+from app import stats as impact
+from app.changelog import log_change
+from app.utils import require_login, compute_stats, dict_rows, parse_tags, save_post_tags
 
 bp = Blueprint('posts', __name__)
 
@@ -42,7 +45,13 @@ def create():
                 INSERT INTO posts (user_id,description,category,quantity,dietary_json,location,expiry_minutes,expires_at,status)
                 VALUES (?,?,?,?,?,?,?,?,'active')
             """, (session["user_id"],desc,category,qty or None,dietary_json,location,expiry_minutes,expiry_dt))
+            post_id = cur.lastrowid
+            save_post_tags(cur, post_id, parse_tags(diets))
+            impact.record_post_created(cur)
+            log_change(cur, post_id, "insert")
             conn.commit()
+            invalidate_feed()
+            invalidate_user_stats(session["user_id"])
             flash("Post shared successfully!","success")
             return redirect(url_for("main.home"))
         except ValueError as e:
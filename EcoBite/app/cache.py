@@ -0,0 +1,186 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
+
+
+def copy_value(value):
+    """
+    Copies a cached value deep enough that changing the copy can't change
+    the cache: lists, tuples, dicts and row objects (app.utils.row_class)
+    are copied, while their leaves (strings, numbers, datetimes) are
+    immutable and shared.
+    """
+    if isinstance(value, list):
+        return [copy_value(v) for v in value]
+    if isinstance(value, tuple):
+        return tuple(copy_value(v) for v in value)
+    if isinstance(value, dict):
+        return {k: copy_value(v) for k, v in value.items()}
+    if hasattr(value, "__dataclass_fields__"):
+        row = object.__new__(type(value))
+        row.__dict__.update(value.__dict__)
+        return row
+    return value
+
+
+class ResultCache:
+    """
+    A thread-safe in-process LRU cache with per-entry TTL and a memory cap.
+
+    Entry sizes are estimated from their JSON encoding when stored, so the cap
+    tracks payload size rather than Python object overhead.
+    Values are copied going in and coming out (copy_value), so callers may
+    modify what they stored or got back.
+    The cache lives in one process: invalidating it does not reach other
+    workers, which keep serving their entries until the TTL expires.
+    """
+
+    def __init__(self, max_entries=256, ttl=30.0, max_bytes=8 * 1024 * 1024, dumps=None):
+        self.max_entries = max_entries
+        self.dumps = dumps or (lambda value: json.dumps(value, default=str))
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (expires_at, size, value)
+        self._bytes = 0
+        self._versions = {}            # key -> times delete() was called for it
+        self.generation = 0            # times clear() was called
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key):
+        """Returns the cached value, or None on a miss or expired entry."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, size, value = entry
+            if expires_at < time.monotonic():
+                self._drop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return copy_value(value)
+
+    def token(self, key):
+        """
+        Read before computing a value for `key` and pass to set(): a result
+        computed while `key` was deleted or the cache cleared is not cached.
+        Deleting other keys doesn't affect it.
+        """
+        with self._lock:
+            return self.generation, self._versions.get(key, 0)
+
+    def set(self, key, value, token=None):
+        """
+        Stores a value. Pass the token() read before computing it so a
+        result computed across an invalidation is not cached.
+        """
+        size = len(self.dumps(value))
+        if size > self.max_bytes:
+            return
+        value = copy_value(value)
+        with self._lock:
+            if token is not None and token != (self.generation, self._versions.get(key, 0)):
+                return
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (time.monotonic() + self.ttl, size, value)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._versions[key] = self._versions.get(key, 0) + 1
+            self.invalidations += 1
+            if len(self._versions) > 4 * self.max_entries:
+                # Bound the version table; a new generation covers every key it forgets.
+                self._versions.clear()
+                self.generation += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self._versions.clear()
+            self.generation += 1
+            self.invalidations += 1
+
+    def _drop(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+def feed_cache_key(filters, cursor, limit, columns):
+    """
+    Builds a cache key from a normalized filter set (see app.feed.feed_filters).
+    """
+    search = " ".join(filters["search"].lower().split())
+    category = filters["type"] or ""
+    if category.lower() in ("all", "all types"):
+        category = ""
+    return (
+        filters["status"], category, filters["dietary"], filters["dietary_mode"],
+        search, filters["sort"], cursor or "", limit, columns,
+    )
+
+def get_feed_cache(app=None):
+    app = app or current_app
+    return app.extensions['feed_cache']
+
+def invalidate_feed():
+    """
+    Drops every cached feed page. Call after any write that can change what the feed shows.
+    Only this worker's cache is cleared; other workers may serve the old pages
+    for up to FEED_CACHE_TTL seconds.
+    """
+    get_feed_cache().clear()
+
+def get_user_stats_cache(app=None):
+    app = app or current_app
+    return app.extensions['user_stats_cache']
+
+def invalidate_user_stats(*user_ids):
+    """
+    Drops the cached profile stats of each user whose posts or claims just changed.
+    """
+    cache = get_user_stats_cache()
+    for user_id in set(user_ids):
+        if user_id is not None:
+            cache.delete(user_id)
+
+def init_app(app):
+    app.extensions['feed_cache'] = ResultCache(
+        max_entries=app.config['FEED_CACHE_MAX_ENTRIES'],
+        ttl=app.config['FEED_CACHE_TTL'],
+        max_bytes=app.config['FEED_CACHE_MAX_BYTES'],
+        dumps=app.json.dumps,
+    )
+    app.extensions['user_stats_cache'] = ResultCache(
+        max_entries=app.config['USER_STATS_CACHE_MAX_ENTRIES'],
+        ttl=app.config['USER_STATS_CACHE_TTL'],
+        dumps=app.json.dumps,
+    )
@@ -0,0 +1,116 @@
+from app.utils import batch_load
+from app.conditional import touch
+
+def log_change(cur, post_id, op):
+    """
+    Appends a change for one post ('insert', 'update' or 'delete').
+    Runs inside the caller's transaction so the log commits with the write.
+    Also bumps the posts version used for ETags. The bump comes first: it
+    holds the posts row of data_versions until commit, so change versions
+    are handed out in commit order (see changes_since).
+    """
+    touch(cur, "posts")
+    cur.execute("INSERT INTO post_changes (post_id, op) VALUES (?, ?)", (post_id, op))
+
+def log_changes(cur, post_ids, op):
+    if post_ids:
+        touch(cur, "posts")
+        cur.executemany("INSERT INTO post_changes (post_id, op) VALUES (?, ?)", [(i, op) for i in post_ids])
+
+def current_version(cur):
+    cur.execute("SELECT COALESCE(MAX(version), 0) FROM post_changes")
+    return cur.fetchone()[0]
+
+def recent_changes(cur, after=None, limit=500):
+    """
+    Change log rows with each post's current status, oldest first:
+    the first `limit` after version `after`, or the newest `limit` when
+    `after` is None. Returns [(version, post_id, op, status)]; status is
+    None for a post that no longer exists.
+    """
+    if after is None:
+        cur.execute("""
+            SELECT c.version, c.post_id, c.op, p.status
+            FROM post_changes c LEFT JOIN posts p ON p.id=c.post_id
+            ORDER BY c.version DESC
+            LIMIT ?
+        """, (limit,))
+        return cur.fetchall()[::-1]
+    cur.execute("""
+        SELECT c.version, c.post_id, c.op, p.status
+        FROM post_changes c LEFT JOIN posts p ON p.id=c.post_id
+        WHERE c.version > ?
+        ORDER BY c.version
+        LIMIT ?
+    """, (after, limit))
+    return cur.fetchall()
+
+def changes_since(cur, since, limit=500):
+    """
+    Returns the delta after `since`, or None when a full resync is needed
+    because `since` is older than the oldest retained change.
+
+    Versions come from AUTO_INCREMENT, assigned at insert time. log_change()
+    takes the posts data_versions row lock before inserting, so a writer only
+    gets a version once every writer holding a lower one has committed or
+    rolled back. A visible version therefore never has an uncommitted one
+    below it, and clients can't skip past a change however long it takes.
+    """
+    cur.execute("SELECT MIN(version), COALESCE(MAX(version), 0) FROM post_changes")
+    oldest, newest = cur.fetchone()
+    if since > newest or (oldest is not None and since < oldest - 1):
+        return None
+
+    cur.execute("""
+        SELECT version, post_id, op FROM post_changes
+        WHERE version > ?
+        ORDER BY version
+        LIMIT ?
+    """, (since, limit + 1))
+    rows = cur.fetchall()
+    more = len(rows) > limit
+    rows = rows[:limit]
+
+    first_op, last_op = {}, {}
+    for version, post_id, op in rows:
+        first_op.setdefault(post_id, op)
+        last_op[post_id] = op
+    live = [pid for pid, op in last_op.items() if op != "delete"]
+    posts = batch_load(cur, """
+        SELECT p.*, u.email as owner_email FROM posts p JOIN users u ON p.user_id=u.id
+        WHERE p.id IN ({ids})
+    """, live, "id")
+
+    delta = {"version": rows[-1][0] if rows else since, "inserted": [], "updated": [], "removed": [], "more": more}
+    for post_id, op in last_op.items():
+        post = posts.get(post_id)
+        if post is None:
+            if first_op[post_id] != "insert":
+                delta["removed"].append(post_id)
+        elif first_op[post_id] == "insert":
+            delta["inserted"].append(post)
+        else:
+            delta["updated"].append(post)
+    return delta
+
+def compact(conn, retention_days=7, batch_size=5000):
+    """
+    Deletes change log rows older than the retention window, always keeping
+    the newest row so the current version survives. Clients whose `since`
+    falls before the remaining rows are told to resync.
+    """
+    cur = conn.cursor()
+    newest = current_version(cur)
+    removed = 0
+    while True:
+        cur.execute("""
+            DELETE FROM post_changes
+            WHERE changed_at < NOW() - INTERVAL ? DAY AND version < ?
+            LIMIT ?
+        """, (retention_days, newest, batch_size))
+        conn.commit()
+        removed += cur.rowcount
+        if cur.rowcount < batch_size:
+            break
+    cur.close()
+    return removed
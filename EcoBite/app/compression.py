@@ -0,0 +1,127 @@
+import gzip
+import mimetypes
+import os
+
+from flask import request, send_from_directory
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+# Content-Encoding -> suffix of the pre-compressed copy of a static file.
+SUFFIXES = {"br": ".br", "gzip": ".gz"}
+
+def _compress(data, encoding, config):
+    if encoding == "br":
+        return brotli.compress(data, quality=config['COMPRESS_BR_QUALITY'])
+    return gzip.compress(data, compresslevel=config['COMPRESS_LEVEL'], mtime=0)
+
+def choose_encoding(accept_encodings):
+    """
+    Picks the best encoding the client accepts: brotli when available, else gzip.
+    Returns None for identity.
+    """
+    offered = ["br", "gzip"] if brotli else ["gzip"]
+    best = max(offered, key=lambda e: accept_encodings.quality(e), default=None)
+    if best is None or accept_encodings.quality(best) <= 0:
+        return None
+    return best
+
+def compress_response(response, config):
+    """
+    Compresses a finished response in place when it is worth it.
+
+    Streamed bodies (SSE, stream_rows) and file responses are passed through:
+    the former must reach the client as they are produced, and static files
+    are served from their pre-compressed copies instead.
+    """
+    response.vary.add("Accept-Encoding")
+    if (response.status_code < 200 or response.status_code in (204, 206, 304)
+            or response.direct_passthrough or response.is_streamed
+            or "Content-Encoding" in response.headers
+            or response.mimetype not in config['COMPRESS_MIMETYPES']):
+        return response
+    encoding = choose_encoding(request.accept_encodings)
+    if encoding is None:
+        return response
+    data = response.get_data()
+    if len(data) < config['COMPRESS_MIN_SIZE']:
+        return response
+    response.set_data(_compress(data, encoding, config))
+    response.headers["Content-Encoding"] = encoding
+    # Same content, different bytes: a strong validator would be wrong now.
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+def precompress_static(folder, config, exclude=()):
+    """
+    Writes .gz (and .br with brotli installed) copies of every compressible
+    static file that is missing one or is older than its source. Runs at
+    startup so static files are never compressed per request. Top-level
+    directories in `exclude` (e.g. uploads) are skipped, as in
+    app.assets.build_manifest().
+    Returns the number of files written.
+    """
+    written = 0
+    encodings = ["gzip", "br"] if brotli else ["gzip"]
+    for root, dirs, files in os.walk(folder):
+        if root == folder:
+            dirs[:] = [d for d in dirs if d not in exclude]
+        for name in files:
+            if name.endswith(tuple(SUFFIXES.values())):
+                continue
+            path = os.path.join(root, name)
+            mimetype = mimetypes.guess_type(name)[0]
+            if mimetype not in config['COMPRESS_MIMETYPES'] or os.path.getsize(path) < config['COMPRESS_MIN_SIZE']:
+                continue
+            data = None
+            for encoding in encodings:
+                target = path + SUFFIXES[encoding]
+                if os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(path):
+                    continue
+                if data is None:
+                    with open(path, "rb") as f:
+                        data = f.read()
+                tmp = target + ".tmp"
+                with open(tmp, "wb") as f:
+                    f.write(_compress(data, encoding, config))
+                os.replace(tmp, target)
+                written += 1
+    return written
+
+def send_static(app, filename):
+    """
+    Serves a static file, using its pre-compressed copy when the client accepts
+    it and the copy is not older than the file (e.g. edited since startup).
+    """
+    encoding = choose_encoding(request.accept_encodings) if app.config['COMPRESS_ENABLED'] else None
+    path = safe_join(app.static_folder, filename) if encoding else None
+    if path:
+        compressed = path + SUFFIXES[encoding]
+        try:
+            fresh = os.path.getmtime(compressed) >= os.path.getmtime(path)
+        except OSError:
+            fresh = False
+        if fresh:
+            mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+            response = send_from_directory(app.static_folder, filename + SUFFIXES[encoding], mimetype=mimetype,
+                                           max_age=app.get_send_file_max_age(filename))
+            response.headers["Content-Encoding"] = encoding
+            return response
+    return send_from_directory(app.static_folder, filename, max_age=app.get_send_file_max_age(filename))
+
+def init_app(app):
+    if not app.config['COMPRESS_ENABLED']:
+        return
+    if app.config['COMPRESS_STATIC'] and app.static_folder:
+        try:
+            written = precompress_static(app.static_folder, app.config, exclude=("uploads",))
+            if written:
+                print(f"Pre-compressed {written} static files")
+        except OSError as e:
+            print(f"❌ Static pre-compression failed: {e}")
+    app.after_request(lambda response: compress_response(response, app.config))
@@ -0,0 +1,72 @@
+import hashlib
+from functools import wraps
+
+from flask import request, session, jsonify, make_response
+
+from app.db import get_cursor
+
+def touch(cur, *names):
+    """
+    Bumps the version of each named table. Runs inside the caller's transaction.
+    """
+    for name in names:
+        cur.execute("UPDATE data_versions SET version=version+1, updated_at=NOW() WHERE name=?", (name,))
+
+def read_versions(cur, names):
+    marks = ",".join("?" * len(names))
+    cur.execute(f"SELECT name, version, updated_at FROM data_versions WHERE name IN ({marks})", tuple(names))
+    return {name: (version, updated_at) for name, version, updated_at in cur.fetchall()}
+
+def conditional_get(*tables, per_user=False):
+    """
+    Answers GET requests with 304 Not Modified when the client's ETag or
+    Last-Modified still matches, before the view runs its query.
+
+    The strong ETag combines the version of every table the response reads
+    from, the URL with its query string and, for per-user responses, the
+    session user. Last-Modified is the newest updated_at among those tables.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method != "GET":
+                return view(*args, **kwargs)
+            cur = get_cursor()
+            if not cur: return jsonify({"error": "Database error"}), 500
+            try:
+                versions = read_versions(cur, tables)
+            except Exception as e:
+                print("❌ Version lookup error:", e)
+                return view(*args, **kwargs)
+            if len(versions) != len(tables):
+                return view(*args, **kwargs)
+
+            key = [request.full_path] + [f"{t}:{versions[t][0]}" for t in tables]
+            if per_user:
+                key.append(f"user:{session.get('user_id')}")
+            etag = hashlib.sha1("|".join(key).encode()).hexdigest()[:20]
+            # updated_at is server local time; astimezone() attaches its offset for the GMT HTTP date.
+            last_modified = max(v[1] for v in versions.values()).astimezone()
+
+            if request.if_none_match:
+                # Weak comparison: compression (app/compression.py) weakens the ETag.
+                fresh = request.if_none_match.contains_weak(etag)
+            else:
+                since = request.if_modified_since
+                fresh = since is not None and last_modified is not None and last_modified.replace(microsecond=0) <= since
+
+            if fresh:
+                response = make_response("", 304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            if last_modified is not None:
+                response.last_modified = last_modified
+            response.headers["Cache-Control"] = "private, no-cache" if per_user else "no-cache"
+            if per_user:
+                response.vary.add("Cookie")
+            return response
+        return wrapper
+    return decorator
@@ -14,3 +14,89 @@ class Config:
     # Uploads
     UPLOAD_FOLDER = os.path.join(os.getcwd(), 'static', 'uploads')
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max upload size
+    UPLOAD_MAX_FILE_SIZE = int(os.getenv("UPLOAD_MAX_FILE_SIZE", str(10 * 1024 * 1024)))  # per file, checked while streaming
+    UPLOAD_URL_PREFIX = "/static/uploads"
+    UPLOAD_TMP_FOLDER = os.getenv("UPLOAD_TMP_FOLDER")                 # in-progress uploads; default instance/upload-tmp, same filesystem as UPLOAD_FOLDER
+    STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "local")
+    UPLOAD_GC_GRACE = int(os.getenv("UPLOAD_GC_GRACE", "600"))         # seconds an unreferenced file is kept
+    UPLOAD_GC_INTERVAL = int(os.getenv("UPLOAD_GC_INTERVAL", "900"))   # seconds between orphan sweeps
+
+    # Connection pool
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_POOL_MAX_OVERFLOW = int(os.getenv("DB_POOL_MAX_OVERFLOW", "10"))
+    DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))     # seconds to wait for a free connection
+    DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "3600"))     # seconds before a connection is replaced
+    DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1") == "1"
+    DB_CONNECT_TIMEOUT = int(os.getenv("DB_CONNECT_TIMEOUT", "5"))   # seconds per connection attempt
+    DB_BOOTSTRAP = os.getenv("DB_BOOTSTRAP", "1") == "1"             # create the database once at startup
+
+    # Circuit breaker around connection attempts
+    DB_BREAKER_THRESHOLD = int(os.getenv("DB_BREAKER_THRESHOLD", "3"))   # consecutive failures before opening
+    DB_BREAKER_RESET = float(os.getenv("DB_BREAKER_RESET", "2"))         # first backoff, doubled per failed probe
+    DB_BREAKER_MAX_RESET = float(os.getenv("DB_BREAKER_MAX_RESET", "60"))
+
+    # Feed pagination
+    FEED_PAGE_SIZE = int(os.getenv("FEED_PAGE_SIZE", "20"))
+    FEED_MAX_PAGE_SIZE = int(os.getenv("FEED_MAX_PAGE_SIZE", "100"))
+
+    # Feed result cache (per worker process)
+    FEED_CACHE_TTL = float(os.getenv("FEED_CACHE_TTL", "30"))
+    FEED_CACHE_MAX_ENTRIES = int(os.getenv("FEED_CACHE_MAX_ENTRIES", "256"))
+    FEED_CACHE_MAX_BYTES = int(os.getenv("FEED_CACHE_MAX_BYTES", str(8 * 1024 * 1024)))
+
+    # Background jobs
+    JOBS_ENABLED = os.getenv("JOBS_ENABLED", "1") == "1"
+    STATS_RECONCILE_INTERVAL = int(os.getenv("STATS_RECONCILE_INTERVAL", "60"))  # seconds
+
+    # Per-user profile stats cache
+    USER_STATS_CACHE_TTL = float(os.getenv("USER_STATS_CACHE_TTL", "300"))
+    USER_STATS_CACHE_MAX_ENTRIES = int(os.getenv("USER_STATS_CACHE_MAX_ENTRIES", "2048"))
+    EXPIRY_SWEEP_INTERVAL = int(os.getenv("EXPIRY_SWEEP_INTERVAL", "30"))  # seconds
+    EXPIRY_BATCH_SIZE = int(os.getenv("EXPIRY_BATCH_SIZE", "500"))
+    EXPIRY_MAX_BATCHES = int(os.getenv("EXPIRY_MAX_BATCHES", "20"))
+
+    # Server-Sent Events feed stream
+    EVENT_BUFFER_SIZE = int(os.getenv("EVENT_BUFFER_SIZE", "1000"))  # events kept for Last-Event-ID replay
+    EVENT_HEARTBEAT = float(os.getenv("EVENT_HEARTBEAT", "15"))      # seconds between keep-alive comments
+    EVENT_POLL_INTERVAL = float(os.getenv("EVENT_POLL_INTERVAL", "1"))  # seconds between change log polls per worker
+
+    # Delta sync change log
+    CHANGELOG_RETENTION_DAYS = int(os.getenv("CHANGELOG_RETENTION_DAYS", "7"))
+
+    # Streaming JSON list responses
+    STREAM_BATCH_SIZE = int(os.getenv("STREAM_BATCH_SIZE", "500"))  # rows per fetchmany()
+
+    # Response compression (brotli is used when the package is installed)
+    COMPRESS_ENABLED = os.getenv("COMPRESS_ENABLED", "1") == "1"
+    COMPRESS_STATIC = os.getenv("COMPRESS_STATIC", "1") == "1"        # write .gz/.br copies of static files at startup
+    COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", "1024"))     # bytes; smaller bodies go out as-is
+    COMPRESS_LEVEL = int(os.getenv("COMPRESS_LEVEL", "6"))              # gzip 1-9
+    COMPRESS_BR_QUALITY = int(os.getenv("COMPRESS_BR_QUALITY", "5"))    # brotli 0-11
+    # Images, video and archives are already compressed and are never listed here.
+    COMPRESS_MIMETYPES = {
+        "text/html", "text/css", "text/plain", "text/javascript", "text/xml",
+        "application/javascript", "application/json", "application/xml", "image/svg+xml",
+    }
+
+    # Uploaded image processing (app/images.py)
+    IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", "2"))
+    IMAGE_FORMAT = os.getenv("IMAGE_FORMAT", "WEBP").upper()              # WEBP or JPEG
+    IMAGE_QUALITY = int(os.getenv("IMAGE_QUALITY", "80"))
+    IMAGE_MAX_DIMENSION = int(os.getenv("IMAGE_MAX_DIMENSION", "1600"))   # pixels, full-size copy
+    IMAGE_THUMB_SIZE = int(os.getenv("IMAGE_THUMB_SIZE", "320"))          # feed cards
+
+    # Fingerprinted static assets (app/assets.py)
+    ASSETS_FINGERPRINT = os.getenv("ASSETS_FINGERPRINT", "1") == "1"
+    ASSET_MAX_AGE = int(os.getenv("ASSET_MAX_AGE", str(365 * 24 * 3600)))  # seconds; fingerprinted URLs never change
+
+    # Templates: compiled bytecode on disk, rendered feed cards in memory
+    JINJA_BYTECODE_CACHE = os.getenv("JINJA_BYTECODE_CACHE", "1") == "1"
+    FRAGMENT_CACHE_TTL = float(os.getenv("FRAGMENT_CACHE_TTL", "3600"))
+    FRAGMENT_CACHE_MAX_ENTRIES = int(os.getenv("FRAGMENT_CACHE_MAX_ENTRIES", "2000"))
+    STREAM_HTML = os.getenv("STREAM_HTML", "1") == "1"  # stream the home page (uncompressed) instead of rendering it whole
+
+    # Per-request SQL tracing (app/sqltrace.py); off by default
+    SQL_TRACE = os.getenv("SQL_TRACE", "0") == "1"
+    SQL_SLOW_MS = float(os.getenv("SQL_SLOW_MS", "200"))                  # statements at least this slow go to the slow-query log
+    SQL_REPEAT_THRESHOLD = int(os.getenv("SQL_REPEAT_THRESHOLD", "5"))    # same-shape SELECTs per request flagged as N+1
+    SQL_SLOW_LOG = os.getenv("SQL_SLOW_LOG", "")                          # file path; printed when empty
@@ -1,76 +1,364 @@
+import threading
+import time
+from collections import deque
+
 import mariadb
-from flask import g, current_app, flash
+from flask import g, current_app, flash, request, jsonify
+
+from app.sqltrace import get_tracer
+
+
+class DatabaseUnavailable(Exception):
+    """Raised when a database connection cannot be handed out right now."""
+
+
+class PoolTimeout(DatabaseUnavailable):
+    """Raised when no pooled connection became free within the checkout timeout."""
+
+
+class CircuitOpen(DatabaseUnavailable):
+    """Raised immediately while the circuit breaker is refusing connection attempts."""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Database unavailable, retry in {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Stops hammering a database that is down.
+
+    After `threshold` consecutive connection failures the breaker opens and
+    every call fails fast with CircuitOpen. Once the backoff has elapsed a
+    single caller is let through as a half-open probe: success closes the
+    breaker, failure re-opens it with the backoff doubled (up to `max_reset`).
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, threshold=3, reset_timeout=2.0, max_reset=60.0):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.max_reset = max_reset
+
+        self._lock = threading.Lock()
+        self.state = self.CLOSED
+        self._failures = 0
+        self._backoff = reset_timeout
+        self._opened_at = 0.0
+        self._trips = 0
+
+    def before(self):
+        """Call before attempting a connection; raises CircuitOpen while open."""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+            if self.state == self.OPEN:
+                remaining = self._backoff - (time.monotonic() - self._opened_at)
+                if remaining > 0:
+                    raise CircuitOpen(remaining)
+                self.state = self.HALF_OPEN
+                return
+            # A probe is already in flight.
+            raise CircuitOpen(self._backoff)
+
+    def success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self._failures = 0
+            self._backoff = self.reset_timeout
+
+    def failure(self):
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._backoff = min(self._backoff * 2, self.max_reset)
+                self._open()
+                return
+            self._failures += 1
+            if self.state == self.CLOSED and self._failures >= self.threshold:
+                self._open()
+
+    def abandon(self):
+        """Give up a half-open probe that never reached the database."""
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self.state = self.OPEN
+
+    def _open(self):
+        self.state = self.OPEN
+        self._opened_at = time.monotonic()
+        self._trips += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self._failures,
+                "backoff_s": self._backoff,
+                "trips": self._trips,
+            }
+
+
+class ConnectionPool:
+    """
+    A small thread-safe pool of MariaDB connections.
+
+    Keeps up to `size` idle connections around and allows `max_overflow` extra
+    connections under load. Overflow connections are closed when they are
+    returned. Idle connections older than `recycle` seconds are replaced, and
+    connections are pinged before being handed out when `pre_ping` is set.
+    """
+
+    def __init__(self, connect, size=5, max_overflow=10, timeout=10.0, recycle=3600, pre_ping=True, breaker=None):
+        self._connect = connect
+        self.breaker = breaker or CircuitBreaker()
+        self.size = size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.recycle = recycle
+        self.pre_ping = pre_ping
+
+        self._lock = threading.Condition()
+        self._idle = deque()  # (connection, created_at)
+        self._created = {}    # id(connection) -> created_at, for every open connection
+        self._in_use = 0
+        self._waits = 0
+        self._wait_time = 0.0
+
+    def _open(self):
+        try:
+            conn = self._connect()
+        except Exception:
+            self.breaker.failure()
+            raise
+        self.breaker.success()
+        with self._lock:
+            self._created[id(conn)] = time.monotonic()
+        return conn
+
+    def _forget(self, conn):
+        # Caller holds the lock; close the connection after releasing it.
+        self._created.pop(id(conn), None)
+
+    @staticmethod
+    def _close(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _healthy(self, conn, created_at):
+        if self.recycle and time.monotonic() - created_at > self.recycle:
+            return False
+        if self.pre_ping:
+            try:
+                conn.ping()
+            except Exception:
+                return False
+        return True
+
+    def acquire(self):
+        """Borrow a connection, waiting up to `timeout` seconds if the pool is exhausted."""
+        self.breaker.before()
+        started = None
+        with self._lock:
+            while True:
+                if self._idle:
+                    conn, created_at = self._idle.pop()
+                    self._in_use += 1
+                    break
+                if self._in_use + len(self._idle) < self.size + self.max_overflow:
+                    # Reserve the slot before connecting outside the lock.
+                    self._in_use += 1
+                    conn, created_at = None, None
+                    break
+                if started is None:
+                    started = time.monotonic()
+                    self._waits += 1
+                remaining = self.timeout - (time.monotonic() - started)
+                if remaining <= 0:
+                    self._wait_time += time.monotonic() - started
+                    self.breaker.abandon()
+                    raise PoolTimeout(f"No database connection available after {self.timeout}s")
+                self._lock.wait(remaining)
+            if started is not None:
+                self._wait_time += time.monotonic() - started
+
+        try:
+            if conn is not None and not self._healthy(conn, created_at):
+                with self._lock:
+                    self._forget(conn)
+                self._close(conn)
+                conn = None
+            if conn is None:
+                conn = self._open()
+            else:
+                self.breaker.success()
+            return conn
+        except Exception:
+            with self._lock:
+                self._in_use -= 1
+                self._lock.notify()
+            raise
+
+    def release(self, conn, broken=False):
+        """Return a borrowed connection to the pool."""
+        if not broken:
+            try:
+                # Never hand the next request a half-finished transaction.
+                conn.rollback()
+            except Exception:
+                broken = True
+        with self._lock:
+            self._in_use -= 1
+            keep = not broken and len(self._idle) < self.size and id(conn) in self._created
+            if keep:
+                self._idle.append((conn, self._created[id(conn)]))
+            else:
+                self._forget(conn)
+            self._lock.notify()
+        if not keep:
+            self._close(conn)
+
+    def dispose(self):
+        """Close every idle connection. Borrowed connections are closed when returned."""
+        with self._lock:
+            idle = [conn for conn, _ in self._idle]
+            self._idle.clear()
+            for conn in idle:
+                self._forget(conn)
+        for conn in idle:
+            self._close(conn)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": self.size,
+                "max_overflow": self.max_overflow,
+                "open": len(self._created),
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "waits": self._waits,
+                "wait_time_s": round(self._wait_time, 4),
+                "breaker": self.breaker.stats(),
+            }
+
+
+def _connect(config, database=True):
+    """
+    Opens a new connection using the app configuration.
+    """
+    params = dict(
+        user=config['DB_USER'],
+        password=config['DB_PASS'],
+        host=config['DB_HOST'],
+        port=config['DB_PORT'],
+        connect_timeout=config['DB_CONNECT_TIMEOUT'],
+    )
+    if database:
+        params['database'] = config['DB_NAME']
+    return mariadb.connect(**params)
+
+def bootstrap_database(config):
+    """
+    Creates the application database if it does not exist yet.
+    Runs once at startup so request handling never has to.
+    """
+    try:
+        conn = _connect(config, database=False)
+    except mariadb.Error as e:
+        print(f"❌ Database bootstrap skipped: {e}")
+        return False
+    try:
+        cursor = conn.cursor()
+        cursor.execute(f"CREATE DATABASE IF NOT EXISTS `{config['DB_NAME']}` CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci;")
+        conn.commit()
+        cursor.close()
+        return True
+    except mariadb.Error as e:
+        print(f"❌ Database creation failed: {e}")
+        return False
+    finally:
+        conn.close()
+
+def get_pool(app=None):
+    """
+    Returns the connection pool registered on the app.
+    """
+    app = app or current_app
+    return app.extensions['db_pool']
 
 def get_db():
     """
-    Connects to the database if not already connected for this request.
+    Borrows a connection from the pool if not already borrowed for this request.
     Returns the connection object.
+    Raises CircuitOpen without waiting while the database is known to be down.
     """
     if 'db' not in g:
         try:
-            g.db = mariadb.connect(
-                user=current_app.config['DB_USER'],
-                password=current_app.config['DB_PASS'],
-                host=current_app.config['DB_HOST'],
-                port=current_app.config['DB_PORT'],
-                database=current_app.config['DB_NAME']
-            )
-        except mariadb.Error as e:
-            # If the specific database connects fails, try to connect without DB to see if we can create it
-            # This logic mimics the original app.py behavior but scoped properly.
-            error_msg = str(e)
-            if "Unknown database" in error_msg:
-                try:
-                    conn = mariadb.connect(
-                        user=current_app.config['DB_USER'],
-                        password=current_app.config['DB_PASS'],
-                        host=current_app.config['DB_HOST'],
-                        port=current_app.config['DB_PORT']
-                    )
-                    cursor = conn.cursor()
-                    cursor.execute(f"CREATE DATABASE IF NOT EXISTS `{current_app.config['DB_NAME']}` CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci;")
-                    conn.commit()
-                    cursor.close()
-                    conn.close()
-                    
-                    # Retry connection
-                    g.db = mariadb.connect(
-                        user=current_app.config['DB_USER'],
-                        password=current_app.config['DB_PASS'],
-                        host=current_app.config['DB_HOST'],
-                        port=current_app.config['DB_PORT'],
-                        database=current_app.config['DB_NAME']
-                    )
-                except Exception as create_error:
-                    print(f"❌ Database creation failed: {create_error}")
-                    return None
-            else:
-                print(f"❌ Database connection failed: {e}")
-                return None
-                
+            g.db = get_pool().acquire()
+        except CircuitOpen:
+            raise
+        except PoolTimeout as e:
+            print(f"❌ Database pool exhausted: {e}")
+            return None
+        except Exception as e:
+            print(f"❌ Database connection failed: {e}")
+            return None
+
     return g.db
 
-def get_cursor():
+def get_cursor(**kwargs):
     """
     Returns a cursor for the current request's database connection.
     Safe-guarding against connection errors.
+    Keyword arguments go to connection.cursor(), e.g. buffered=False to stream rows.
+    With SQL_TRACE on, the cursor records its statements (see app.sqltrace).
     """
     db = get_db()
     if db:
-        return db.cursor()
+        cursor = db.cursor(**kwargs)
+        tracer = get_tracer()
+        return tracer.wrap(cursor) if tracer else cursor
     return None
 
 def close_db(e=None):
     """
-    Closes the database connection at the end of the request.
+    Returns the connection to the pool at the end of the request.
     """
     db = g.pop('db', None)
 
     if db is not None:
-        db.close()
+        get_pool().release(db)
+
+def handle_unavailable(e):
+    """
+    Turns a fast-failed connection attempt into a 503 instead of a stalled worker.
+    """
+    retry_after = str(max(1, int(getattr(e, 'retry_after', 1) + 0.999)))
+    if request.path.startswith('/api/'):
+        return jsonify({"error": "Database unavailable"}), 503, {"Retry-After": retry_after}
+    return "EcoBite is temporarily unavailable. Please try again shortly.", 503, {"Retry-After": retry_after}
 
 def init_app(app):
     """
-    Register database functions with the Flask app.
+    Create the connection pool and register database functions with the Flask app.
     """
+    config = app.config
+    if config['DB_BOOTSTRAP']:
+        bootstrap_database(config)
+    app.extensions['db_pool'] = ConnectionPool(
+        lambda: _connect(config),
+        size=config['DB_POOL_SIZE'],
+        max_overflow=config['DB_POOL_MAX_OVERFLOW'],
+        timeout=config['DB_POOL_TIMEOUT'],
+        recycle=config['DB_POOL_RECYCLE'],
+        pre_ping=config['DB_POOL_PRE_PING'],
+        breaker=CircuitBreaker(
+            threshold=config['DB_BREAKER_THRESHOLD'],
+            reset_timeout=config['DB_BREAKER_RESET'],
+            max_reset=config['DB_BREAKER_MAX_RESET'],
+        ),
+    )
     app.teardown_appcontext(close_db)
+    app.register_error_handler(CircuitOpen, handle_unavailable)
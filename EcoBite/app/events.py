@@ -0,0 +1,207 @@
+import json
+import threading
+import time
+from collections import deque
+
+from flask import current_app
+
+from app.changelog import recent_changes
+from app.db import get_pool
+
+
+def change_event(op, status):
+    """The SSE event name for a change log row, from its op and the post's current status."""
+    if op == "insert":
+        return "post-created"
+    if status in ("claimed", "completed"):
+        return "post-claimed"
+    if status == "expired":
+        return "post-expired"
+    return "post-updated"
+
+
+class EventBroker:
+    """
+    Fan-out of feed change events to Server-Sent Events subscribers.
+
+    Events come from the post_changes table (app/changelog.py), not from the
+    process that made the write: a poller thread in every worker reads new
+    rows every `poll_interval` seconds, so each subscriber sees every change
+    whichever worker it is connected to. The change version is the SSE event
+    id. Versions are handed out in commit order, so a reconnecting client's
+    Last-Event-ID means the same thing on every worker and is replayed from
+    the ring buffer; ids older than the buffer get a "reset" event telling
+    the client to refetch.
+
+    Subscribers share one Condition and hold no per-client queue, so an idle
+    connection costs a parked waiter and nothing else. Under a threaded
+    server that waiter is an OS thread, so open streams are capped by the
+    thread count; under gunicorn -k gevent (see README) threading is
+    monkey-patched before the app is created and the waiter is a greenlet.
+    `cooperative` records which one this broker got.
+
+    `fetch(after, limit)` returns change rows as changelog.recent_changes()
+    does; the poller starts with the first subscriber.
+    """
+
+    def __init__(self, fetch, buffer_size=1000, heartbeat=15.0, poll_interval=1.0):
+        self.fetch = fetch
+        self.buffer_size = buffer_size
+        self.heartbeat = heartbeat
+        self.poll_interval = poll_interval
+        self._cond = threading.Condition()
+        self._buffer = deque(maxlen=buffer_size)  # (version, event, payload)
+        self._seq = 0     # newest version polled
+        self._floor = 0   # the buffer holds every event after this version
+        self._loaded = False
+        self._poller = None
+        self.subscribers = 0
+        self.cooperative = _threading_patched()
+
+    def poll(self):
+        """
+        Reads change log rows after the newest one seen into the buffer and
+        wakes subscribers. The first call loads the newest `buffer_size` rows.
+        """
+        with self._cond:
+            after = self._seq if self._loaded else None
+        rows = self.fetch(after, self.buffer_size)
+        with self._cond:
+            if not self._loaded:
+                self._loaded = True
+                self._floor = rows[0][0] - 1 if rows else 0
+            for version, post_id, op, status in rows:
+                if version <= self._seq:
+                    continue
+                self._append(version, change_event(op, status), {"post_id": post_id, "status": status})
+            if rows and rows[-1][0] > self._seq:
+                # Every post change moves the impact counters.
+                self._append(rows[-1][0], "stats-changed", {})
+                self._seq = rows[-1][0]
+                self._cond.notify_all()
+        return len(rows)
+
+    def _append(self, version, event, data):
+        if len(self._buffer) == self._buffer.maxlen:
+            self._floor = self._buffer[0][0]
+        self._buffer.append((version, event, json.dumps(data, default=str)))
+
+    def _poll_forever(self):
+        while True:
+            time.sleep(self.poll_interval)
+            try:
+                # A full batch means more rows are waiting.
+                while self.poll() >= self.buffer_size:
+                    pass
+            except Exception as e:
+                print(f"❌ Event poll failed: {e}")
+
+    def start(self):
+        """Loads the buffer and starts the poller, once per process."""
+        with self._cond:
+            if self._poller is not None:
+                return
+            self._poller = threading.Thread(target=self._poll_forever, name="event-poller", daemon=True)
+        try:
+            self.poll()
+        except Exception as e:
+            print(f"❌ Event poll failed: {e}")
+        self._poller.start()
+
+    def _parse(self, last_event_id):
+        """Returns the version to resume after, or None if a reset is needed."""
+        if not last_event_id:
+            return self._seq
+        if not last_event_id.isdigit():
+            return None
+        seq = int(last_event_id)
+        if seq < self._floor or seq > self._seq:
+            return None
+        return seq
+
+    def _since(self, seq):
+        # Versions only grow, so the newer events sit at the right end.
+        out = []
+        for entry in reversed(self._buffer):
+            if entry[0] <= seq:
+                break
+            out.append(entry)
+        return out[::-1]
+
+    def _format(self, seq, event, payload):
+        return f"id: {seq}\nevent: {event}\ndata: {payload}\n\n"
+
+    def stream(self, last_event_id=None):
+        """
+        Generator of SSE frames for one client: replay, then live events and heartbeats.
+        """
+        self.start()
+        if last_event_id and last_event_id.isdigit() and int(last_event_id) > self._seq:
+            # The client's last worker may have polled a moment before this one.
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"❌ Event poll failed: {e}")
+        with self._cond:
+            self.subscribers += 1
+            after = self._parse(last_event_id)
+            if after is None:
+                after = self._seq
+                pending = [(after, "reset", "{}")]
+            else:
+                pending = self._since(after)
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                for seq, event, payload in pending:
+                    yield self._format(seq, event, payload)
+                    after = max(after, seq)
+                with self._cond:
+                    pending = self._since(after)
+                    if not pending:
+                        self._cond.wait(self.heartbeat)
+                        pending = self._since(after)
+                if not pending:
+                    yield ": ping\n\n"
+        finally:
+            with self._cond:
+                self.subscribers -= 1
+
+    def stats(self):
+        with self._cond:
+            return {"subscribers": self.subscribers, "buffered": len(self._buffer), "last_id": str(self._seq),
+                    "polling": self._poller is not None, "cooperative": self.cooperative}
+
+
+def _threading_patched():
+    """True when gevent has monkey-patched threading, making Condition waits cooperative."""
+    try:
+        from gevent import monkey
+    except ImportError:
+        return False
+    return monkey.is_module_patched("threading")
+
+
+def get_broker(app=None):
+    app = app or current_app
+    return app.extensions['event_broker']
+
+def init_app(app):
+    def fetch(after, limit):
+        # Runs on the poller thread, outside any request: borrow from the pool directly.
+        pool = get_pool(app)
+        conn = pool.acquire()
+        try:
+            cur = conn.cursor()
+            rows = recent_changes(cur, after, limit)
+            cur.close()
+            return rows
+        finally:
+            pool.release(conn)
+
+    app.extensions['event_broker'] = EventBroker(
+        fetch,
+        buffer_size=app.config['EVENT_BUFFER_SIZE'],
+        heartbeat=app.config['EVENT_HEARTBEAT'],
+        poll_interval=app.config['EVENT_POLL_INTERVAL'],
+    )
@@ -0,0 +1,56 @@
+from app import stats as impact
+from app.cache import invalidate_feed, invalidate_user_stats
+from app.changelog import log_changes
+from app.conditional import touch
+
+def sweep(conn, batch_size=500, max_batches=20):
+    """
+    Flips overdue active posts to 'expired' and closes their pending claims.
+
+    Works in batches of `batch_size` posts, one transaction each, so a large
+    backlog never holds locks for long; at most `max_batches` run per sweep.
+    Returns {"posts": n, "claims": n} with the number of rows touched.
+    """
+    cur = conn.cursor()
+    touched = {"posts": 0, "claims": 0}
+    users = set()
+    for _ in range(max_batches):
+        cur.execute("""
+            SELECT id, user_id FROM posts
+            WHERE status='active' AND expires_at <= NOW()
+            ORDER BY expires_at
+            LIMIT ?
+            FOR UPDATE
+        """, (batch_size,))
+        rows = cur.fetchall()
+        if not rows:
+            conn.commit()
+            break
+        ids = [r[0] for r in rows]
+        marks = ",".join("?" * len(ids))
+
+        cur.execute(f"SELECT DISTINCT claimer_id FROM claims WHERE status='pending' AND post_id IN ({marks})", tuple(ids))
+        users.update(r[0] for r in cur.fetchall())
+        cur.execute(f"UPDATE claims SET status='expired', decided_at=NOW() WHERE status='pending' AND post_id IN ({marks})", tuple(ids))
+        closed = cur.rowcount
+
+        cur.execute(f"UPDATE posts SET status='expired' WHERE status='active' AND id IN ({marks})", tuple(ids))
+        expired = cur.rowcount
+        # Shared rows in the order every write path takes them: counters, posts version, claims version.
+        impact.record_transition(cur, "active", "expired", count=expired)
+        log_changes(cur, ids, "update")
+        if closed:
+            touched["claims"] += closed
+            touch(cur, "claims")
+        touched["posts"] += expired
+        users.update(r[1] for r in rows)
+        conn.commit()
+        if len(rows) < batch_size:
+            break
+    cur.close()
+
+    if touched["posts"]:
+        invalidate_feed()
+        invalidate_user_stats(*users)
+        print(f"Expiry sweep: {touched['posts']} posts expired, {touched['claims']} pending claims closed")
+    return touched
@@ -0,0 +1,303 @@
+import base64
+import json
+import re
+from datetime import datetime
+
+from flask import current_app
+
+from app.utils import compact_rows, split_tags
+from app.cache import get_feed_cache, feed_cache_key
+from app.fields import POST_FIELDS, select_list
+
+FEED_COLUMNS = select_list(POST_FIELDS, POST_FIELDS)
+
+# sort name -> (column, direction) used for keyset pagination; id breaks ties.
+SORTS = {
+    "newest": ("created_at", "DESC"),
+    "endingSoon": ("expires_at", "ASC"),
+    "relevance": ("relevance", "DESC"),
+}
+
+# expires_sort (db/migrations/0010_posts_expires_sort.sql) of a post that never expires.
+NO_EXPIRY = "9999-12-31 23:59:59"
+
+# Matches the ft_posts_search FULLTEXT index (db/migrations/0003_posts_fulltext.sql).
+MATCH_EXPR = "MATCH(p.title, p.description, p.category, p.location) AGAINST (? IN BOOLEAN MODE)"
+# Relevance ordered and paged in integer buckets: exact equality on raw float
+# scores is unreliable for the keyset condition.
+RELEVANCE_EXPR = f"FLOOR({MATCH_EXPR} * 1000)"
+# InnoDB ignores words shorter than innodb_ft_min_token_size (3 by default).
+MIN_TOKEN_SIZE = 3
+# Columns of the full-text index, also searched for words too short for it.
+SEARCH_COLUMNS = ("p.title", "p.description", "p.category", "p.location")
+
+class InvalidCursor(ValueError):
+    """Raised when a client sends a cursor we did not issue."""
+
+def feed_filters(args):
+    """
+    Normalizes feed query-string arguments into a filter dict.
+    """
+    search = args.get("search", "").strip()
+    sort = args.get("sort") or ("relevance" if search else "newest")
+    if sort not in SORTS or (sort == "relevance" and not fulltext_query(search)):
+        sort = "newest"
+    return {
+        "status": args.get("status", "available"),
+        "search": search,
+        "type": args.get("type", "All Types"),
+        # Unknown tags are kept: no post carries them, so they match nothing rather than being ignored.
+        "dietary": tuple(split_tags(args.get("dietary", ""))),
+        "dietary_mode": "any" if args.get("dietary_mode") == "any" else "all",
+        "sort": sort,
+    }
+
+def search_tokens(search):
+    """
+    Splits a search string into lower-cased word tokens.
+    """
+    return re.findall(r"\w+", search.lower())
+
+def fulltext_query(search):
+    """
+    Builds a boolean-mode query requiring every token, each as a prefix
+    ("veg piz" -> "+veg* +piz*"). Returns None if no token is long enough
+    for the full-text index; see short_tokens() for the others.
+    """
+    tokens = [t for t in search_tokens(search) if len(t) >= MIN_TOKEN_SIZE]
+    if not tokens:
+        return None
+    return " ".join(f"+{t}*" for t in tokens)
+
+def short_tokens(search):
+    """
+    Tokens the full-text index can't match. Each must still appear somewhere
+    in the searched columns. A search with no word characters at all is
+    matched as one literal substring.
+    """
+    tokens = search_tokens(search)
+    if not tokens:
+        return [search.lower()]
+    return list(dict.fromkeys(t for t in tokens if len(t) < MIN_TOKEN_SIZE))
+
+def like_pattern(text):
+    """A LIKE pattern matching `text` anywhere, with LIKE wildcards escaped."""
+    return "%" + text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+
+def page_size(value, default, maximum):
+    """
+    Parses a client supplied page size, clamped to [1, maximum].
+    """
+    try:
+        return max(1, min(int(value), maximum))
+    except (TypeError, ValueError):
+        return default
+
+def encode_cursor(sort, row):
+    """
+    Builds an opaque cursor pointing just after `row` in `sort` order.
+    """
+    value = row[SORTS[sort][0]]
+    if isinstance(value, datetime):
+        value = value.strftime("%Y-%m-%d %H:%M:%S.%f")
+    raw = json.dumps([sort, value, row["id"]], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(token, sort):
+    """
+    Returns (value, id) from a cursor issued by encode_cursor for the same sort.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        cur_sort, value, last_id = json.loads(raw)
+    except Exception:
+        raise InvalidCursor("Malformed cursor")
+    if cur_sort != sort or not isinstance(last_id, int):
+        raise InvalidCursor("Cursor does not match the requested sort")
+    return value, last_id
+
+def _where(filters):
+    clauses, params = [], []
+    status_filter = filters["status"]
+    # The expiry sweep (app/expiry.py) keeps status current; the expires_at
+    # checks cover posts it hasn't reached yet (jobs disabled, stalled or behind).
+    if status_filter == "available":
+        clauses.append("p.status='active' AND (p.expires_at IS NULL OR p.expires_at > NOW())")
+    elif status_filter == "claimed":
+        clauses.append("p.status='claimed'")
+    elif status_filter == "expired":
+        clauses.append("(p.status='expired' OR (p.status='active' AND p.expires_at <= NOW()))")
+
+    search = filters["search"]
+    if search:
+        ft = fulltext_query(search)
+        if ft:
+            clauses.append(MATCH_EXPR)
+            params.append(ft)
+        # The index can't see short words ("5 kg rice"); they must match too, as substrings.
+        for token in short_tokens(search):
+            clauses.append("(" + " OR ".join(f"{col} LIKE ?" for col in SEARCH_COLUMNS) + ")")
+            params.extend([like_pattern(token)] * len(SEARCH_COLUMNS))
+
+    cat_filter = filters["type"]
+    if cat_filter and cat_filter.lower() != "all types" and cat_filter.lower() != "all":
+        clauses.append("p.category = ?")
+        params.append(cat_filter)
+
+    tags = filters["dietary"]
+    if tags:
+        marks = ",".join("?" * len(tags))
+        if filters["dietary_mode"] == "any":
+            clauses.append(f"EXISTS (SELECT 1 FROM post_tags t WHERE t.post_id=p.id AND t.tag IN ({marks}))")
+            params.extend(tags)
+        else:
+            clauses.append(f"p.id IN (SELECT t.post_id FROM post_tags t WHERE t.tag IN ({marks}) GROUP BY t.post_id HAVING COUNT(*) = ?)")
+            params.extend(tags)
+            params.append(len(tags))
+    return clauses, params
+
+def _keyset(sort, cursor, ft=None):
+    """
+    Returns the (clause, params) that resume after `cursor`, plus the ORDER BY.
+    Rows with no expiry sort last for endingSoon: they are ordered by the
+    indexed expires_sort column, which maps a NULL expiry to NO_EXPIRY.
+    Relevance pages are only approximately stable: scores depend on
+    index-wide word statistics, so posts added between two pages can move
+    rows across the boundary and make them repeat or be skipped.
+    """
+    if sort == "relevance":
+        order = "relevance DESC, p.id DESC"
+        if cursor is None:
+            return None, [], order
+        value, last_id = cursor
+        return (f"({RELEVANCE_EXPR} < ? OR ({RELEVANCE_EXPR} = ? AND p.id < ?))",
+                [ft, value, ft, value, last_id], order)
+
+    if sort == "newest":
+        order = "p.created_at DESC, p.id DESC"
+        if cursor is None:
+            return None, [], order
+        value, last_id = cursor
+        return "(p.created_at < ? OR (p.created_at = ? AND p.id < ?))", [value, value, last_id], order
+
+    order = "p.expires_sort ASC, p.id ASC"
+    if cursor is None:
+        return None, [], order
+    value, last_id = cursor
+    if value is None:
+        value = NO_EXPIRY
+    return "(p.expires_sort > ? OR (p.expires_sort = ? AND p.id > ?))", [value, value, last_id], order
+
+def _page_query(filters, cursor, limit, columns):
+    """
+    Builds the keyset-paginated query for one feed page.
+    It selects limit + 1 rows; the extra row only tells whether a next page exists.
+    """
+    sort = filters["sort"]
+    select_params = []
+    ft = None
+    if sort == "relevance":
+        ft = fulltext_query(filters["search"])
+        columns += f", {RELEVANCE_EXPR} AS relevance"
+        select_params.append(ft)
+
+    clauses, params = _where(filters)
+    after = decode_cursor(cursor, sort) if cursor else None
+    keyset, keyset_params, order = _keyset(sort, after, ft)
+    if keyset:
+        clauses.append(keyset)
+        params.extend(keyset_params)
+    params = select_params + params
+
+    query = f"SELECT {columns} FROM posts p JOIN users u ON p.user_id=u.id"
+    if clauses:
+        query += " WHERE " + " AND ".join(clauses)
+    query += f" ORDER BY {order} LIMIT ?"
+    params.append(limit + 1)
+    return query, tuple(params)
+
+def feed_page(cur, filters, cursor=None, limit=20, columns=FEED_COLUMNS):
+    """
+    Fetches one page of the feed using keyset pagination.
+    Returns (posts, next_cursor); next_cursor is None on the last page.
+    """
+    sort = filters["sort"]
+    cur.execute(*_page_query(filters, cursor, limit, columns))
+    posts = compact_rows(cur.fetchall(), cur.description)
+    next_cursor = None
+    if len(posts) > limit:
+        posts = posts[:limit]
+        next_cursor = encode_cursor(sort, posts[-1])
+    return posts, next_cursor
+
+def cached_feed_page(cur, filters, cursor=None, limit=20, columns=FEED_COLUMNS):
+    """
+    feed_page() served from the in-process feed cache when possible.
+    Write paths clear the cache through app.cache.invalidate_feed().
+    """
+    cache = get_feed_cache()
+    key = feed_cache_key(filters, cursor, limit, columns)
+    hit = cache.get(key)
+    if hit is not None:
+        return hit
+    token = cache.token(key)
+    result = feed_page(cur, filters, cursor, limit, columns)
+    cache.set(key, result, token)
+    return result
+
+
+class FeedStream:
+    """
+    One feed page as an iterable for streamed templates (flask.stream_template).
+
+    The query runs when iteration starts, not when the object is built, and
+    rows are handed out in fetchmany() batches as the driver returns them,
+    so the page shell can be sent before the feed query even runs. Use an
+    unbuffered cursor; it is closed once the page has been read.
+    `next_cursor` is only known after iteration. A page already in the feed
+    cache is replayed from it, and a page read from the database is cached
+    once complete, exactly like cached_feed_page().
+    """
+
+    def __init__(self, cur, filters, cursor=None, limit=20, columns=FEED_COLUMNS, batch_size=None):
+        self.cur = cur
+        self.filters = filters
+        self.cursor = cursor
+        self.limit = limit
+        self.columns = columns
+        self.batch_size = batch_size or current_app.config['STREAM_BATCH_SIZE']
+        self.next_cursor = None
+
+    def __iter__(self):
+        cache = get_feed_cache()
+        key = feed_cache_key(self.filters, self.cursor, self.limit, self.columns)
+        try:
+            hit = cache.get(key)
+            if hit is not None:
+                posts, self.next_cursor = hit
+                yield from posts
+                return
+            token = cache.token(key)
+            self.cur.execute(*_page_query(self.filters, self.cursor, self.limit, self.columns))
+            posts = []
+            more = False
+            while True:
+                rows = self.cur.fetchmany(self.batch_size)
+                if not rows:
+                    break
+                for post in compact_rows(rows, self.cur.description):
+                    if len(posts) == self.limit:
+                        # The extra row: keep draining so the connection is free again.
+                        more = True
+                        continue
+                    posts.append(post)
+                    yield post
+            if more:
+                self.next_cursor = encode_cursor(self.filters["sort"], posts[-1])
+            cache.set(key, (posts, self.next_cursor), token)
+        except Exception as e:
+            # Part of the page may already be sent; end it here rather than break the response.
+            print("❌ Feed error:", e)
+        finally:
+            self.cur.close()
@@ -0,0 +1,78 @@
+# Public field name -> SQL expression for each list endpoint. Only these can be
+# requested with ?fields=, so client input never reaches the SELECT list.
+POST_FIELDS = {
+    "id": "p.id",
+    "user_id": "p.user_id",
+    "title": "p.title",
+    "description": "p.description",
+    "category": "p.category",
+    "quantity": "p.quantity",
+    "estimated_weight_kg": "p.estimated_weight_kg",
+    "dietary_json": "p.dietary_json",
+    "location": "p.location",
+    "pickup_window_start": "p.pickup_window_start",
+    "pickup_window_end": "p.pickup_window_end",
+    "expires_at": "p.expires_at",
+    "expiry_minutes": "p.expiry_minutes",
+    "status": "p.status",
+    "image_url": "p.image_url",
+    "image_thumb_url": "p.image_thumb_url",
+    "created_at": "p.created_at",
+    "owner_email": "u.email",
+}
+
+CLAIM_FIELDS = {
+    "id": "c.id",
+    "post_id": "c.post_id",
+    "claimer_id": "c.claimer_id",
+    "message": "c.message",
+    "requested_quantity": "c.requested_quantity",
+    "status": "c.status",
+    "created_at": "c.created_at",
+    "decided_at": "c.decided_at",
+    "post_title": "p.title",
+}
+
+# /api/claims/mine joins the post owner, /api/claims/for-my-posts the claimer.
+MY_CLAIM_FIELDS = dict(CLAIM_FIELDS, location="p.location", expires_at="p.expires_at", owner_email="u.email")
+INCOMING_CLAIM_FIELDS = dict(CLAIM_FIELDS, claimer_email="u.email")
+
+
+class InvalidFields(ValueError):
+    """Raised when ?fields= names a field the endpoint does not offer."""
+
+
+def requested_fields(args, allowed, required=()):
+    """
+    Parses ?fields=a,b,c against `allowed`. Returns the field names in request
+    order, with any `required` ones (e.g. pagination keys) appended; all
+    fields when the parameter is absent. Required names that aren't fields
+    (computed columns such as the feed's relevance score) are skipped.
+    """
+    raw = args.get("fields", "")
+    if not raw.strip():
+        return list(allowed)
+    names = []
+    for name in raw.split(","):
+        name = name.strip()
+        if not name or name in names:
+            continue
+        if name not in allowed:
+            raise InvalidFields(f"Unknown field: {name}")
+        names.append(name)
+    names.extend(n for n in required if n in allowed and n not in names)
+    return names
+
+def select_list(names, allowed):
+    """Builds the SELECT list for field names from requested_fields()."""
+    return ", ".join(f"{allowed[n]} AS {n}" for n in names)
+
+def wants_columnar(args):
+    return args.get("format") == "columnar"
+
+def columnar(rows, columns):
+    """
+    Turns row objects into {"columns": [...], "rows": [[...], ...]} so each
+    column name is sent once instead of once per row.
+    """
+    return {"columns": list(columns), "rows": [[row[c] for c in columns] for row in rows]}
@@ -0,0 +1,107 @@
+import io
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+
+from app.db import get_db
+from app.cache import invalidate_feed
+from app.changelog import log_change
+from app.storage import get_storage
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # uploads are kept as-is
+    Image = None
+
+# posts column -> config key holding the variant's max width/height in pixels
+VARIANTS = {
+    "image_url": "IMAGE_MAX_DIMENSION",
+    "image_thumb_url": "IMAGE_THUMB_SIZE",
+}
+EXTENSIONS = {"WEBP": ".webp", "JPEG": ".jpg"}
+
+def render_variants(src, sizes, fmt="WEBP", quality=80):
+    """
+    Re-encodes the image in `src` (a path or binary file) once per entry of
+    `sizes` ({name: max_dimension}), each scaled down to fit within
+    max_dimension. The EXIF orientation is applied to the pixels and no
+    metadata (EXIF, GPS, ICC comments) is written out.
+    Returns {name: encoded bytes}.
+    """
+    out = {}
+    with Image.open(src) as im:
+        # JPEG can decode at 1/2, 1/4 or 1/8 scale, far cheaper than a full decode.
+        largest = max(sizes.values())
+        im.draft("RGB", (largest, largest))
+        im = ImageOps.exif_transpose(im)
+        keep_alpha = fmt == "WEBP" and (im.mode in ("RGBA", "LA") or "transparency" in im.info)
+        im = im.convert("RGBA" if keep_alpha else "RGB")
+        for name, size in sorted(sizes.items(), key=lambda item: -item[1]):
+            # Each variant is cut from the previous, larger one.
+            im.thumbnail((size, size), Image.Resampling.LANCZOS)
+            buf = io.BytesIO()
+            if fmt == "WEBP":
+                im.save(buf, "WEBP", quality=quality, method=4)
+            else:
+                im.save(buf, "JPEG", quality=quality, optimize=True, progressive=True)
+            out[name] = buf.getvalue()
+    return out
+
+def process_upload(app, post_id, key):
+    """
+    Worker task: stores the variants of one uploaded photo and points the post
+    at them. On any failure the post keeps the original. Objects left
+    unreferenced either way (the original, or variants of a post deleted
+    meanwhile) are removed by the upload GC job (app/storage.py).
+    """
+    with app.app_context():
+        config = app.config
+        fmt = config['IMAGE_FORMAT']
+        storage = get_storage()
+        try:
+            with storage.open(key) as src:
+                encoded = render_variants(src, {col: config[size] for col, size in VARIANTS.items()},
+                                          fmt, config['IMAGE_QUALITY'])
+            urls = {col: storage.url(storage.save(io.BytesIO(data), EXTENSIONS[fmt]))
+                    for col, data in encoded.items()}
+        except Exception as e:
+            print(f"❌ Image processing failed for post {post_id}: {e}")
+            return
+
+        conn = get_db()
+        if conn is None:
+            return
+        try:
+            cur = conn.cursor()
+            # Only if the post still shows this upload (it may have been deleted or replaced).
+            cur.execute(
+                "UPDATE posts SET image_url=?, image_thumb_url=? WHERE id=? AND image_url=?",
+                (urls["image_url"], urls["image_thumb_url"], post_id, storage.url(key))
+            )
+            if cur.rowcount == 0:
+                conn.rollback()
+                return
+            log_change(cur, post_id, "update")
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            print(f"❌ Image variant update failed for post {post_id}: {e}")
+            return
+        invalidate_feed()
+
+def submit(post_id, key):
+    """
+    Queues an uploaded photo (a storage key) for processing. Call after the post has been committed.
+    """
+    pool = current_app.extensions.get('image_pool')
+    if pool is None:
+        return
+    pool.submit(process_upload, current_app._get_current_object(), post_id, key)
+
+def init_app(app):
+    if Image is None:
+        print("❌ Pillow is not installed; uploaded images will be served as uploaded")
+        return
+    app.extensions['image_pool'] = ThreadPoolExecutor(
+        max_workers=app.config['IMAGE_WORKERS'], thread_name_prefix="image"
+    )
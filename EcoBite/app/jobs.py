@@ -0,0 +1,69 @@
+import os
+from datetime import datetime
+
+from apscheduler.schedulers.background import BackgroundScheduler
+
+from app.db import get_db
+
+def run_job(app, name, func):
+    """
+    Runs `func(conn)` inside an app context with a pooled connection.
+    """
+    with app.app_context():
+        try:
+            conn = get_db()
+            if conn is None:
+                return
+            func(conn)
+        except Exception as e:
+            print(f"❌ {name} job failed: {e}")
+
+def init_app(app):
+    """
+    Starts the background scheduler for periodic maintenance jobs.
+    """
+    if not app.config['JOBS_ENABLED']:
+        return
+    # The debug reloader imports the app twice; only schedule in the serving process.
+    if app.debug and os.environ.get("WERKZEUG_RUN_MAIN") != "true":
+        return
+
+    from app import stats, expiry, changelog, storage
+
+    def sweep(conn):
+        return expiry.sweep(conn, app.config['EXPIRY_BATCH_SIZE'], app.config['EXPIRY_MAX_BATCHES'])
+
+    def reconcile(conn):
+        # Sweep first: reconcile leaves overdue posts out of available_posts,
+        # and the sweep's own active -> expired transition would count them twice.
+        sweep(conn)
+        stats.reconcile(conn)
+
+    scheduler = BackgroundScheduler(daemon=True)
+    scheduler.add_job(
+        run_job, "interval", args=(app, "Stats reconcile", reconcile),
+        seconds=app.config['STATS_RECONCILE_INTERVAL'], id="stats_reconcile",
+        max_instances=1, coalesce=True,
+    )
+    scheduler.add_job(
+        run_job, "interval",
+        args=(app, "Expiry sweep", sweep),
+        seconds=app.config['EXPIRY_SWEEP_INTERVAL'], id="expiry_sweep",
+        max_instances=1, coalesce=True, next_run_time=datetime.now(),
+    )
+    scheduler.add_job(
+        run_job, "interval",
+        args=(app, "Change log compaction", lambda conn: changelog.compact(
+            conn, app.config['CHANGELOG_RETENTION_DAYS'])),
+        hours=1, id="changelog_compact",
+        max_instances=1, coalesce=True,
+    )
+    scheduler.add_job(
+        run_job, "interval",
+        args=(app, "Upload GC", lambda conn: storage.collect(
+            conn, storage.get_storage(app), app.config['UPLOAD_GC_GRACE'])),
+        seconds=app.config['UPLOAD_GC_INTERVAL'], id="upload_gc",
+        max_instances=1, coalesce=True,
+    )
+    scheduler.start()
+    app.extensions['scheduler'] = scheduler
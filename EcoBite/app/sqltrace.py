@@ -0,0 +1,177 @@
+import re
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+from flask import current_app, g, has_request_context, request
+
+_STRING = re.compile(r"'(?:[^'\\]|\\.|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDERS = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+
+def normalize(sql):
+    """
+    Reduces a statement to its shape: literals become ?, placeholder lists
+    (IN (?, ?, ?), VALUES (...)) collapse to (...), whitespace to single spaces.
+    Statements that differ only in their parameters normalize the same.
+    """
+    sql = _STRING.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _PLACEHOLDERS.sub("(...)", sql)
+    return " ".join(sql.split())
+
+
+class Statement:
+    __slots__ = ("sql", "duration", "rows", "failed")
+
+    def __init__(self, sql, duration, rows, failed=False):
+        self.sql = sql
+        self.duration = duration  # seconds
+        self.rows = rows          # rows returned or affected; counted on fetch for unbuffered cursors
+        self.failed = failed
+
+
+class TracedCursor:
+    """
+    Wraps a DB-API cursor and records every execute() into the request trace.
+    Everything else is passed through to the real cursor.
+    """
+
+    def __init__(self, cursor, tracer):
+        self._cursor = cursor
+        self._tracer = tracer
+        self._last = None
+        self._counting = False
+
+    def execute(self, sql, *args, **kwargs):
+        return self._run(self._cursor.execute, sql, args, kwargs)
+
+    def executemany(self, sql, *args, **kwargs):
+        return self._run(self._cursor.executemany, sql, args, kwargs)
+
+    def _run(self, method, sql, args, kwargs):
+        started = time.perf_counter()
+        try:
+            result = method(sql, *args, **kwargs)
+        except Exception:
+            self._last = self._tracer.record(sql, time.perf_counter() - started, 0, failed=True)
+            raise
+        rowcount = self._cursor.rowcount
+        self._last = self._tracer.record(sql, time.perf_counter() - started, max(rowcount, 0))
+        # Unbuffered SELECTs report -1 until read; count the rows as they are fetched.
+        self._counting = rowcount < 0
+        return result
+
+    def _count(self, rows):
+        if self._last is not None and self._counting:
+            self._last.rows += rows
+        return rows
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        if row is not None:
+            self._count(1)
+        return row
+
+    def fetchmany(self, *args):
+        rows = self._cursor.fetchmany(*args)
+        self._count(len(rows))
+        return rows
+
+    def fetchall(self):
+        rows = self._cursor.fetchall()
+        self._count(len(rows))
+        return rows
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class SQLTracer:
+    """
+    Opt-in per-request SQL instrumentation (SQL_TRACE).
+
+    Cursors from app.db.get_cursor() are wrapped so each statement is timed
+    and recorded in the current request's trace. At the end of the request
+    the totals go out as a Server-Timing header, statement shapes run
+    `repeat_threshold` times or more are reported as likely N+1 queries,
+    and statements slower than `slow_ms` are appended to the slow-query log.
+
+    Statements run while a streamed body is sent (stream_rows, FeedStream)
+    happen after the headers are out; they still reach the slow-query log.
+    """
+
+    def __init__(self, slow_ms=200.0, repeat_threshold=5, slow_log=None):
+        self.slow_ms = slow_ms
+        self.repeat_threshold = repeat_threshold
+        self.slow_log = slow_log
+        self._log_lock = threading.Lock()
+
+    def wrap(self, cursor):
+        return TracedCursor(cursor, self)
+
+    def statements(self):
+        if 'sql_trace' not in g:
+            g.sql_trace = []
+        return g.sql_trace
+
+    def record(self, sql, duration, rows, failed=False):
+        statement = Statement(normalize(sql), duration, rows, failed)
+        self.statements().append(statement)
+        if duration * 1000 >= self.slow_ms:
+            self._log_slow(statement)
+        return statement
+
+    def _log_slow(self, statement):
+        where = f"{request.method} {request.path}" if has_request_context() else "-"
+        line = (f"{datetime.now().isoformat(timespec='seconds')} {statement.duration * 1000:.1f}ms "
+                f"rows={statement.rows} {where} {statement.sql}\n")
+        if not self.slow_log:
+            print(f"🐢 Slow query: {line}", end="")
+            return
+        try:
+            with self._log_lock, open(self.slow_log, "a", encoding="utf-8") as f:
+                f.write(line)
+        except OSError as e:
+            print(f"❌ Slow query log failed: {e}")
+
+    def repeated(self, statements):
+        """Returns {shape: count} for SELECT shapes run at least repeat_threshold times."""
+        counts = Counter(s.sql for s in statements if s.sql[:6].upper() == "SELECT")
+        return {sql: n for sql, n in counts.items() if n >= self.repeat_threshold}
+
+    def finish(self, response):
+        statements = g.pop('sql_trace', None)
+        if not statements:
+            return response
+        total = sum(s.duration for s in statements) * 1000
+        rows = sum(s.rows for s in statements)
+        timings = [f'db;dur={total:.1f};desc="{len(statements)} queries, {rows} rows"']
+        repeated = self.repeated(statements)
+        if repeated:
+            timings.append(f'db-repeated;desc="{len(repeated)} N+1 query shapes"')
+            for sql, n in repeated.items():
+                print(f"❌ Possible N+1 in {request.method} {request.path}: {n}x {sql}")
+        response.headers.add("Server-Timing", ", ".join(timings))
+        return response
+
+
+def get_tracer(app=None):
+    app = app or current_app
+    return app.extensions.get('sql_tracer')
+
+def init_app(app):
+    config = app.config
+    if not config['SQL_TRACE']:
+        return
+    tracer = SQLTracer(
+        slow_ms=config['SQL_SLOW_MS'],
+        repeat_threshold=config['SQL_REPEAT_THRESHOLD'],
+        slow_log=config['SQL_SLOW_LOG'],
+    )
+    app.extensions['sql_tracer'] = tracer
+    app.after_request(tracer.finish)
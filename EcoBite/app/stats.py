@@ -0,0 +1,143 @@
+from app.db import get_cursor
+from app.cache import get_user_stats_cache
+from app.conditional import touch
+
+# Post status -> impact counter bucket. Statuses not listed only count toward total_posts.
+BUCKETS = {
+    "active": "available_posts",
+    "claimed": "shared_posts",
+    "completed": "shared_posts",
+}
+
+# Every status a post can be set to.
+POST_STATUSES = ("active", "claimed", "completed", "expired")
+
+def _update_counters(cur, sets, params=()):
+    # The stats version (ETag of /api/stats/global) is bumped with the counters.
+    # Both rows are held until commit, so writers that move the counters queue
+    # behind each other; they already did on the counters row alone, so the
+    # version adds no new contention.
+    cur.execute(f"UPDATE impact_counters SET {', '.join(sets)} WHERE id=1", tuple(params))
+    touch(cur, "stats")
+
+def record_post_created(cur):
+    """
+    Counts a new active post. Runs inside the caller's transaction.
+    """
+    _update_counters(cur, ["total_posts=total_posts+1", "available_posts=available_posts+1"])
+
+def record_transition(cur, old_status, new_status, weight=0, count=1):
+    """
+    Moves a post between impact counter buckets, e.g. active -> claimed.
+    `weight` is the post's estimated_weight_kg (the total when `count` posts move at once).
+    Runs inside the caller's transaction.
+    """
+    sets, params = _transition(old_status, new_status, weight, count)
+    if sets:
+        _update_counters(cur, sets, params)
+
+def _transition(old_status, new_status, weight=0, count=1):
+    """Returns the SET clauses and parameters that move `count` posts between buckets."""
+    old_bucket, new_bucket = BUCKETS.get(old_status), BUCKETS.get(new_status)
+    sets = []
+    params = []
+    if old_bucket != new_bucket and count:
+        if old_bucket:
+            sets.append(f"{old_bucket}={old_bucket}-{int(count)}")
+        if new_bucket:
+            sets.append(f"{new_bucket}={new_bucket}+{int(count)}")
+        if old_bucket == "shared_posts":
+            sets.append("shared_weight_kg=shared_weight_kg-?")
+            params.append(float(weight or 0))
+        if new_bucket == "shared_posts":
+            sets.append("shared_weight_kg=shared_weight_kg+?")
+            params.append(float(weight or 0))
+    return sets, params
+
+def global_stats():
+    """
+    Reads the materialized impact counters. Returns None if they are unavailable.
+    """
+    cur = get_cursor()
+    if cur is None:
+        return None
+    cur.execute("SELECT total_posts, available_posts, shared_posts, shared_weight_kg FROM impact_counters WHERE id=1")
+    row = cur.fetchone()
+    if not row:
+        return None
+    total, available, shared, weight = row
+    return {
+        "available_now": max(0, available),
+        "successfully_shared": max(0, shared),
+        "total_posts": max(0, total),
+        "food_waste_prevented_kg": round(max(0.0, float(weight or 0)), 3),
+    }
+
+def reconcile(conn):
+    """
+    Recomputes the counters from the posts table in one statement, correcting drift.
+    Overdue posts are not counted as available; run the expiry sweep first
+    (the scheduled job does) so they are not subtracted again when swept.
+    Bumps the stats version only when a counter actually changed.
+    """
+    cur = conn.cursor()
+    cur.execute("""
+        UPDATE impact_counters c
+        JOIN (
+            SELECT COUNT(*) AS total_posts,
+                   COUNT(CASE WHEN status='active' AND (expires_at IS NULL OR expires_at > NOW()) THEN 1 END) AS available_posts,
+                   COUNT(CASE WHEN status IN ('claimed', 'completed') THEN 1 END) AS shared_posts,
+                   COALESCE(SUM(CASE WHEN status IN ('claimed', 'completed') THEN estimated_weight_kg END), 0) AS shared_weight_kg
+            FROM posts
+        ) a
+        SET c.total_posts=a.total_posts, c.available_posts=a.available_posts,
+            c.shared_posts=a.shared_posts, c.shared_weight_kg=a.shared_weight_kg
+        WHERE c.id=1
+    """)
+    if cur.rowcount:
+        touch(cur, "stats")
+    cur.execute("UPDATE impact_counters SET reconciled_at=NOW() WHERE id=1")
+    conn.commit()
+    cur.close()
+
+def user_stats(user_id):
+    """
+    Everything the profile shows for one user, from a single aggregate query.
+    Cached per user; write paths call app.cache.invalidate_user_stats().
+    Returns None if the database is unavailable.
+    """
+    cache = get_user_stats_cache()
+    stats = cache.get(user_id)
+    if stats is not None:
+        return stats
+    token = cache.token(user_id)
+
+    cur = get_cursor()
+    if cur is None:
+        return None
+    cur.execute("""
+        SELECT
+            (SELECT created_at FROM users WHERE id=?) AS join_date,
+            p.posts_created, p.posts_available, p.posts_claimed, p.posts_shared, p.weight_shared_kg,
+            c.claims_made, c.claims_accepted, c.claims_rejected
+        FROM (
+            SELECT COUNT(*) AS posts_created,
+                   COUNT(CASE WHEN status='active' AND (expires_at IS NULL OR expires_at > NOW()) THEN 1 END) AS posts_available,
+                   COUNT(CASE WHEN status='claimed' THEN 1 END) AS posts_claimed,
+                   COUNT(CASE WHEN status IN ('claimed', 'completed') THEN 1 END) AS posts_shared,
+                   SUM(CASE WHEN status IN ('claimed', 'completed') THEN estimated_weight_kg END) AS weight_shared_kg
+            FROM posts WHERE user_id=?
+        ) p
+        CROSS JOIN (
+            SELECT COUNT(*) AS claims_made,
+                   COUNT(CASE WHEN status='approved' THEN 1 END) AS claims_accepted,
+                   COUNT(CASE WHEN status='rejected' THEN 1 END) AS claims_rejected
+            FROM claims WHERE claimer_id=?
+        ) c
+    """, (user_id, user_id, user_id))
+    row = cur.fetchone()
+    cols = [d[0] for d in cur.description]
+    stats = dict(zip(cols, row))
+    stats["weight_shared_kg"] = float(stats["weight_shared_kg"]) if stats["weight_shared_kg"] else 0.0
+    cache.set(user_id, stats, token)
+    return stats
@@ -0,0 +1,216 @@
+import hashlib
+import os
+import re
+import tempfile
+import time
+from abc import ABC, abstractmethod
+
+from flask import current_app
+
+from app.uploads import UploadSpool
+
+# "ab/cd/<sha256>.ext": the first two byte pairs of the hash shard the directory tree.
+KEY = re.compile(r"^[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.[a-z0-9]+$")
+
+def make_key(digest, ext):
+    return f"{digest[:2]}/{digest[2:4]}/{digest}{ext.lower()}"
+
+
+class Storage(ABC):
+    """
+    Interface of an upload store.
+
+    Objects are immutable and addressed by the SHA-256 of their content, so
+    saving the same bytes twice returns the same key and stores them once.
+    Posts reference objects by URL; nothing tracks reference counts, and
+    collect() below deletes objects no post points at any more.
+    An object-store backend implements the same methods.
+    """
+
+    @abstractmethod
+    def save(self, stream, ext):
+        """Stores a file-like object's content and returns its key."""
+
+    @abstractmethod
+    def open(self, key):
+        """Returns a binary file object for reading the stored content."""
+
+    @abstractmethod
+    def delete(self, key):
+        """Removes an object; a key that doesn't exist is not an error."""
+
+    @abstractmethod
+    def url(self, key):
+        """Returns the public URL of an object."""
+
+    @abstractmethod
+    def key_for_url(self, url):
+        """Returns the key behind a URL from url(), or None for anything else."""
+
+    @abstractmethod
+    def last_used(self, key):
+        """Unix time the object was last written or re-used, or None if it doesn't exist."""
+
+    @abstractmethod
+    def keys(self):
+        """Yields the key of every stored object."""
+
+    def expire_temp(self, cutoff):
+        """Removes temporary files last written before `cutoff` (Unix time), left by interrupted uploads."""
+        return 0
+
+
+class LocalStorage(Storage):
+    """
+    Stores objects under `root` in two levels of shard directories, served
+    by the app's static route under `url_prefix`.
+
+    Uploads are streamed to a temporary file in `temp_dir` while being
+    hashed, then moved into place with an atomic rename (so `temp_dir` must
+    be on the same filesystem as `root`, and outside the served tree); if the object already
+    exists the copy is dropped and the existing file's mtime refreshed so
+    a concurrent collect() treats it as freshly used. An UploadSpool from
+    the request parser is already hashed and on disk, so it is renamed
+    directly.
+    """
+
+    def __init__(self, root, url_prefix, temp_dir, chunk_size=64 * 1024):
+        self.root = root
+        self.url_prefix = url_prefix.rstrip("/")
+        self.chunk_size = chunk_size
+        self._tmp = temp_dir
+
+    def _path(self, key):
+        return os.path.join(self.root, *key.split("/"))
+
+    def save(self, stream, ext):
+        if isinstance(stream, UploadSpool):
+            stream.flush()
+            # The spool removes its file on close() if it wasn't moved.
+            return self._place(stream.path, make_key(stream.sha256, ext))
+        os.makedirs(self._tmp, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self._tmp)
+        digest = hashlib.sha256()
+        try:
+            with os.fdopen(fd, "wb") as f:
+                while True:
+                    chunk = stream.read(self.chunk_size)
+                    if not chunk:
+                        break
+                    digest.update(chunk)
+                    f.write(chunk)
+            return self._place(tmp, make_key(digest.hexdigest(), ext))
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    def _place(self, tmp, key):
+        path = self._path(key)
+        if os.path.exists(path):
+            os.utime(path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(tmp, path)
+        return key
+
+    def open(self, key):
+        return open(self._path(key), "rb")
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def last_used(self, key):
+        try:
+            return os.path.getmtime(self._path(key))
+        except FileNotFoundError:
+            return None
+
+    def url(self, key):
+        return f"{self.url_prefix}/{key}"
+
+    def key_for_url(self, url):
+        if not url or not url.startswith(self.url_prefix + "/"):
+            return None
+        key = url[len(self.url_prefix) + 1:]
+        return key if KEY.match(key) else None
+
+    def keys(self):
+        # Only shard directories: legacy flat uploads are never collected.
+        for root, dirs, files in os.walk(self.root):
+            for name in files:
+                key = os.path.relpath(os.path.join(root, name), self.root).replace(os.sep, "/")
+                if KEY.match(key):
+                    yield key
+
+    def expire_temp(self, cutoff):
+        removed = 0
+        try:
+            entries = list(os.scandir(self._tmp))
+        except FileNotFoundError:
+            return 0
+        for entry in entries:
+            try:
+                if entry.is_file() and entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+                    removed += 1
+            except FileNotFoundError:
+                pass
+        return removed
+
+
+BACKENDS = {"local": LocalStorage}
+
+# Every posts column holding a storage URL.
+IMAGE_COLUMNS = ("image_url", "image_thumb_url")
+
+def get_storage(app=None):
+    app = app or current_app
+    return app.extensions['storage']
+
+def referenced_keys(cur, storage):
+    """
+    Returns the keys some post still points at.
+    """
+    cur.execute(f"SELECT {', '.join(IMAGE_COLUMNS)} FROM posts WHERE image_url IS NOT NULL")
+    keys = set()
+    for row in cur.fetchall():
+        keys.update(k for k in map(storage.key_for_url, row) if k)
+    return keys
+
+def collect(conn, storage, grace):
+    """
+    Deletes stored objects no post references: images of deleted posts and
+    originals replaced by their processed variants. Objects written or
+    re-used in the last `grace` seconds are kept: their post may not be
+    committed yet. Temporary files older than `grace` are removed too.
+    Returns the number of objects deleted.
+    """
+    cur = conn.cursor()
+    live = referenced_keys(cur, storage)
+    conn.rollback()
+    cutoff = time.time() - grace
+    stale = storage.expire_temp(cutoff)
+    if stale:
+        print(f"Upload GC: removed {stale} stale temporary files")
+    deleted = 0
+    for key in storage.keys():
+        if key in live:
+            continue
+        last_used = storage.last_used(key)
+        if last_used is not None and last_used < cutoff:
+            storage.delete(key)
+            deleted += 1
+    if deleted:
+        print(f"Upload GC: deleted {deleted} unreferenced files")
+    return deleted
+
+def init_app(app):
+    config = app.config
+    if not config['UPLOAD_TMP_FOLDER']:
+        config['UPLOAD_TMP_FOLDER'] = os.path.join(app.instance_path, "upload-tmp")
+    app.extensions['storage'] = BACKENDS[config['STORAGE_BACKEND']](
+        config['UPLOAD_FOLDER'], config['UPLOAD_URL_PREFIX'], config['UPLOAD_TMP_FOLDER']
+    )
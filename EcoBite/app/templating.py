@@ -0,0 +1,55 @@
+import os
+
+from flask import current_app, session
+from jinja2 import FileSystemBytecodeCache
+from markupsafe import Markup
+
+from app.cache import ResultCache
+from app.json_provider import isoformat
+
+def get_fragment_cache(app=None):
+    app = app or current_app
+    return app.extensions['fragment_cache']
+
+def fragment_version(row):
+    """
+    Version of a feed row for fragment caching: its displayed values. Any
+    edit, status change or new image variant changes it, so cached markup
+    never has to be invalidated; stale entries age out of the LRU.
+    """
+    return tuple(row[k] for k in row.keys())
+
+def post_card(post):
+    """
+    Template helper: the feed card markup for one post, from the fragment
+    cache when this version of the post was rendered before.
+    """
+    can_request = post["status"] == "active" and post["owner_email"] != session.get("email")
+    key = ("post_card", post["id"], fragment_version(post), can_request)
+    cache = get_fragment_cache()
+    html = cache.get(key)
+    if html is None:
+        template = current_app.jinja_env.get_template("_post_card.html")
+        html = Markup(template.render(post=post, can_request=can_request))
+        cache.set(key, html)
+    return html
+
+def init_app(app):
+    """
+    Persists compiled templates across worker restarts and registers the fragment cache.
+    """
+    if app.config['JINJA_BYTECODE_CACHE']:
+        directory = os.path.join(app.instance_path, "jinja_cache")
+        try:
+            os.makedirs(directory, exist_ok=True)
+            app.jinja_env.bytecode_cache = FileSystemBytecodeCache(directory)
+        except OSError as e:
+            print(f"❌ Template bytecode cache disabled: {e}")
+    app.extensions['fragment_cache'] = ResultCache(
+        max_entries=app.config['FRAGMENT_CACHE_MAX_ENTRIES'],
+        ttl=app.config['FRAGMENT_CACHE_TTL'],
+        dumps=str,
+    )
+    app.add_template_global(post_card)
+    # <time datetime="{{ value|isoformat }}">: app.js shows it like the cards it renders.
+    app.add_template_filter(isoformat)
@@ -0,0 +1,118 @@
+import hashlib
+import os
+import tempfile
+
+from flask import Request, current_app
+from werkzeug.exceptions import RequestEntityTooLarge, UnsupportedMediaType
+
+# Bytes needed to recognise every accepted format.
+SNIFF_SIZE = 12
+
+def sniff(head):
+    """
+    Returns the file extension for the image format in the first bytes of a
+    file, or None if it isn't a JPEG, PNG or WebP image.
+    """
+    if head.startswith(b"\xff\xd8\xff"):
+        return ".jpg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return ".png"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return ".webp"
+    return None
+
+
+class InvalidUpload(UnsupportedMediaType):
+    description = "Uploads must be JPEG, PNG or WebP images."
+
+
+class UploadTooLarge(RequestEntityTooLarge):
+    pass
+
+
+class UploadSpool:
+    """
+    Write target for one uploaded file while the multipart body is parsed.
+
+    Chunks go straight to a temporary file and into a SHA-256 digest, so
+    memory use doesn't depend on the file size. The format is checked as
+    soon as the first bytes arrive and the size on every write; either
+    failure aborts parsing before the rest of the file is read.
+    Once parsed, `ext` is the detected format and `sha256` the content hash;
+    upload storage (app/storage.py) moves the file into place without
+    reading it again. An empty part (a file input left blank) is not
+    checked and keeps `ext` None. The temporary file is removed on close()
+    unless it was moved, and as soon as a check fails.
+    """
+
+    def __init__(self, directory, max_size):
+        os.makedirs(directory, exist_ok=True)
+        fd, self.path = tempfile.mkstemp(dir=directory, suffix=".upload")
+        self._file = os.fdopen(fd, "w+b")
+        self.max_size = max_size
+        self.size = 0
+        self.ext = None
+        self._head = b""
+        self._digest = hashlib.sha256()
+
+    def write(self, chunk):
+        self.size += len(chunk)
+        if self.size > self.max_size:
+            self.close()
+            raise UploadTooLarge(f"Uploads are limited to {self.max_size / (1024 * 1024):g} MB.")
+        if self.ext is None:
+            self._head += chunk[:SNIFF_SIZE]
+            if len(self._head) >= SNIFF_SIZE:
+                self._check()
+        self._digest.update(chunk)
+        return self._file.write(chunk)
+
+    def _check(self):
+        self.ext = sniff(self._head[:SNIFF_SIZE])
+        if self.ext is None:
+            self.close()
+            raise InvalidUpload()
+
+    @property
+    def sha256(self):
+        return self._digest.hexdigest()
+
+    def seek(self, *args):
+        # The parser rewinds once the part is complete; a file too short to sniff ends up here.
+        if self.ext is None and self.size:
+            self._check()
+        return self._file.seek(*args)
+
+    def read(self, *args):
+        return self._file.read(*args)
+
+    def tell(self):
+        return self._file.tell()
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    @property
+    def closed(self):
+        return self._file.closed
+
+
+class UploadRequest(Request):
+    """
+    Request class that parses uploaded files into UploadSpool objects.
+    Every file upload in EcoBite is a photo, so all of them are validated.
+    """
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        config = current_app.config
+        max_size = config['UPLOAD_MAX_FILE_SIZE']
+        if content_length is not None and content_length > max_size:
+            raise UploadTooLarge(f"Uploads are limited to {max_size / (1024 * 1024):g} MB.")
+        return UploadSpool(config['UPLOAD_TMP_FOLDER'], max_size)
@@ -1,5 +1,11 @@
-from flask import session, flash, redirect, url_for
-from app.db import get_cursor
+import dataclasses
+import json
+import keyword
+from functools import lru_cache
+from flask import session, flash, redirect, url_for, current_app, Response, stream_with_context
+from app.stats import global_stats, user_stats
+
+DIETARY_TAGS = ("Vegetarian", "Vegan", "Gluten-Free", "Dairy-Free", "Nut-Free", "Halal", "Kosher")
 
 def require_login():
     """
@@ -23,6 +29,155 @@ def dict_rows(rows, desc):
     cols = [d[0] for d in desc]
     return [dict(zip(cols, r)) for r in rows]
 
+@lru_cache(maxsize=128)
+def row_class(cols):
+    """
+    Returns a dataclass with one field per column, cached per column set.
+    Instances share one key table (PEP 412 key-sharing dicts), so they are
+    built faster and take about a third of the memory of dict(zip(...)),
+    and orjson encodes them as objects directly. (__slots__ would be smaller
+    still, but orjson encodes slotted dataclasses several times slower.)
+    Instances support row["col"] and row.get("col") like the dicts from dict_rows().
+    Returns None if a column name can't be a field (e.g. an unaliased COUNT(*)).
+    """
+    if len(set(cols)) != len(cols) or not all(c.isidentifier() and not keyword.iskeyword(c) for c in cols):
+        return None
+    return dataclasses.make_dataclass("Row", cols, namespace={
+        "__getitem__": lambda self, key: getattr(self, key),
+        "get": lambda self, key, default=None: getattr(self, key, default),
+        "keys": lambda self: cols,
+    })
+
+def compact_rows(rows, desc):
+    """
+    Like dict_rows(), but builds lightweight read-only-shaped rows the JSON
+    provider can encode without an intermediate dict. Use dict_rows() when
+    the rows are modified afterwards.
+    """
+    cls = row_class(tuple(d[0] for d in desc))
+    if cls is None:
+        return dict_rows(rows, desc)
+    return [cls(*r) for r in rows]
+
+def split_tags(value):
+    """
+    Normalizes dietary tags from a list, JSON array string or comma separated string.
+    Known tags get their canonical spelling (matching is case-insensitive);
+    unknown ones are kept as given.
+    """
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            value = value.split(",")
+    if not isinstance(value, (list, tuple)):
+        return []
+    known = {t.lower(): t for t in DIETARY_TAGS}
+    tags = (str(v).strip() for v in value)
+    return sorted({known.get(t.lower(), t) for t in tags if t})
+
+def parse_tags(value):
+    """
+    The known DIETARY_TAGS among split_tags(value): the ones post_tags indexes.
+    """
+    return [t for t in split_tags(value) if t in DIETARY_TAGS]
+
+def save_post_tags(cur, post_id, tags):
+    """
+    Replaces the post_tags rows for a post. Runs inside the caller's transaction.
+    """
+    cur.execute("DELETE FROM post_tags WHERE post_id=?", (post_id,))
+    if tags:
+        cur.executemany("INSERT INTO post_tags (post_id, tag) VALUES (?, ?)", [(post_id, t) for t in tags])
+
+def lock_post_of_claim(cur, claim_id):
+    """
+    Locks the post a claim belongs to and returns its id, or None if there is no such claim.
+    Call before locking the claim itself: every path locks posts before their
+    claims (as the expiry sweep does), so two transactions can't deadlock.
+    """
+    cur.execute("SELECT post_id FROM claims WHERE id=?", (claim_id,))
+    row = cur.fetchone()
+    if not row:
+        return None
+    cur.execute("SELECT id FROM posts WHERE id=? FOR UPDATE", (row[0],))
+    cur.fetchall()
+    return row[0]
+
+def stream_rows(cur, transform=None, batch_size=None, columnar=False):
+    """
+    Streams an executed query as a JSON array response.
+
+    Rows are pulled with fetchmany() and encoded batch by batch, so memory
+    stays bounded by `batch_size` whatever the result size, and the opening
+    bracket goes out before the first batch is read. Use an unbuffered
+    cursor (get_cursor(buffered=False)) so the driver doesn't load the whole
+    result first; no other query can run on the connection until it is drained.
+    `transform` may reshape each row dict before it is encoded.
+    With `columnar` the body is {"columns": [...], "rows": [[...], ...]}
+    instead (see app.fields.columnar); `transform` does not apply then.
+    """
+    batch_size = batch_size or current_app.config['STREAM_BATCH_SIZE']
+    cols = tuple(d[0] for d in cur.description)
+    # Without a transform nothing modifies the rows, so skip building dicts.
+    row_type = None if transform else row_class(cols)
+    dumps = current_app.json.dumps
+
+    def generate():
+        yield dumps({"columns": cols})[:-1] + ',"rows":[' if columnar else "["
+        sep = ""
+        try:
+            while True:
+                rows = cur.fetchmany(batch_size)
+                if not rows:
+                    break
+                if columnar:
+                    # Row tuples encode as arrays; one dumps() call per batch.
+                    yield sep + dumps(rows)[1:-1]
+                    sep = ","
+                    continue
+                chunk = []
+                for r in rows:
+                    if row_type:
+                        row = row_type(*r)
+                    else:
+                        row = dict(zip(cols, r))
+                        if transform:
+                            row = transform(row)
+                    chunk.append(dumps(row))
+                yield sep + ",".join(chunk)
+                sep = ","
+        except Exception as e:
+            # Headers are already sent; a truncated array tells the client it failed.
+            print("❌ Stream error:", e)
+            return
+        finally:
+            cur.close()
+        yield "]}" if columnar else "]"
+
+    return Response(stream_with_context(generate()), mimetype="application/json")
+
+def batch_load(cur, query, ids, key, many=False, chunk_size=500):
+    """
+    Fetches related rows for many ids at once instead of one query per id.
+
+    `query` must contain an `{ids}` placeholder for the IN list, e.g.
+    "SELECT * FROM claims WHERE post_id IN ({ids})". Rows are grouped by the
+    `key` column: one dict per id, or a list of dicts per id when `many` is set.
+    Ids with no rows are absent from the result.
+    """
+    ids = list(dict.fromkeys(ids))
+    result = {}
+    for start in range(0, len(ids), chunk_size):
+        chunk = ids[start:start + chunk_size]
+        cur.execute(query.format(ids=",".join("?" * len(chunk))), tuple(chunk))
+        for row in dict_rows(cur.fetchall(), cur.description):
+            if many:
+                result.setdefault(row[key], []).append(row)
+            else:
+                result[row[key]] = row
+    return result
+
 def co2_estimate(shared_count):
     """Estimate CO2 saved.""" 
     return int(shared_count * 1.5)
@@ -32,24 +187,22 @@ def compute_stats(user_id=None):
     Compute stats for homepage or profile.
     """
     stats = {"available": 0, "shared": 0, "total": 0, "co2": 0}
-    cur = get_cursor()
-    if cur is None:
+    if user_id is None:
+        try:
+            totals = global_stats()
+        except Exception as e:
+            print("❌ Stats error:", e)
+            return stats
+        if totals:
+            stats.update(available=totals["available_now"], shared=totals["successfully_shared"], total=totals["total_posts"])
+            stats["co2"] = co2_estimate(stats["shared"])
         return stats
     try:
-        # available
-        q = """
-            SELECT COUNT(*) FROM posts
-            WHERE status='active' AND (expires_at IS NULL OR expires_at > NOW())
-        """
-        cur.execute(q + (" AND user_id=?" if user_id else ""), (user_id,) if user_id else ())
-        stats["available"] = cur.fetchone()[0]
-        # shared
-        cur.execute("SELECT COUNT(*) FROM posts WHERE status='claimed'" + (" AND user_id=?" if user_id else ""), (user_id,) if user_id else ())
-        stats["shared"] = cur.fetchone()[0]
-        # total
-        cur.execute("SELECT COUNT(*) FROM posts" + (" WHERE user_id=?" if user_id else ""), (user_id,) if user_id else ())
-        stats["total"] = cur.fetchone()[0]
-        stats["co2"] = co2_estimate(stats["shared"])
+        mine = user_stats(user_id)
     except Exception as e:
         print("❌ Stats error:", e)
+        return stats
+    if mine:
+        stats.update(available=mine["posts_available"], shared=mine["posts_claimed"], total=mine["posts_created"])
+        stats["co2"] = co2_estimate(stats["shared"])
     return stats
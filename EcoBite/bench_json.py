@@ -0,0 +1,67 @@
+"""
+Micro-benchmark for JSON list responses.
+
+Compares the old path (dict_rows() + Flask's default JSON provider) with
+compact_rows() + FastJSONProvider on synthetic rows shaped like a feed page.
+
+Usage: python bench_json.py [--rows 10000] [--repeat 5]
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from app.json_provider import FastJSONProvider, orjson
+from app.utils import dict_rows, compact_rows
+
+DESCRIPTION = [(name,) for name in (
+    "id", "user_id", "title", "description", "category", "dietary_tags", "location",
+    "quantity", "estimated_weight_kg", "status", "created_at", "expires_at", "owner_email",
+)]
+
+def make_rows(n):
+    now = datetime(2025, 1, 1, 12, 0, 0)
+    return [(
+        i, i % 50, f"Leftover pizza #{i}", "Two large vegetarian pizzas from the club meeting",
+        "Prepared Meals", "vegetarian,halal", "Student Center, Room 204", "2 boxes",
+        Decimal("1.50"), "active", now + timedelta(minutes=i), now + timedelta(hours=3), f"user{i % 50}@iut-dhaka.edu",
+    ) for i in range(n)]
+
+def timed(func, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        size = func()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, size
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark JSON encoding of list responses.")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    default = DefaultJSONProvider(app)
+    fast = FastJSONProvider(app)
+    rows = make_rows(args.rows)
+
+    with app.app_context():
+        cases = [
+            ("dict_rows + default provider", lambda: len(default.response({"items": dict_rows(rows, DESCRIPTION)}).get_data())),
+            ("dict_rows + fast provider", lambda: len(fast.response({"items": dict_rows(rows, DESCRIPTION)}).get_data())),
+            ("compact_rows + fast provider", lambda: len(fast.response({"items": compact_rows(rows, DESCRIPTION)}).get_data())),
+        ]
+        print(f"{args.rows} rows, best of {args.repeat}, encoder: {'orjson' if orjson else 'stdlib json'}")
+        baseline = None
+        for label, func in cases:
+            elapsed, size = timed(func, args.repeat)
+            baseline = baseline or elapsed
+            print(f"  {label:32} {elapsed * 1000:8.1f} ms  {size / 1024:8.0f} KiB  x{baseline / elapsed:.1f}")
+
+if __name__ == "__main__":
+    main()
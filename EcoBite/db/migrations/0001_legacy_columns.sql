@@ -0,0 +1,10 @@
+-- Columns previously added by hand in migrate_db.py.
+ALTER TABLE posts
+    ADD COLUMN IF NOT EXISTS title VARCHAR(255) DEFAULT NULL,
+    ADD COLUMN IF NOT EXISTS estimated_weight_kg FLOAT DEFAULT 0,
+    ADD COLUMN IF NOT EXISTS pickup_window_start DATETIME DEFAULT NULL,
+    ADD COLUMN IF NOT EXISTS pickup_window_end DATETIME DEFAULT NULL,
+    ADD COLUMN IF NOT EXISTS image_url VARCHAR(255) DEFAULT NULL;
+
+ALTER TABLE claims
+    ADD COLUMN IF NOT EXISTS requested_quantity VARCHAR(255) DEFAULT NULL;
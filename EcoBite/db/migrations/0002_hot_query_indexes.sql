@@ -0,0 +1,22 @@
+-- Indexes for the feed, stats, My Posts and My Requests queries.
+-- INPLACE/LOCK=NONE keeps the tables readable and writable while they build.
+
+-- Feed and compute_stats(): status='active' AND expires_at > NOW() ORDER BY created_at
+ALTER TABLE posts
+    ADD INDEX IF NOT EXISTS idx_posts_status_expires_created (status, expires_at, created_at),
+    ALGORITHM=INPLACE, LOCK=NONE;
+
+-- /myposts and /api/food-posts/mine: user_id=? ORDER BY created_at DESC
+ALTER TABLE posts
+    ADD INDEX IF NOT EXISTS idx_posts_user_created (user_id, created_at),
+    ALGORITHM=INPLACE, LOCK=NONE;
+
+-- Claim summaries per post
+ALTER TABLE claims
+    ADD INDEX IF NOT EXISTS idx_claims_post_status (post_id, status),
+    ALGORITHM=INPLACE, LOCK=NONE;
+
+-- /requests and /api/claims/mine: claimer_id=? ORDER BY created_at DESC
+ALTER TABLE claims
+    ADD INDEX IF NOT EXISTS idx_claims_claimer_created (claimer_id, created_at),
+    ALGORITHM=INPLACE, LOCK=NONE;
@@ -0,0 +1,5 @@
+-- Full-text index for the feed search box (title, description, category, location).
+-- The first FULLTEXT index on a table adds a hidden FTS_DOC_ID column, which
+-- needs a table rebuild; reads stay available while it runs.
+ALTER TABLE posts
+    ADD FULLTEXT INDEX IF NOT EXISTS ft_posts_search (title, description, category, location);
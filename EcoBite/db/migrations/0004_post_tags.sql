@@ -0,0 +1,7 @@
+-- Dietary tags in an indexable form. dietary_json stays as the display copy.
+CREATE TABLE IF NOT EXISTS post_tags (
+    post_id INT NOT NULL,
+    tag VARCHAR(32) NOT NULL,
+    PRIMARY KEY (tag, post_id),
+    KEY idx_post_tags_post (post_id)
+);
@@ -0,0 +1,35 @@
+"""
+Copies existing dietary_json arrays into post_tags.
+"""
+import json
+
+BATCH = 500
+# Frozen copy of app.utils.DIETARY_TAGS as of this migration.
+KNOWN = {t.lower(): t for t in ("Vegetarian", "Vegan", "Gluten-Free", "Dairy-Free", "Nut-Free", "Halal", "Kosher")}
+
+def parse_tags(raw):
+    try:
+        tags = json.loads(raw) if raw else []
+    except (TypeError, ValueError):
+        return []
+    if not isinstance(tags, list):
+        return []
+    return sorted({KNOWN[str(t).strip().lower()] for t in tags if str(t).strip().lower() in KNOWN})
+
+def upgrade(cursor):
+    last_id = 0
+    copied = 0
+    while True:
+        cursor.execute(
+            "SELECT id, dietary_json FROM posts WHERE id > ? AND dietary_json IS NOT NULL ORDER BY id LIMIT ?",
+            (last_id, BATCH)
+        )
+        rows = cursor.fetchall()
+        if not rows:
+            break
+        pairs = [(post_id, tag) for post_id, raw in rows for tag in parse_tags(raw)]
+        if pairs:
+            cursor.executemany("INSERT IGNORE INTO post_tags (post_id, tag) VALUES (?, ?)", pairs)
+            copied += len(pairs)
+        last_id = rows[-1][0]
+    print(f"Backfilled {copied} dietary tags")
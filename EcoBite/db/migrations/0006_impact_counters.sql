@@ -0,0 +1,19 @@
+-- Single-row materialized counters for /api/stats/global and the homepage.
+-- Kept current by app.stats.record_transition(); app.stats.reconcile() corrects drift.
+CREATE TABLE IF NOT EXISTS impact_counters (
+    id TINYINT PRIMARY KEY,
+    total_posts INT NOT NULL DEFAULT 0,
+    available_posts INT NOT NULL DEFAULT 0,
+    shared_posts INT NOT NULL DEFAULT 0,
+    shared_weight_kg DOUBLE NOT NULL DEFAULT 0,
+    reconciled_at TIMESTAMP NULL DEFAULT NULL
+);
+
+INSERT IGNORE INTO impact_counters (id, total_posts, available_posts, shared_posts, shared_weight_kg, reconciled_at)
+SELECT 1,
+       COUNT(*),
+       COUNT(CASE WHEN status='active' AND (expires_at IS NULL OR expires_at > NOW()) THEN 1 END),
+       COUNT(CASE WHEN status IN ('claimed', 'completed') THEN 1 END),
+       COALESCE(SUM(CASE WHEN status IN ('claimed', 'completed') THEN estimated_weight_kg END), 0),
+       NOW()
+FROM posts;
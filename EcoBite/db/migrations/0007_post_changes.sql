@@ -0,0 +1,9 @@
+-- Append-only change log behind GET /api/food-posts/changes (delta sync).
+-- version is the monotonic sync token handed to clients.
+CREATE TABLE IF NOT EXISTS post_changes (
+    version BIGINT AUTO_INCREMENT PRIMARY KEY,
+    post_id INT NOT NULL,
+    op VARCHAR(8) NOT NULL,  -- insert, update or delete
+    changed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    KEY idx_post_changes_changed (changed_at)
+);
@@ -0,0 +1,10 @@
+-- Per-table version markers for ETag / Last-Modified on the read APIs.
+-- Bumped by every write to the table, inside the same transaction.
+-- 'stats' covers impact_counters (/api/stats/global).
+CREATE TABLE IF NOT EXISTS data_versions (
+    name VARCHAR(32) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT IGNORE INTO data_versions (name) VALUES ('posts'), ('claims'), ('stats');
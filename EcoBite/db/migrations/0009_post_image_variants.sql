@@ -0,0 +1,4 @@
+-- Feed thumbnail of the uploaded photo written by app/images.py.
+-- image_url itself is replaced by the re-encoded full-size version.
+ALTER TABLE posts
+    ADD COLUMN IF NOT EXISTS image_thumb_url VARCHAR(255) DEFAULT NULL;
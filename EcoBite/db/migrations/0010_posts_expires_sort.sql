@@ -0,0 +1,9 @@
+-- endingSoon feed order. "Never expires" becomes a far-future sentinel so
+-- ORDER BY expires_sort, id walks an index; `expires_at IS NULL, expires_at`
+-- can't use one and filesorts. Virtual, so adding it doesn't rebuild the table.
+ALTER TABLE posts
+    ADD COLUMN IF NOT EXISTS expires_sort DATETIME AS (COALESCE(expires_at, '9999-12-31 23:59:59')) VIRTUAL;
+
+ALTER TABLE posts
+    ADD INDEX IF NOT EXISTS idx_posts_status_expires_sort (status, expires_sort),
+    ALGORITHM=INPLACE, LOCK=NONE;
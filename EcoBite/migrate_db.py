@@ -1,6 +1,10 @@
+import argparse
+import importlib.util
+import os
+import re
+import time
 
 import mariadb
-import os
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -11,67 +15,174 @@ DB_HOST = os.getenv("DB_HOST", "127.0.0.1")
 DB_PORT = int(os.getenv("DB_PORT", "3306"))
 DB_NAME = os.getenv("DB_NAME", "ecobite")
 
-def migrate():
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "db", "migrations")
+MIGRATION_FILE = re.compile(r"^(\d+)_([\w-]+)\.(sql|py)$")
+
+def discover(path=MIGRATIONS_DIR):
+    """
+    Returns (version, name, path) for every migration script, ordered by version.
+    Scripts are named NNNN_description.sql, or NNNN_description.py with an upgrade(cursor) function.
+    """
+    found = []
+    for filename in os.listdir(path):
+        m = MIGRATION_FILE.match(filename)
+        if m:
+            found.append((int(m.group(1)), m.group(2), os.path.join(path, filename)))
+    found.sort()
+    versions = [v for v, _, _ in found]
+    if len(versions) != len(set(versions)):
+        raise SystemExit("Duplicate migration version numbers in db/migrations")
+    return found
+
+DELIMITER = re.compile(r"[ \t]*DELIMITER[ \t]+(\S+)[ \t]*(?:\r?\n|$)", re.IGNORECASE)
+
+def _skip_quoted(sql, i):
+    """Returns the index just past the string literal or quoted identifier starting at i."""
+    quote = sql[i]
+    j = i + 1
+    while j < len(sql):
+        if sql[j] == "\\" and quote != "`":
+            j += 2
+            continue
+        if sql[j] == quote:
+            # A doubled quote is an escaped quote, not the end.
+            if sql[j + 1:j + 2] == quote:
+                j += 2
+                continue
+            return j + 1
+        j += 1
+    return j
+
+def split_statements(sql):
+    """
+    Splits a .sql script into statements.
+
+    Statements end at `;` outside string literals, quoted identifiers and
+    comments. As in the mysql client, a `DELIMITER //` line switches the
+    terminator so procedure and trigger bodies can contain `;`.
+    Comments are dropped, except /*! ... */ version comments.
+    """
+    statements = []
+    buf = []
+    delimiter = ";"
+    i, n = 0, len(sql)
+    line_start = True
+    while i < n:
+        if line_start and not "".join(buf).strip():
+            m = DELIMITER.match(sql, i)
+            if m:
+                delimiter = m.group(1)
+                i = m.end()
+                continue
+        line_start = False
+        c = sql[i]
+        if c in "'\"`":
+            j = _skip_quoted(sql, i)
+            buf.append(sql[i:j])
+            i = j
+        elif c == "#" or (sql.startswith("--", i) and sql[i + 2:i + 3] in ("", " ", "\t", "\r", "\n")):
+            # Up to the newline, which is kept.
+            j = sql.find("\n", i)
+            i = n if j < 0 else j
+        elif sql.startswith("/*", i) and not sql.startswith("/*!", i):
+            j = sql.find("*/", i + 2)
+            i = n if j < 0 else j + 2
+            buf.append(" ")
+        elif sql.startswith(delimiter, i):
+            statement = "".join(buf).strip()
+            if statement:
+                statements.append(statement)
+            buf = []
+            i += len(delimiter)
+        else:
+            buf.append(c)
+            line_start = c == "\n"
+            i += 1
+    statement = "".join(buf).strip()
+    if statement:
+        statements.append(statement)
+    return statements
+
+def ensure_migrations_table(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INT PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            duration_ms INT NOT NULL
+        )
+    """)
+
+def applied_versions(cursor):
+    cursor.execute("SELECT version FROM schema_migrations")
+    return {row[0] for row in cursor.fetchall()}
+
+def apply(conn, cursor, path):
+    """Runs one migration script. DDL auto-commits in MariaDB, so scripts must be safe to re-run."""
+    if path.endswith(".py"):
+        spec = importlib.util.spec_from_file_location(os.path.basename(path)[:-3], path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        module.upgrade(cursor)
+    else:
+        with open(path, encoding="utf-8") as f:
+            for statement in split_statements(f.read()):
+                cursor.execute(statement)
+    conn.commit()
+
+def migrate(list_only=False):
     try:
         conn = mariadb.connect(
             user=DB_USER, password=DB_PASS,
             host=DB_HOST, port=DB_PORT,
             database=DB_NAME
         )
-        cursor = conn.cursor()
-        
-        # Add columns to posts
-        print("Migrating posts table...")
-        try:
-            cursor.execute("ALTER TABLE posts ADD COLUMN title VARCHAR(255) DEFAULT NULL")
-            print("Added title to posts")
-        except mariadb.Error as e:
-            if "Duplicate column" in str(e): print("title already exists")
-            else: print(f"Error adding title: {e}")
-
-        try:
-            cursor.execute("ALTER TABLE posts ADD COLUMN estimated_weight_kg FLOAT DEFAULT 0")
-            print("Added estimated_weight_kg to posts")
-        except mariadb.Error as e:
-            if "Duplicate column" in str(e): print("estimated_weight_kg already exists")
-            else: print(f"Error adding estimated_weight_kg: {e}")
+    except mariadb.Error as e:
+        print(f"Connection Error: {e}")
+        return False
 
-        try:
-            cursor.execute("ALTER TABLE posts ADD COLUMN pickup_window_start DATETIME DEFAULT NULL")
-            print("Added pickup_window_start to posts")
-        except mariadb.Error as e:
-            if "Duplicate column" in str(e): print("pickup_window_start already exists")
-            else: print(f"Error adding pickup_window_start: {e}")
+    cursor = conn.cursor()
+    ensure_migrations_table(cursor)
+    conn.commit()
+    done = applied_versions(cursor)
+    pending = [m for m in discover() if m[0] not in done]
 
-        try:
-            cursor.execute("ALTER TABLE posts ADD COLUMN pickup_window_end DATETIME DEFAULT NULL")
-            print("Added pickup_window_end to posts")
-        except mariadb.Error as e:
-            if "Duplicate column" in str(e): print("pickup_window_end already exists")
-            else: print(f"Error adding pickup_window_end: {e}")
+    if list_only:
+        for version, name, _ in discover():
+            print(f"{version:04d} {name}: {'applied' if version in done else 'pending'}")
+        conn.close()
+        return True
 
-        try:
-            cursor.execute("ALTER TABLE posts ADD COLUMN image_url VARCHAR(255) DEFAULT NULL")
-            print("Added image_url to posts")
-        except mariadb.Error as e:
-            if "Duplicate column" in str(e): print("image_url already exists")
-            else: print(f"Error adding image_url: {e}")
+    if not pending:
+        print("Database is up to date.")
+        conn.close()
+        return True
 
-        # Add columns to claims
-        print("Migrating claims table...")
+    total = time.perf_counter()
+    for version, name, path in pending:
+        print(f"Applying {version:04d} {name}...")
+        started = time.perf_counter()
         try:
-            cursor.execute("ALTER TABLE claims ADD COLUMN requested_quantity VARCHAR(255) DEFAULT NULL")
-            print("Added requested_quantity to claims")
+            apply(conn, cursor, path)
         except mariadb.Error as e:
-            if "Duplicate column" in str(e): print("requested_quantity already exists")
-            else: print(f"Error adding requested_quantity: {e}")
-
+            conn.rollback()
+            print(f"❌ Migration {version:04d} failed: {e}")
+            conn.close()
+            return False
+        duration_ms = int((time.perf_counter() - started) * 1000)
+        cursor.execute(
+            "INSERT INTO schema_migrations (version, name, duration_ms) VALUES (?, ?, ?)",
+            (version, name, duration_ms)
+        )
         conn.commit()
-        conn.close()
-        print("Migration complete!")
-        
-    except mariadb.Error as e:
-        print(f"Connection Error: {e}")
+        print(f"Applied {version:04d} {name} in {duration_ms} ms")
+
+    conn.close()
+    print(f"Migration complete! {len(pending)} applied in {int((time.perf_counter() - total) * 1000)} ms")
+    return True
 
 if __name__ == "__main__":
-    migrate()
+    parser = argparse.ArgumentParser(description="Apply versioned schema migrations from db/migrations.")
+    parser.add_argument("--list", action="store_true", help="show applied and pending migrations")
+    args = parser.parse_args()
+    raise SystemExit(0 if migrate(list_only=args.list) else 1)
@@ -3,6 +3,47 @@
 
 const API_BASE = '/api';
 
+// Last response per URL, replayed when the server answers 304 Not Modified.
+const validated = new Map();
+
+// GET with conditional revalidation: sends back the ETag / Last-Modified of
+// the previous response for this URL and reuses its body on a 304.
+export async function getJSON(url) {
+  const prev = validated.get(url);
+  const headers = {};
+  if (prev && prev.etag) headers['If-None-Match'] = prev.etag;
+  if (prev && prev.lastModified) headers['If-Modified-Since'] = prev.lastModified;
+  const res = await fetch(url, { headers, cache: 'no-store' });
+  if (res.status === 304 && prev) return prev.body;
+  if (!res.ok) throw new Error(`Request failed: ${res.status}`);
+  const body = await res.json();
+  const etag = res.headers.get('ETag');
+  const lastModified = res.headers.get('Last-Modified');
+  if (etag || lastModified) validated.set(url, { etag, lastModified, body });
+  return body;
+}
+
+// Expands a ?format=columnar body ({ columns, rows, ... }) into row objects.
+// Feed pages come back as { items, next }, bare lists as an array.
+export function fromColumnar(body) {
+  if (!body || !Array.isArray(body.columns) || !Array.isArray(body.rows)) return body;
+  const { columns, rows, ...rest } = body;
+  const items = rows.map(row => {
+    const obj = {};
+    columns.forEach((c, i) => { obj[c] = row[i]; });
+    return obj;
+  });
+  return 'next' in rest ? { ...rest, items } : items;
+}
+
+// Query string for a list request in columnar format, optionally limited to `fields`.
+function listQuery(params = {}, fields) {
+  const clean = Object.fromEntries(Object.entries(params).filter(([, v]) => v !== undefined && v !== null));
+  clean.format = 'columnar';
+  if (fields) clean.fields = fields.join(',');
+  return new URLSearchParams(clean).toString();
+}
+
 export function getUser() {
   // In a real app, we might fetch this from an endpoint like /api/me
   // For now, we'll rely on the sidebar hydration or return a placeholder
@@ -15,11 +56,42 @@ export function getUser() {
   };
 }
 
-export async function listPosts(params = {}) {
-  const query = new URLSearchParams(params).toString();
-  const res = await fetch(`${API_BASE}/food-posts?${query}`);
-  if (!res.ok) throw new Error('Failed to fetch posts');
-  return await res.json();
+// Returns one page: { items: [...], next: cursor | null }.
+// Pass `next` back as params.cursor to fetch the following page.
+// `fields` (e.g. ['id', 'title']) limits the columns the server sends.
+export async function listPosts(params = {}, fields) {
+  try {
+    return fromColumnar(await getJSON(`${API_BASE}/food-posts?${listQuery(params, fields)}`));
+  } catch (e) {
+    throw new Error('Failed to fetch posts');
+  }
+}
+
+// Claims I made, newest first.
+export async function listMyClaims(fields) {
+  return fromColumnar(await getJSON(`${API_BASE}/claims/mine?${listQuery({}, fields)}`));
+}
+
+// Claims on my posts, newest first.
+export async function listIncomingClaims(fields) {
+  return fromColumnar(await getJSON(`${API_BASE}/claims/for-my-posts?${listQuery({}, fields)}`));
+}
+
+// Live feed changes over Server-Sent Events. The browser reconnects on its own
+// and sends Last-Event-ID, so missed events are replayed by the server.
+// `handlers` maps event names (post-created, post-claimed, post-expired,
+// post-updated, stats-changed, reset) to callbacks receiving the parsed data.
+export function subscribeFeed(handlers = {}) {
+  if (!window.EventSource) return null;
+  const source = new EventSource(`${API_BASE}/stream`);
+  Object.entries(handlers).forEach(([event, fn]) => {
+    source.addEventListener(event, e => {
+      let data = {};
+      try { data = JSON.parse(e.data); } catch (err) { }
+      fn(data);
+    });
+  });
+  return source;
 }
 
 export async function createPost(data) {
@@ -72,44 +144,13 @@ export async function rejectClaim(postId, claimId) {
   return await res.json();
 }
 
+// Site-wide counters from the materialized stats endpoint; no post lists are downloaded.
 export async function computeStats() {
-  // Fetch all posts to compute stats client-side or use a stats endpoint if available.
-  // For now, we'll fetch all posts to match previous behavior.
-  const list = await listPosts({ status: 'available' }); // This only gets available
-  // Actually, to get total stats we might need more data or a dedicated endpoint.
-  // But let's try to get all posts if possible, or just use what we have.
-  // The API listPosts filters by status if provided.
-  // Let's fetch "all" for stats if we want accurate total counts, 
-  // but the UI might only need available for the feed.
-  // However, the stats bar needs "Total Posts", "Successfully Shared".
-
-  // Let's fetch all posts without status filter to compute stats?
-  // The API default status is 'available'. We need to pass something to get all?
-  // The API code: if status_filter == "available" ... elif "claimed" ...
-  // It doesn't seem to have an "all" option easily without modification or multiple requests.
-  // Let's make multiple requests in parallel for now.
-
-  const [availableRes, claimedRes, expiredRes] = await Promise.all([
-    fetch(`${API_BASE}/food-posts?status=available`),
-    fetch(`${API_BASE}/food-posts?status=claimed`),
-    fetch(`${API_BASE}/food-posts?status=expired`)
-  ]);
-
-  const availableList = await availableRes.json();
-  const claimedList = await claimedRes.json();
-  const expiredList = await expiredRes.json();
-
-  const available = availableList.length;
-  const shared = claimedList.length;
-  const expired = expiredList.length;
-  const total = available + shared + expired;
-  const savedKg = (shared * 1.2).toFixed(1);
-
-  // For the feed list, we usually return the one matching the current scope.
-  // But computeStats was returning 'list' which was ALL posts in the LS version.
-  // app.js filters this list client-side.
-  // To minimize refactoring app.js, we can combine them.
-  const allList = [...availableList, ...claimedList, ...expiredList];
-
-  return { available, total, shared, savedKg, list: allList };
+  const s = await getJSON(`${API_BASE}/stats/global`);
+  return {
+    available: s.available_now,
+    total: s.total_posts,
+    shared: s.successfully_shared,
+    savedKg: s.food_waste_prevented_kg.toFixed(1)
+  };
 }
@@ -1,5 +1,5 @@
 
-import { listPosts, createPost, claimPost, approveClaim, rejectClaim, computeStats, getUser } from './api.js';
+import { listPosts, createPost, claimPost, approveClaim, rejectClaim, computeStats, getUser, subscribeFeed, getJSON, listMyClaims, listIncomingClaims } from './api.js';
 
 /* ---------- Sidebar highlighting + user badge ---------- */
 export function navActivate(key) {
@@ -13,7 +13,7 @@ export function navActivate(key) {
 /* ---------- FEED ---------- */
 export async function renderFeed() {
   hydrateUserOnSidebar();
-  const state = { scope: 'available' };
+  const state = { scope: 'available', next: null, loading: false, generation: 0 };
 
   // tabs
   document.querySelectorAll('.tab').forEach(btn => {
@@ -43,49 +43,114 @@ export async function renderFeed() {
       document.querySelectorAll('.custom-select').forEach(s => s.classList.remove('open'));
     });
     if (dietPopup) dietPopup.addEventListener('click', (e) => e.stopPropagation());
+    dietPopup.querySelectorAll('input[name="dietFilter"]').forEach(el => el.addEventListener('change', draw));
+  }
+
+  const sentinel = feedSentinel(loadMore);
+
+  // Request buttons on server-rendered cards (templates/_post_card.html).
+  const feedEl = byId('feed');
+  if (!feedEl._claimBound) {
+    feedEl.addEventListener('click', e => {
+      const b = e.target.closest('[data-claim]');
+      if (b) openClaimModal({ id: b.dataset.claim, title: b.dataset.title });
+    });
+    feedEl._claimBound = true;
   }
 
   initCustomDropdowns();
-  await draw();
+  if (feedEl.dataset.rendered) {
+    // main.home() already rendered the first page with the default filters.
+    delete feedEl.dataset.rendered;
+    localizeTimes(feedEl);
+    const nextEl = byId('feedNext');
+    state.next = (nextEl && nextEl.dataset.next) || null;
+    sentinel.style.display = state.next ? 'block' : 'none';
+    byId('emptyFeed').style.display = feedEl.children.length ? 'none' : 'block';
+    await drawStats();
+  } else {
+    await draw();
+  }
+  listenForChanges();
 
 
   async function draw() {
+    await drawStats();
+
+    const feed = byId('feed');
+    feed.innerHTML = '';
+    state.next = null;
+    state.generation++;
+    await loadPage(null);
+    byId('emptyFeed').style.display = feed.children.length ? 'none' : 'block';
+  }
+
+  async function drawStats() {
     // Fetch global stats
     try {
-      const res = await fetch('/api/stats/global');
-      if (res.ok) {
-        const stats = await res.json();
-        set('#stAvailable', stats.available_now);
-        set('#stTotal', stats.total_posts);
-        set('#stShared', stats.successfully_shared);
-        set('#stWaste', `${stats.food_waste_prevented_kg.toFixed(1)}kg`);
-      }
+      const stats = await getJSON('/api/stats/global');
+      set('#stAvailable', stats.available_now);
+      set('#stTotal', stats.total_posts);
+      set('#stShared', stats.successfully_shared);
+      set('#stWaste', `${stats.food_waste_prevented_kg.toFixed(1)}kg`);
     } catch (e) { console.error("Stats error", e); }
+  }
 
-    const q = (val('search') || '').toLowerCase();
-    const type = val('type') || 'all';
-    const scope = state.scope;
-    const sort = val('sort') || 'newest';
-
-    // Fetch posts with filters
-    const params = {
-      status: scope,
-      search: q,
-      type: type,
-      sort: sort
+  // Keeps the open feed current from /api/stream instead of re-downloading it.
+  function listenForChanges() {
+    if (window._feedSource) window._feedSource.close();
+    let redraw = null;
+    const refresh = () => {
+      // New posts appear at the top; only redraw if the user is looking there.
+      clearTimeout(redraw);
+      redraw = setTimeout(() => { if (window.scrollY < 200) draw(); }, 500);
     };
+    const removeCards = ids => ids.forEach(id => {
+      const el = document.querySelector(`#feed [data-post-id="${id}"]`);
+      if (el && state.scope === 'available') el.remove();
+    });
+    window._feedSource = subscribeFeed({
+      'post-created': refresh,
+      'post-updated': refresh,
+      'post-claimed': d => removeCards([d.post_id]),
+      'post-expired': d => removeCards(d.post_ids || [d.post_id]),
+      'stats-changed': drawStats,
+      'reset': draw
+    });
+  }
 
-    let items = [];
+  function feedParams() {
+    const sort = val('sort');
+    const search = (val('search') || '').toLowerCase();
+    return {
+      status: state.scope,
+      search: search,
+      type: val('type') || 'all',
+      // Posts must carry every checked tag.
+      dietary: [...document.querySelectorAll('input[name="dietFilter"]:checked')].map(el => el.value).join(','),
+      // Searches rank by relevance unless the user explicitly asked for ending soon.
+      sort: sort === 'endingSoon' ? 'endingSoon' : (search ? 'relevance' : 'newest')
+    };
+  }
+
+  // Fetches the page after `cursor` and appends it to the feed.
+  // A newer draw() bumps `generation`, so late responses for old filters are dropped.
+  async function loadPage(cursor) {
+    const generation = state.generation;
+    state.loading = true;
+    let page = { items: [], next: null };
     try {
-      items = await listPosts(params);
+      page = await listPosts({ ...feedParams(), cursor: cursor || undefined });
     } catch (e) { console.error("Feed error", e); }
+    if (generation !== state.generation) return;
+    state.loading = false;
+    state.next = page.next;
 
     const feed = byId('feed');
-    feed.innerHTML = '';
-    items.forEach(p => {
+    const user = getUser();
+    page.items.forEach(p => {
       // Logic for request button: if not owner and available
       // API returns owner_email. We check against current user email.
-      const user = getUser();
       const isOwner = p.owner_email === user.email;
       const isAvailable = p.status === 'active';
 
@@ -94,17 +159,42 @@ export async function renderFeed() {
         showOwner: true
       }));
     });
+    sentinel.style.display = state.next ? 'block' : 'none';
+  }
 
-    byId('emptyFeed').style.display = items.length ? 'none' : 'block';
+  // Loads the next page when the bottom of the feed scrolls into view.
+  function loadMore() {
+    if (state.loading || !state.next) return;
+    loadPage(state.next);
   }
 }
 
+function feedSentinel(onVisible) {
+  let el = byId('feedMore');
+  if (!el) {
+    el = btn('Load more', 'ghost');
+    el.id = 'feedMore';
+    el.style.display = 'none';
+    byId('feed').after(el);
+  }
+  // renderFeed() runs again after a claim, so rebind to the newest feed state.
+  el.onclick = onVisible;
+  if (el._observer) el._observer.disconnect();
+  if ('IntersectionObserver' in window) {
+    el._observer = new IntersectionObserver(entries => {
+      if (entries.some(e => e.isIntersecting)) onVisible();
+    }, { rootMargin: '400px' });
+    el._observer.observe(el);
+  }
+  return el;
+}
+
 function openClaimModal(post) {
   const qty = prompt(`Requesting: ${post.title}\nHow much do you need? (e.g. "2 slices")`, "1");
   if (qty) {
     const msg = prompt("Optional message for the donor:", "I would like to pick this up!");
     claimPost(post.id, { requested_quantity: qty, message: msg })
-      .then(() => { alert("Request sent!"); renderFeed(); })
+      .then(() => { alert("Request sent!"); })
       .catch(e => alert(e.message));
   }
 }
@@ -265,7 +355,7 @@ export async function renderMyPosts() {
         <div class="mp-info">
           <div class="mp-main-row">
             <div class="mp-thumb">
-                ${p.image_url ? `<img src="${p.image_url}" style="width:100%;height:100%;object-fit:cover;border-radius:8px;">` : '🍱'}
+                ${p.image_url ? `<img src="${p.image_thumb_url || p.image_url}" style="width:100%;height:100%;object-fit:cover;border-radius:8px;">` : '🍱'}
             </div>
             <div>
               <h5 class="mp-title">${p.title || p.description || 'Untitled'}</h5>
@@ -325,16 +415,13 @@ export async function renderMyPosts() {
 
 async function fetchAndGroupClaims() {
   try {
-    const res = await fetch('/api/claims/for-my-posts');
-    if (res.ok) {
-      const claims = await res.json();
-      const byPost = {};
-      claims.forEach(c => {
-        if (!byPost[c.post_id]) byPost[c.post_id] = [];
-        byPost[c.post_id].push(c);
-      });
-      window._claimsByPost = byPost;
-    }
+    const claims = await listIncomingClaims();
+    const byPost = {};
+    claims.forEach(c => {
+      if (!byPost[c.post_id]) byPost[c.post_id] = [];
+      byPost[c.post_id].push(c);
+    });
+    window._claimsByPost = byPost;
   } catch (e) { console.error("Failed to load claims", e); }
 }
 
@@ -347,8 +434,7 @@ export async function renderRequests() {
   // 1. Incoming Requests (For My Posts)
   let incoming = [];
   try {
-    const res = await fetch('/api/claims/for-my-posts');
-    if (res.ok) incoming = await res.json();
+    incoming = await listIncomingClaims(['id', 'post_id', 'post_title', 'claimer_email', 'requested_quantity', 'message', 'status']);
   } catch (e) { console.error(e); }
 
   const iWrap = byId('reqIncoming');
@@ -392,8 +478,7 @@ export async function renderRequests() {
   // 2. Requests I Made
   let myClaims = [];
   try {
-    const res = await fetch('/api/claims/mine');
-    if (res.ok) myClaims = await res.json();
+    myClaims = await listMyClaims();
   } catch (e) { console.error(e); }
 
   const pWrap = byId('reqPending'); if (pWrap) pWrap.innerHTML = '';
@@ -408,7 +493,7 @@ export async function renderRequests() {
       status: c.status
     };
     const item = card(p, {
-      extra: tag('span', 'badge', c.status === 'pending' ? '⏳ Pending' : (c.status === 'approved' ? '✅ Approved' : '❌ Rejected'))
+      extra: tag('span', 'badge', c.status === 'pending' ? '⏳ Pending' : (c.status === 'approved' ? '✅ Approved' : (c.status === 'expired' ? '⌛ Expired' : '❌ Rejected')))
     });
     if (c.status === 'pending') {
       const cancelBtn = btn('Cancel', 'ghost', () => cancelClaim(c.id));
@@ -493,6 +578,7 @@ export async function renderProfile() {
 /* ---------- small UI helpers ---------- */
 function card(p, opts = {}) {
   const root = tag('div', 'card');
+  if (p.id) root.dataset.postId = p.id;
   console.log('Rendering card for:', p.title, 'Image URL:', p.image_url, 'Type:', typeof p.image_url, 'Truthy:', !!p.image_url);
 
   // Image or Thumb
@@ -502,7 +588,8 @@ function card(p, opts = {}) {
     wrapper.style.overflow = 'hidden';
 
     const img = tag('img', 'card-image');
-    img.src = p.image_url;
+    img.src = p.image_thumb_url || p.image_url;
+    img.loading = 'lazy';
     wrapper.appendChild(img);
     root.appendChild(wrapper);
   } else {
@@ -538,7 +625,15 @@ function set(sel, v) { const el = byId(sel.slice(1)); if (el) el.textContent = v
 function val(id) { const el = byId(id); return el ? el.value : ''; }
 function byId(id) { return document.getElementById(id); }
 function singular(s) { return s.replace(/s$/, ''); }
-function formatDT(iso) { try { return new Date(iso).toLocaleString() } catch { return iso } }
+function formatDT(iso) {
+  if (!iso) return '-';
+  const d = new Date(iso);
+  return isNaN(d) ? iso : d.toLocaleString();
+}
+// Server-rendered <time datetime> elements, shown the same way as formatDT() in cards built here.
+function localizeTimes(root) {
+  root.querySelectorAll('time[datetime]').forEach(t => { t.textContent = formatDT(t.dateTime); });
+}
 function isExpired(iso) { return new Date(iso) < new Date(); }
 function timeUntil(iso) {
   const diff = new Date(iso) - new Date();
@@ -49,8 +49,8 @@ def test_list_posts():
     print("\nTesting List Posts...")
     resp = SESSION.get(f"{BASE_URL}/api/food-posts")
     print(f"Status: {resp.status_code}")
-    posts = resp.json()
-    print(f"Count: {len(posts)}")
+    posts = resp.json()["items"]
+    print(f"Count: {len(posts)} (next cursor: {resp.json()['next']})")
     return posts
 
 def test_claim_post(post_id):
@@ -0,0 +1,37 @@
+import time
+
+import pytest
+
+from app import create_app
+from app.config import Config
+
+
+@pytest.fixture
+def app(tmp_path):
+    class TestConfig(Config):
+        TESTING = True
+        DB_BOOTSTRAP = False
+        JOBS_ENABLED = False
+        COMPRESS_STATIC = False
+        JINJA_BYTECODE_CACHE = False
+        UPLOAD_FOLDER = str(tmp_path / "uploads")
+        UPLOAD_TMP_FOLDER = str(tmp_path / "upload-tmp")
+
+    app = create_app(TestConfig)
+    with app.app_context():
+        yield app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def local_tz(monkeypatch):
+    """Runs the test with the server in UTC+6 (no DST), so naive datetimes have a known offset."""
+    monkeypatch.setenv("TZ", "Asia/Dhaka")
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
@@ -0,0 +1,56 @@
+import json
+import re
+
+from app.assets import HASH_LENGTH, asset_importmap, asset_url, build_manifest, fingerprint, get_manifest
+
+
+def write(path, data=b"x"):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    return path
+
+
+def test_manifest_inserts_the_content_hash_before_the_extension(tmp_path):
+    app_js = write(tmp_path / "js" / "app.js", b"console.log(1)")
+    write(tmp_path / "favicon.ico")
+    manifest = build_manifest(str(tmp_path))
+    digest = fingerprint(str(app_js))
+    assert len(digest) == HASH_LENGTH
+    assert manifest["js/app.js"] == f"js/app.{digest}.js"
+    assert re.fullmatch(rf"favicon\.[0-9a-f]{{{HASH_LENGTH}}}\.ico", manifest["favicon.ico"])
+
+
+def test_manifest_skips_excluded_dirs_and_compressed_copies(tmp_path):
+    write(tmp_path / "CSS" / "style.css")
+    write(tmp_path / "CSS" / "style.css.gz")
+    write(tmp_path / "CSS" / "style.css.br")
+    write(tmp_path / "uploads" / "ab" / "photo.jpg")
+    assert list(build_manifest(str(tmp_path), exclude=("uploads",))) == ["CSS/style.css"]
+
+
+def test_fingerprint_follows_content(tmp_path):
+    a = write(tmp_path / "a.js", b"one")
+    before = fingerprint(str(a))
+    a.write_bytes(b"two")
+    assert fingerprint(str(a)) != before
+
+
+def test_templates_get_fingerprinted_urls(app):
+    hashed = get_manifest().manifest["js/app.js"]
+    with app.test_request_context():
+        assert asset_url("js/app.js") == f"/static/{hashed}"
+        assert asset_url("missing.js") == "/static/missing.js"
+        body = str(asset_importmap())
+    imports = json.loads(body[len('<script type="importmap">'):-len("</script>")])["imports"]
+    assert imports["/static/js/api.js"] == f"/static/{get_manifest().manifest['js/api.js']}"
+
+
+def test_fingerprinted_urls_are_immutable_and_plain_ones_revalidate(app, client):
+    hashed = get_manifest().manifest["js/app.js"]
+    immutable = client.get(f"/static/{hashed}")
+    assert immutable.status_code == 200
+    assert "immutable" in immutable.headers["Cache-Control"]
+    plain = client.get("/static/js/app.js")
+    assert plain.status_code == 200
+    assert "immutable" not in plain.headers.get("Cache-Control", "")
+    assert plain.get_data() == immutable.get_data()
@@ -0,0 +1,101 @@
+from datetime import datetime
+
+from app import cache as cache_module
+from app.cache import ResultCache, feed_cache_key
+from app.feed import feed_filters
+from app.utils import row_class
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_get_and_miss_counters():
+    c = ResultCache()
+    assert c.get("a") is None
+    c.set("a", [1, 2])
+    assert c.get("a") == [1, 2]
+    assert c.stats()["hits"] == 1 and c.stats()["misses"] == 1
+
+def test_least_recently_used_entry_is_evicted():
+    c = ResultCache(max_entries=2)
+    c.set("a", 1)
+    c.set("b", 2)
+    c.get("a")
+    c.set("c", 3)
+    assert c.get("b") is None
+    assert c.get("a") == 1 and c.get("c") == 3
+    assert c.stats()["evictions"] == 1
+
+def test_byte_cap_evicts_and_skips_oversized_values():
+    c = ResultCache(max_bytes=10)
+    c.set("big", "x" * 20)
+    assert c.get("big") is None
+    c.set("a", "12345")
+    c.set("b", "12345")
+    assert c.get("a") is None and c.get("b") == "12345"
+
+def test_entries_expire_after_ttl(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache_module.time, "monotonic", clock)
+    c = ResultCache(ttl=30)
+    c.set("a", 1)
+    clock.now += 29
+    assert c.get("a") == 1
+    clock.now += 2
+    assert c.get("a") is None
+    assert c.stats()["entries"] == 0
+
+def test_fill_computed_across_a_clear_is_dropped():
+    c = ResultCache()
+    token = c.token("a")
+    c.clear()
+    c.set("a", 1, token)
+    assert c.get("a") is None
+    c.set("a", 1, c.token("a"))
+    assert c.get("a") == 1
+
+def test_delete_only_invalidates_fills_of_its_own_key():
+    c = ResultCache()
+    token_a, token_b = c.token("a"), c.token("b")
+    c.delete("b")
+    c.set("a", 1, token_a)
+    c.set("b", 2, token_b)
+    assert c.get("a") == 1
+    assert c.get("b") is None
+
+def test_version_table_stays_bounded():
+    c = ResultCache(max_entries=2)
+    token = c.token("a")
+    for key in range(9):
+        c.delete(key)
+    assert len(c._versions) <= 8
+    # Forgetting versions starts a new generation, so older tokens stay invalid.
+    c.set("a", 1, token)
+    assert c.get("a") is None
+
+def test_cached_values_are_isolated_from_callers():
+    Row = row_class(("id", "created_at"))
+    page = ([Row(1, datetime(2026, 1, 1)), {"id": 2}], "next")
+    c = ResultCache()
+    c.set("page", page)
+    page[0].append("stored, then changed")
+    page[0][0].id = 99
+
+    got = c.get("page")
+    assert len(got[0]) == 2 and got[0][0].id == 1
+    got[0][0].id = 42
+    got[0][1]["id"] = 42
+    got[0].clear()
+
+    again = c.get("page")
+    assert again[0][0].id == 1 and again[0][1] == {"id": 2}
+
+def test_feed_cache_key_normalizes_equivalent_filters():
+    a = feed_cache_key(feed_filters({"search": "  Rice  Bowl", "type": "All Types"}), None, 20, "cols")
+    b = feed_cache_key(feed_filters({"search": "rice bowl", "type": "all"}), "", 20, "cols")
+    assert a == b
@@ -0,0 +1,75 @@
+from app.changelog import changes_since, log_change, log_changes
+
+
+class FakeCursor:
+    """
+    Records statements; answers the change log reads from `changes` and `posts`.
+    """
+
+    def __init__(self, changes=(), posts=()):
+        self.changes = list(changes)  # (version, post_id, op)
+        self.posts = {p["id"]: p for p in posts}
+        self.statements = []
+        self.description = None
+        self._rows = []
+
+    def execute(self, sql, params=()):
+        sql = " ".join(sql.split())
+        self.statements.append(sql)
+        self._rows, self.description = [], None
+        if sql.startswith("SELECT MIN(version)"):
+            versions = [c[0] for c in self.changes]
+            self._rows = [(min(versions, default=None), max(versions, default=0))]
+        elif sql.startswith("SELECT version, post_id, op"):
+            since, limit = params
+            self._rows = [c for c in self.changes if c[0] > since][:limit]
+        elif sql.startswith("SELECT p.*"):
+            self.description = [("id",), ("title",)]
+            self._rows = [(i, self.posts[i]["title"]) for i in params if i in self.posts]
+
+    def executemany(self, sql, seq):
+        self.statements.append(" ".join(sql.split()))
+
+    def fetchone(self):
+        return self._rows[0]
+
+    def fetchall(self):
+        return self._rows
+
+
+def test_version_row_is_locked_before_a_change_gets_its_version():
+    cur = FakeCursor()
+    log_change(cur, 1, "update")
+    log_changes(cur, [2, 3], "update")
+    tables = ["data_versions" if "data_versions" in s else "post_changes" for s in cur.statements]
+    assert tables == ["data_versions", "post_changes", "data_versions", "post_changes"]
+
+
+def test_changes_are_classified_by_first_and_last_op():
+    cur = FakeCursor(
+        changes=[(1, 10, "insert"), (2, 11, "update"), (3, 12, "update"), (4, 12, "delete"),
+                 (5, 13, "insert"), (6, 13, "delete"), (7, 11, "update")],
+        posts=[{"id": 10, "title": "new"}, {"id": 11, "title": "changed"}],
+    )
+    delta = changes_since(cur, 0)
+    assert delta["version"] == 7
+    assert [p["id"] for p in delta["inserted"]] == [10]
+    assert [p["id"] for p in delta["updated"]] == [11]
+    assert delta["removed"] == [12]
+    assert delta["more"] is False
+
+
+def test_changes_are_paged_by_version():
+    cur = FakeCursor(changes=[(v, v, "update") for v in range(1, 6)], posts=[{"id": i, "title": ""} for i in range(1, 6)])
+    first = changes_since(cur, 0, limit=3)
+    assert (first["version"], first["more"]) == (3, True)
+    second = changes_since(cur, first["version"], limit=3)
+    assert (second["version"], second["more"]) == (5, False)
+    assert changes_since(cur, 5)["version"] == 5
+
+
+def test_resync_when_since_is_compacted_away_or_in_the_future():
+    cur = FakeCursor(changes=[(5, 1, "update"), (6, 1, "update")])
+    assert changes_since(cur, 4) is not None
+    assert changes_since(cur, 3) is None
+    assert changes_since(cur, 7) is None
@@ -0,0 +1,136 @@
+import gzip
+import os
+
+import pytest
+from flask import Response
+from werkzeug.datastructures import Accept
+from werkzeug.http import parse_accept_header
+
+from app import compression
+from app.compression import choose_encoding, precompress_static
+
+BIG = "eco " * 1000
+
+
+@pytest.fixture(autouse=True)
+def gzip_only(monkeypatch):
+    # brotli is optional; pin the choice so the tests read the same either way.
+    monkeypatch.setattr(compression, "brotli", None)
+
+
+def accept(header):
+    return parse_accept_header(header, Accept)
+
+
+def write(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    return path
+
+
+def test_choose_encoding():
+    assert choose_encoding(accept("gzip, deflate")) == "gzip"
+    assert choose_encoding(accept("*")) == "gzip"
+    assert choose_encoding(accept("identity")) is None
+    assert choose_encoding(accept("gzip;q=0")) is None
+    assert choose_encoding(accept("")) is None
+
+
+def test_choose_encoding_prefers_brotli_when_installed(monkeypatch):
+    monkeypatch.setattr(compression, "brotli", object())
+    assert choose_encoding(accept("gzip, br")) == "br"
+    assert choose_encoding(accept("gzip, br;q=0.5")) == "gzip"
+
+
+@pytest.fixture
+def routes(app):
+    @app.get("/t/big")
+    def big():
+        response = Response(BIG, mimetype="text/plain")
+        response.set_etag("abc")
+        return response
+
+    @app.get("/t/small")
+    def small():
+        return Response("eco", mimetype="text/plain")
+
+    @app.get("/t/binary")
+    def binary():
+        return Response(b"\0" * 4096, mimetype="image/png")
+
+    @app.get("/t/streamed")
+    def streamed():
+        return Response((BIG for _ in range(2)), mimetype="text/plain")
+
+    return app
+
+
+def test_compresses_large_bodies_and_weakens_the_etag(client, routes):
+    response = client.get("/t/big", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(response.data).decode() == BIG
+    assert response.headers["ETag"] == 'W/"abc"'
+    assert "Accept-Encoding" in response.headers["Vary"]
+
+
+def test_leaves_small_unlisted_and_streamed_bodies_alone(client, routes):
+    for url in ("/t/small", "/t/binary", "/t/streamed"):
+        response = client.get(url, headers={"Accept-Encoding": "gzip"})
+        assert "Content-Encoding" not in response.headers, url
+        assert "Accept-Encoding" in response.headers["Vary"]
+
+
+def test_identity_when_the_client_accepts_nothing(client, routes):
+    response = client.get("/t/big", headers={"Accept-Encoding": "identity"})
+    assert "Content-Encoding" not in response.headers
+    assert response.headers["ETag"] == '"abc"'
+
+
+def test_precompress_writes_fresh_copies_once(app, tmp_path):
+    css = write(tmp_path / "css" / "style.css", BIG.encode())
+    write(tmp_path / "logo.png", BIG.encode())
+    write(tmp_path / "tiny.js", b"1")
+    assert precompress_static(str(tmp_path), app.config) == 1
+    assert gzip.decompress((tmp_path / "css" / "style.css.gz").read_bytes()) == BIG.encode()
+    assert precompress_static(str(tmp_path), app.config) == 0
+
+    # A source edited after its copy gets a new one.
+    os.utime(css, (os.path.getmtime(css) + 10,) * 2)
+    assert precompress_static(str(tmp_path), app.config) == 1
+
+
+def test_precompress_skips_excluded_dirs(app, tmp_path):
+    write(tmp_path / "uploads" / "ab" / "notes.txt", BIG.encode())
+    write(tmp_path / "js" / "uploads" / "app.js", BIG.encode())
+    assert precompress_static(str(tmp_path), app.config, exclude=("uploads",)) == 1
+    assert not (tmp_path / "uploads" / "ab" / "notes.txt.gz").exists()
+    assert (tmp_path / "js" / "uploads" / "app.js.gz").exists()
+
+
+@pytest.fixture
+def static_dir(app, tmp_path):
+    folder = tmp_path / "static"
+    write(folder / "app.js", BIG.encode())
+    precompress_static(str(folder), app.config)
+    app.static_folder = str(folder)
+    return folder
+
+
+def test_send_static_serves_the_precompressed_copy(client, static_dir):
+    response = client.get("/static/app.js", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.mimetype == "text/javascript"
+    assert gzip.decompress(response.data) == BIG.encode()
+
+
+def test_send_static_falls_back_to_the_original(client, static_dir):
+    plain = client.get("/static/app.js", headers={"Accept-Encoding": "identity"})
+    assert "Content-Encoding" not in plain.headers
+    assert plain.data == BIG.encode()
+
+    # A copy older than its source is stale.
+    source = static_dir / "app.js"
+    os.utime(source, (os.path.getmtime(source) + 10,) * 2)
+    stale = client.get("/static/app.js", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in stale.headers
+    assert stale.data == BIG.encode()
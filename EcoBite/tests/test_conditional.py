@@ -0,0 +1,111 @@
+from datetime import datetime
+
+import pytest
+from flask import session
+
+from app import conditional
+
+
+class VersionCursor:
+    """Answers read_versions() from a {name: (version, updated_at)} dict."""
+
+    def __init__(self, versions):
+        self.versions = versions
+        self._rows = []
+
+    def execute(self, sql, params=()):
+        self._rows = [(name, *self.versions[name]) for name in params if name in self.versions]
+
+    def fetchall(self):
+        return self._rows
+
+
+@pytest.fixture
+def versions(app, monkeypatch, local_tz):
+    versions = {"posts": (3, datetime(2026, 1, 2, 10, 0, 0)), "claims": (1, datetime(2026, 1, 1, 9, 0, 0))}
+    monkeypatch.setattr(conditional, "get_cursor", lambda: VersionCursor(versions))
+    calls = []
+
+    @app.get("/t/feed")
+    @conditional.conditional_get("posts", "claims")
+    def feed():
+        calls.append("feed")
+        return "feed"
+
+    @app.get("/t/mine")
+    @conditional.conditional_get("posts", per_user=True)
+    def mine():
+        calls.append("mine")
+        return "mine"
+
+    @app.get("/t/login/<int:user_id>")
+    def login(user_id):
+        session["user_id"] = user_id
+        return ""
+
+    versions["calls"] = calls
+    return versions
+
+
+def test_matching_etag_skips_the_view(client, versions):
+    first = client.get("/t/feed")
+    assert first.status_code == 200
+    assert first.headers["Cache-Control"] == "no-cache"
+    # 10:00 server time in UTC+6.
+    assert first.headers["Last-Modified"] == "Fri, 02 Jan 2026 04:00:00 GMT"
+    etag = first.headers["ETag"]
+
+    again = client.get("/t/feed", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.headers["ETag"] == etag
+    assert versions["calls"] == ["feed"]
+
+
+def test_a_version_bump_changes_the_etag(client, versions):
+    etag = client.get("/t/feed").headers["ETag"]
+    versions["claims"] = (2, datetime(2026, 1, 3))
+    fresh = client.get("/t/feed", headers={"If-None-Match": etag})
+    assert fresh.status_code == 200
+    assert fresh.headers["ETag"] != etag
+
+
+def test_query_string_is_part_of_the_etag(client, versions):
+    assert client.get("/t/feed?page=1").headers["ETag"] != client.get("/t/feed?page=2").headers["ETag"]
+
+
+def test_weak_if_none_match_still_matches(client, versions):
+    # Compression weakens the ETag on the way out; the client echoes W/"...".
+    etag = client.get("/t/feed").headers["ETag"]
+    assert client.get("/t/feed", headers={"If-None-Match": "W/" + etag}).status_code == 304
+
+
+def test_if_modified_since(client, versions):
+    assert client.get("/t/feed", headers={"If-Modified-Since": "Fri, 02 Jan 2026 04:00:00 GMT"}).status_code == 304
+    assert client.get("/t/feed", headers={"If-Modified-Since": "Fri, 02 Jan 2026 03:59:59 GMT"}).status_code == 200
+
+
+def test_if_none_match_wins_over_if_modified_since(client, versions):
+    response = client.get("/t/feed", headers={
+        "If-None-Match": '"stale"',
+        "If-Modified-Since": "Sat, 03 Jan 2026 00:00:00 GMT",
+    })
+    assert response.status_code == 200
+
+
+def test_per_user_responses_vary_by_user(client, versions):
+    client.get("/t/login/1")
+    one = client.get("/t/mine")
+    assert one.headers["Cache-Control"] == "private, no-cache"
+    assert "Cookie" in one.headers["Vary"]
+
+    client.get("/t/login/2")
+    two = client.get("/t/mine", headers={"If-None-Match": one.headers["ETag"]})
+    assert two.status_code == 200
+    assert two.headers["ETag"] != one.headers["ETag"]
+
+
+def test_missing_version_rows_fall_through_to_the_view(client, versions):
+    del versions["claims"]
+    response = client.get("/t/feed")
+    assert response.status_code == 200
+    assert "ETag" not in response.headers
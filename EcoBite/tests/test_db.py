@@ -0,0 +1,258 @@
+import threading
+
+import pytest
+
+from app import db as db_module
+from app.db import CircuitBreaker, CircuitOpen, ConnectionPool, PoolTimeout
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeConnection:
+    def __init__(self, n):
+        self.n = n
+        self.closed = False
+        self.rollbacks = 0
+        self.ping_fails = False
+        self.rollback_fails = False
+
+    def ping(self):
+        if self.ping_fails:
+            raise RuntimeError("gone away")
+
+    def rollback(self):
+        self.rollbacks += 1
+        if self.rollback_fails:
+            raise RuntimeError("gone away")
+
+    def close(self):
+        self.closed = True
+
+
+class Connector:
+    def __init__(self):
+        self.opened = []
+
+    def __call__(self):
+        conn = FakeConnection(len(self.opened))
+        self.opened.append(conn)
+        return conn
+
+
+def make_pool(**kwargs):
+    connect = Connector()
+    kwargs.setdefault("breaker", CircuitBreaker(threshold=100))
+    return ConnectionPool(connect, **kwargs), connect
+
+
+def test_idle_connections_are_reused():
+    pool, connect = make_pool(size=2)
+    conn = pool.acquire()
+    pool.release(conn)
+    assert pool.acquire() is conn
+    assert len(connect.opened) == 1
+
+
+def test_release_rolls_back_and_a_failed_rollback_discards():
+    pool, connect = make_pool()
+    conn = pool.acquire()
+    pool.release(conn)
+    assert conn.rollbacks == 1 and not conn.closed
+
+    conn = pool.acquire()
+    conn.rollback_fails = True
+    pool.release(conn)
+    assert conn.closed
+    assert pool.stats()["open"] == 0
+
+
+def test_overflow_connections_are_closed_on_release():
+    pool, connect = make_pool(size=1, max_overflow=1)
+    a, b = pool.acquire(), pool.acquire()
+    assert pool.stats()["in_use"] == 2
+    pool.release(a)
+    pool.release(b)
+    assert not a.closed and b.closed
+    assert pool.stats()["idle"] == 1
+    assert pool.stats()["open"] == 1
+
+
+def test_exhausted_pool_times_out_and_counts_the_wait():
+    pool, _ = make_pool(size=1, max_overflow=0, timeout=0.05)
+    pool.acquire()
+    with pytest.raises(PoolTimeout):
+        pool.acquire()
+    stats = pool.stats()
+    assert stats["waits"] == 1
+    assert stats["wait_time_s"] >= 0.04
+
+
+def test_waiter_gets_the_released_connection():
+    pool, connect = make_pool(size=1, max_overflow=0, timeout=5)
+    conn = pool.acquire()
+    got = []
+    waiter = threading.Thread(target=lambda: got.append(pool.acquire()))
+    waiter.start()
+    while pool.stats()["waits"] == 0:
+        pass
+    pool.release(conn)
+    waiter.join(5)
+    assert got == [conn]
+    assert len(connect.opened) == 1
+
+
+def test_old_connections_are_recycled(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(db_module.time, "monotonic", clock)
+    pool, connect = make_pool(recycle=60)
+    conn = pool.acquire()
+    pool.release(conn)
+    clock.now += 61
+    fresh = pool.acquire()
+    assert fresh is not conn
+    assert conn.closed
+    assert pool.stats()["open"] == 1
+
+
+def test_connection_failing_pre_ping_is_replaced():
+    pool, connect = make_pool()
+    conn = pool.acquire()
+    pool.release(conn)
+    conn.ping_fails = True
+    fresh = pool.acquire()
+    assert fresh is not conn and conn.closed
+    stats = pool.stats()
+    assert (stats["in_use"], stats["open"]) == (1, 1)
+
+
+def test_unhealthy_connection_is_closed_outside_the_pool_lock():
+    pool, _ = make_pool()
+    conn = pool.acquire()
+    pool.release(conn)
+    conn.ping_fails = True
+    held = []
+    conn.close = lambda: held.append(pool._lock._is_owned())
+    pool.acquire()
+    assert held == [False]
+
+
+def test_failed_connect_frees_the_reserved_slot():
+    def refuse():
+        raise RuntimeError("refused")
+
+    pool = ConnectionPool(refuse, size=1, max_overflow=0, breaker=CircuitBreaker(threshold=100))
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            pool.acquire()
+    assert pool.stats()["in_use"] == 0
+
+
+def test_dispose_closes_idle_connections():
+    pool, connect = make_pool(size=2)
+    a, b = pool.acquire(), pool.acquire()
+    pool.release(a)
+    pool.dispose()
+    assert a.closed and not b.closed
+    pool.release(b)
+    assert pool.stats()["idle"] == 1
+
+
+def test_breaker_opens_after_threshold_failures(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(db_module.time, "monotonic", clock)
+    breaker = CircuitBreaker(threshold=3, reset_timeout=2.0)
+    for _ in range(2):
+        breaker.failure()
+    breaker.before()
+    breaker.failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpen) as e:
+        breaker.before()
+    assert e.value.retry_after == pytest.approx(2.0)
+
+
+def test_success_resets_the_failure_count():
+    breaker = CircuitBreaker(threshold=2)
+    breaker.failure()
+    breaker.success()
+    breaker.failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_only_one_half_open_probe_is_let_through(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(db_module.time, "monotonic", clock)
+    breaker = CircuitBreaker(threshold=1, reset_timeout=2.0)
+    breaker.failure()
+    clock.now += 2.0
+    breaker.before()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    with pytest.raises(CircuitOpen):
+        breaker.before()
+    breaker.success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.before()
+
+
+def test_failed_probes_double_the_backoff_up_to_the_cap(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(db_module.time, "monotonic", clock)
+    breaker = CircuitBreaker(threshold=1, reset_timeout=2.0, max_reset=5.0)
+    breaker.failure()
+    backoffs = []
+    for _ in range(3):
+        clock.now += breaker.stats()["backoff_s"]
+        breaker.before()
+        breaker.failure()
+        backoffs.append(breaker.stats()["backoff_s"])
+    assert backoffs == [4.0, 5.0, 5.0]
+    assert breaker.stats()["trips"] == 4
+    clock.now += 4.9
+    with pytest.raises(CircuitOpen):
+        breaker.before()
+
+
+def test_abandoned_probe_reopens_without_extending_the_backoff(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(db_module.time, "monotonic", clock)
+    breaker = CircuitBreaker(threshold=1, reset_timeout=2.0)
+    breaker.failure()
+    clock.now += 2.0
+    breaker.before()
+    breaker.abandon()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert breaker.stats()["backoff_s"] == 2.0
+    # The backoff already elapsed, so the next caller probes again.
+    breaker.before()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+
+def test_pool_timeout_abandons_the_probe():
+    pool, _ = make_pool(size=1, max_overflow=0, timeout=0.01, breaker=CircuitBreaker(threshold=1, reset_timeout=0))
+    pool.acquire()
+    pool.breaker.failure()
+    # The backoff has elapsed, so this caller is the probe; it never reaches the database.
+    with pytest.raises(PoolTimeout):
+        pool.acquire()
+    assert pool.breaker.state == CircuitBreaker.OPEN
+
+
+def test_open_circuit_is_a_503_with_retry_after(app, client):
+    breaker = db_module.get_pool().breaker
+    for _ in range(breaker.threshold):
+        breaker.failure()
+    api = client.get("/api/food-posts")
+    assert api.status_code == 503
+    assert api.get_json() == {"error": "Database unavailable"}
+    assert 1 <= int(api.headers["Retry-After"]) <= breaker.reset_timeout + 1
+    with client.session_transaction() as session:
+        session["user_id"] = 1
+    page = client.get("/home")
+    assert page.status_code == 503
+    assert "Retry-After" in page.headers
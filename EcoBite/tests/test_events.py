@@ -0,0 +1,137 @@
+import json
+
+from app.events import EventBroker, change_event
+
+
+class ChangeLog:
+    """Stands in for the post_changes table, shared by every broker like the real one."""
+
+    def __init__(self):
+        self.rows = []  # (version, post_id, op, status)
+        self.fetches = []
+
+    def add(self, version, post_id, op="insert", status="active"):
+        self.rows.append((version, post_id, op, status))
+
+    def fetch(self, after, limit):
+        self.fetches.append(after)
+        if after is None:
+            return self.rows[-limit:]
+        return [r for r in self.rows if r[0] > after][:limit]
+
+
+def make_broker(log, **kw):
+    kw.setdefault("heartbeat", 0)
+    kw.setdefault("poll_interval", 3600)
+    return EventBroker(log.fetch, **kw)
+
+
+def frames(broker, last_event_id=None, count=1):
+    """The first `count` frames after the retry hint."""
+    stream = broker.stream(last_event_id)
+    assert next(stream) == "retry: 3000\n\n"
+    out = [next(stream) for _ in range(count)]
+    stream.close()
+    return out
+
+
+def event_id(frame):
+    return frame.split("\n", 1)[0][len("id: "):]
+
+
+def event_name(frame):
+    return frame.split("\n")[1][len("event: "):]
+
+
+def test_change_rows_map_to_feed_events():
+    assert change_event("insert", "active") == "post-created"
+    assert change_event("update", "claimed") == "post-claimed"
+    assert change_event("update", "completed") == "post-claimed"
+    assert change_event("update", "expired") == "post-expired"
+    assert change_event("update", "active") == "post-updated"
+    assert change_event("update", None) == "post-updated"
+
+
+def test_replays_changes_after_last_event_id():
+    log = ChangeLog()
+    for version in (3, 5, 9):
+        log.add(version, version * 10)
+    broker = make_broker(log, buffer_size=10)
+    first = frames(broker, "2", count=4)
+    assert [event_id(f) for f in first] == ["3", "5", "9", "9"]
+    assert [event_name(f) for f in first] == ["post-created"] * 3 + ["stats-changed"]
+    assert json.loads(first[0].rsplit("data: ", 1)[1])["post_id"] == 30
+
+    # Versions have gaps; replay is by order, not by arithmetic.
+    rest = frames(broker, "5", count=2)
+    assert [event_id(f) for f in rest] == ["9", "9"]
+
+
+def test_new_subscriber_starts_at_the_head():
+    log = ChangeLog()
+    log.add(1, 1)
+    broker = make_broker(log)
+    assert frames(broker) == [": ping\n\n"]
+
+
+def test_polling_delivers_new_changes_with_their_current_status():
+    log = ChangeLog()
+    log.add(1, 1)
+    broker = make_broker(log)
+    stream = broker.stream()
+    next(stream)
+    log.add(2, 1, "update", "claimed")
+    broker.poll()
+    assert event_name(next(stream)) == "post-claimed"
+    assert event_name(next(stream)) == "stats-changed"
+    stream.close()
+    assert log.fetches == [None, 1]
+
+
+def test_workers_agree_on_event_ids():
+    log = ChangeLog()
+    log.add(4, 1)
+    a, b = make_broker(log), make_broker(log)
+    frames(a)
+    frames(b)
+    log.add(7, 2)
+    a.poll()
+    seen = frames(a, "4")[0]
+    assert event_id(seen) == "7"
+    # b has not polled yet: the id from a is ahead of it, so b polls instead of resetting.
+    assert frames(b, "7") == [": ping\n\n"]
+    assert frames(b, "4")[0] == seen
+
+
+def test_ids_older_than_the_buffer_get_a_reset():
+    log = ChangeLog()
+    for version in range(1, 6):
+        log.add(version, version)
+    broker = make_broker(log, buffer_size=3)
+    assert event_name(frames(broker, "1")[0]) == "reset"
+    # The oldest id the buffer still covers resumes normally.
+    assert event_name(frames(broker, "3")[0]) == "post-created"
+
+
+def test_unknown_ids_get_a_reset():
+    log = ChangeLog()
+    log.add(1, 1)
+    broker = make_broker(log)
+    for stale in ("abc-1", "99", "garbage"):
+        assert event_name(frames(broker, stale)[0]) == "reset"
+
+
+def test_empty_change_log_resumes_from_zero():
+    broker = make_broker(ChangeLog())
+    assert frames(broker, "0") == [": ping\n\n"]
+
+
+def test_subscriber_count_follows_open_streams():
+    broker = make_broker(ChangeLog())
+    stream = broker.stream()
+    next(stream)
+    assert broker.stats()["subscribers"] == 1
+    assert broker.stats()["polling"] is True
+    stream.close()
+    assert broker.stats()["subscribers"] == 0
+    assert broker.stats()["cooperative"] is False
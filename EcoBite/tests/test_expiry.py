@@ -0,0 +1,101 @@
+from app import expiry
+
+
+class FakeCursor:
+    """
+    Answers the sweep's statements from a list of overdue (id, user_id) rows.
+    """
+
+    def __init__(self, overdue, claimers=()):
+        self.overdue = list(overdue)
+        self.claimers = list(claimers)
+        self.statements = []
+        self.rowcount = -1
+        self._rows = []
+
+    def execute(self, sql, params=()):
+        sql = " ".join(sql.split())
+        self.statements.append((sql, params))
+        self._rows, self.rowcount = [], -1
+        if sql.startswith("SELECT id, user_id FROM posts"):
+            limit = params[0]
+            self._rows, self.overdue = self.overdue[:limit], self.overdue[limit:]
+        elif sql.startswith("SELECT DISTINCT claimer_id"):
+            self._rows = [(c,) for c in self.claimers]
+        elif sql.startswith("UPDATE claims SET status='expired'"):
+            self.rowcount = len(self.claimers)
+        elif sql.startswith("UPDATE posts SET status='expired'"):
+            self.rowcount = len(params)
+        else:
+            self.rowcount = 1
+
+    def executemany(self, sql, seq):
+        self.statements.append((" ".join(sql.split()), list(seq)))
+        self.rowcount = len(self.statements[-1][1])
+
+    def fetchall(self):
+        return self._rows
+
+    def fetchone(self):
+        return self._rows[0] if self._rows else None
+
+    def close(self):
+        pass
+
+
+class FakeConn:
+    def __init__(self, cursor):
+        self.cur = cursor
+        self.commits = 0
+
+    def cursor(self):
+        return self.cur
+
+    def commit(self):
+        self.commits += 1
+
+
+def executed(cur, prefix):
+    return [params for sql, params in cur.statements if sql.startswith(prefix)]
+
+
+def test_sweep_expires_in_batches(app):
+    cur = FakeCursor([(i, 100 + i) for i in range(1, 6)], claimers=[7])
+    conn = FakeConn(cur)
+    touched = expiry.sweep(conn, batch_size=2, max_batches=10)
+
+    assert touched == {"posts": 5, "claims": 3}
+    assert executed(cur, "UPDATE posts SET status='expired'") == [(1, 2), (3, 4), (5,)]
+    assert conn.commits == 3
+    counters = executed(cur, "UPDATE impact_counters")
+    assert len(counters) == 3
+
+
+def test_sweep_locks_posts_before_claims(app):
+    cur = FakeCursor([(1, 10)], claimers=[7])
+    expiry.sweep(FakeConn(cur), batch_size=10)
+    order = [sql.split(" WHERE")[0] for sql, _ in cur.statements]
+    assert order[0].startswith("SELECT id, user_id FROM posts")
+    assert "FOR UPDATE" in cur.statements[0][0]
+    assert order.index("UPDATE claims SET status='expired', decided_at=NOW()") < order.index("UPDATE posts SET status='expired'")
+
+
+def test_sweep_stops_at_max_batches(app):
+    cur = FakeCursor([(i, 1) for i in range(10)])
+    touched = expiry.sweep(FakeConn(cur), batch_size=2, max_batches=2)
+    assert touched["posts"] == 4
+    assert len(cur.overdue) == 6
+
+
+def test_sweep_logs_expired_posts(app):
+    # The event stream picks the expiry up from the change log.
+    cur = FakeCursor([(3, 1), (4, 2)])
+    expiry.sweep(FakeConn(cur), batch_size=10)
+    assert executed(cur, "INSERT INTO post_changes") == [[(3, "update"), (4, "update")]]
+
+
+def test_sweep_with_nothing_due_logs_nothing(app):
+    cur = FakeCursor([])
+    assert expiry.sweep(FakeConn(cur)) == {"posts": 0, "claims": 0}
+    assert executed(cur, "UPDATE") == []
+    assert executed(cur, "INSERT") == []
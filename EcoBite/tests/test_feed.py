@@ -0,0 +1,175 @@
+from datetime import datetime
+
+import pytest
+
+from app.feed import (
+    MATCH_EXPR, NO_EXPIRY, RELEVANCE_EXPR, SEARCH_COLUMNS, FeedStream, InvalidCursor, _keyset, _where,
+    cached_feed_page, decode_cursor, encode_cursor, feed_filters, fulltext_query, like_pattern, page_size, short_tokens,
+)
+
+
+def test_cursor_round_trip_newest():
+    row = {"id": 42, "created_at": datetime(2026, 3, 1, 12, 30, 5, 123456)}
+    token = encode_cursor("newest", row)
+    assert "=" not in token
+    assert decode_cursor(token, "newest") == ("2026-03-01 12:30:05.123456", 42)
+
+def test_cursor_round_trip_without_expiry():
+    token = encode_cursor("endingSoon", {"id": 7, "expires_at": None})
+    assert decode_cursor(token, "endingSoon") == (None, 7)
+
+def test_cursor_is_tied_to_its_sort():
+    token = encode_cursor("newest", {"id": 1, "created_at": datetime(2026, 1, 1)})
+    with pytest.raises(InvalidCursor):
+        decode_cursor(token, "endingSoon")
+
+@pytest.mark.parametrize("token", ["", "not-base64!", "WzEsMl0", "WyJuZXdlc3QiLDEsIngiXQ"])
+def test_malformed_cursors_are_rejected(token):
+    with pytest.raises(InvalidCursor):
+        decode_cursor(token, "newest")
+
+def test_ending_soon_keyset_uses_the_sentinel_column():
+    clause, params, order = _keyset("endingSoon", None)
+    assert clause is None and order == "p.expires_sort ASC, p.id ASC"
+    clause, params, _ = _keyset("endingSoon", ("2026-01-01 00:00:00.000000", 5))
+    assert "expires_at" not in clause
+    assert params == ["2026-01-01 00:00:00.000000", "2026-01-01 00:00:00.000000", 5]
+    _, params, _ = _keyset("endingSoon", (None, 9))
+    assert params == [NO_EXPIRY, NO_EXPIRY, 9]
+
+@pytest.mark.parametrize("value,expected", [("10", 10), ("0", 1), ("500", 100), ("x", 20), (None, 20)])
+def test_page_size_is_clamped(value, expected):
+    assert page_size(value, 20, 100) == expected
+
+
+def filters(**overrides):
+    base = feed_filters({})
+    base.update(overrides)
+    return base
+
+def test_fulltext_query_requires_every_long_token_as_prefix():
+    assert fulltext_query("Veg Pizza") == "+veg* +pizza*"
+    assert fulltext_query("5 kg rice") == "+rice*"
+    assert fulltext_query("a b") is None
+
+def test_short_tokens_are_kept_and_deduplicated():
+    assert short_tokens("5 kg rice 5") == ["5", "kg"]
+    assert short_tokens("tea") == []
+    assert short_tokens("!!") == ["!!"]
+
+def test_like_pattern_escapes_wildcards():
+    assert like_pattern("a_b%c") == "%a\\_b\\%c%"
+
+def test_mixed_search_requires_short_tokens_in_any_searched_column():
+    clauses, params = _where(filters(search="5 kg rice"))
+    assert MATCH_EXPR in clauses
+    likes = [c for c in clauses if "LIKE" in c]
+    assert len(likes) == 2
+    assert all(col in likes[0] for col in SEARCH_COLUMNS)
+    assert params == ["+rice*"] + ["%5%"] * 4 + ["%kg%"] * 4
+
+def test_short_only_search_is_a_substring_match():
+    clauses, params = _where(filters(search="kg"))
+    assert MATCH_EXPR not in clauses
+    assert params == ["%kg%"] * 4
+
+def test_relevance_sort_falls_back_without_indexable_words():
+    assert feed_filters({"search": "kg"})["sort"] == "newest"
+    assert feed_filters({"search": "rice"})["sort"] == "relevance"
+
+def test_relevance_keyset_compares_integer_buckets():
+    clause, params, order = _keyset("relevance", (1234.0, 8), "+rice*")
+    assert clause.count(RELEVANCE_EXPR) == 2 and MATCH_EXPR + " <" not in clause
+    assert params == ["+rice*", 1234.0, "+rice*", 1234.0, 8]
+    assert order == "relevance DESC, p.id DESC"
+
+def test_unknown_dietary_filter_matches_nothing_instead_of_everything():
+    f = feed_filters({"dietary": "Foo"})
+    assert f["dietary"] == ("Foo",)
+    clauses, params = _where(f)
+    assert any("post_tags" in c for c in clauses)
+    assert params[-2:] == ["Foo", 1]
+
+def test_no_dietary_filter_adds_no_clause():
+    clauses, _ = _where(feed_filters({"dietary": ""}))
+    assert not any("post_tags" in c for c in clauses)
+
+
+def test_available_filter_excludes_overdue_posts_the_sweep_missed():
+    clauses, _ = _where(filters(status="available"))
+    assert "p.status='active' AND (p.expires_at IS NULL OR p.expires_at > NOW())" in clauses
+
+
+def test_expired_filter_includes_overdue_active_posts():
+    clauses, _ = _where(filters(status="expired"))
+    assert "(p.status='expired' OR (p.status='active' AND p.expires_at <= NOW()))" in clauses
+
+
+class PageCursor:
+    """An unbuffered cursor over (id, created_at) rows, handed out by fetchmany()."""
+
+    def __init__(self, rows, fail=False):
+        self.description = [("id",), ("created_at",)]
+        self.rows = list(rows)
+        self.fail = fail
+        self.executed = []
+        self.closed = False
+
+    def execute(self, sql, params=()):
+        self.executed.append((sql, params))
+
+    def fetchmany(self, size):
+        if self.fail:
+            raise RuntimeError("connection lost")
+        batch, self.rows = self.rows[:size], self.rows[size:]
+        return batch
+
+    def close(self):
+        self.closed = True
+
+
+def page_rows(n):
+    return [(i, datetime(2026, 3, 1, 12, 0, i)) for i in range(n, 0, -1)]
+
+
+def test_feed_stream_hands_out_a_page_and_reads_the_extra_row_for_the_cursor(app):
+    cur = PageCursor(page_rows(4))
+    stream = FeedStream(cur, feed_filters({}), limit=3, batch_size=2)
+    assert [p.id for p in stream] == [4, 3, 2]
+    assert cur.executed[0][1][-1] == 4  # limit + 1
+    assert decode_cursor(stream.next_cursor, "newest") == ("2026-03-01 12:00:02.000000", 2)
+    assert cur.rows == []  # the extra row is drained
+    assert cur.closed
+
+
+def test_feed_stream_last_page_has_no_cursor(app):
+    cur = PageCursor(page_rows(2))
+    stream = FeedStream(cur, feed_filters({}), limit=3)
+    assert [p.id for p in stream] == [2, 1]
+    assert stream.next_cursor is None
+    assert cur.closed
+
+
+def test_feed_stream_replays_a_cached_page(app):
+    first = FeedStream(PageCursor(page_rows(4)), feed_filters({}), limit=3)
+    list(first)
+
+    cur = PageCursor([])
+    again = FeedStream(cur, feed_filters({}), limit=3)
+    assert [p.id for p in again] == [4, 3, 2]
+    assert again.next_cursor == first.next_cursor
+    assert cur.executed == []
+    assert cur.closed
+
+    # The same entry cached_feed_page() serves.
+    posts, next_cursor = cached_feed_page(PageCursor([]), feed_filters({}), limit=3)
+    assert [p.id for p in posts] == [4, 3, 2]
+    assert next_cursor == first.next_cursor
+
+
+def test_feed_stream_ends_quietly_on_errors_and_caches_nothing(app):
+    cur = PageCursor(page_rows(2), fail=True)
+    assert list(FeedStream(cur, feed_filters({}), limit=3)) == []
+    assert cur.closed
+    retry = PageCursor(page_rows(2))
+    assert [p.id for p in FeedStream(retry, feed_filters({}), limit=3)] == [2, 1]
@@ -0,0 +1,39 @@
+import pytest
+
+from app.fields import POST_FIELDS, InvalidFields, columnar, requested_fields, select_list, wants_columnar
+
+FIELDS = {"id": "p.id", "title": "p.title", "created_at": "p.created_at", "owner_email": "u.email"}
+
+
+def test_all_fields_without_the_parameter():
+    assert requested_fields({}, FIELDS) == ["id", "title", "created_at", "owner_email"]
+    assert requested_fields({"fields": " "}, FIELDS) == list(FIELDS)
+
+def test_fields_keep_request_order_without_duplicates():
+    assert requested_fields({"fields": "title, id,,title"}, FIELDS) == ["title", "id"]
+
+def test_required_fields_are_appended():
+    # "score" is computed by the query, not a field, so it is skipped.
+    names = requested_fields({"fields": "title"}, FIELDS, required=("id", "created_at", "score"))
+    assert names == ["title", "id", "created_at"]
+    assert requested_fields({"fields": "id,title"}, FIELDS, required=("id",)) == ["id", "title"]
+
+def test_unknown_fields_are_rejected():
+    with pytest.raises(InvalidFields, match="Unknown field: password_hash"):
+        requested_fields({"fields": "id,password_hash"}, FIELDS)
+
+def test_select_list_uses_the_whitelisted_expressions():
+    assert select_list(["title", "owner_email"], FIELDS) == "p.title AS title, u.email AS owner_email"
+
+def test_post_fields_cover_every_posts_column():
+    assert {"expires_at", "expiry_minutes", "pickup_window_start", "image_thumb_url"} <= set(POST_FIELDS)
+
+def test_columnar():
+    rows = [{"id": 1, "title": "Soup", "extra": 0}, {"id": 2, "title": "Bread", "extra": 0}]
+    assert columnar(rows, ("id", "title")) == {"columns": ["id", "title"], "rows": [[1, "Soup"], [2, "Bread"]]}
+    assert columnar([], ["id"]) == {"columns": ["id"], "rows": []}
+
+def test_wants_columnar():
+    assert wants_columnar({"format": "columnar"})
+    assert not wants_columnar({"format": "rows"})
+    assert not wants_columnar({})
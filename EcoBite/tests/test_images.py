@@ -0,0 +1,73 @@
+import io
+
+import pytest
+
+from app.images import render_variants
+
+Image = pytest.importorskip("PIL.Image")
+
+SIZES = {"image_url": 1600, "image_thumb_url": 320}
+
+
+def encode(im, fmt, **kwargs):
+    buf = io.BytesIO()
+    im.save(buf, fmt, **kwargs)
+    buf.seek(0)
+    return buf
+
+
+def decode(data):
+    im = Image.open(io.BytesIO(data))
+    im.load()
+    return im
+
+
+def half_red(mode, size=(2000, 1000)):
+    """Left half red, right half blue, so orientation can be checked after resizing."""
+    im = Image.new("RGB", size, (0, 0, 255))
+    im.paste((255, 0, 0), (0, 0, size[0] // 2, size[1]))
+    return im.convert(mode)
+
+
+@pytest.mark.parametrize("fmt,mode", [("JPEG", "RGB"), ("PNG", "RGB"), ("PNG", "P"), ("WEBP", "RGB")])
+def test_variants_fit_their_box(fmt, mode):
+    out = render_variants(encode(half_red(mode), fmt), SIZES)
+    full, thumb = decode(out["image_url"]), decode(out["image_thumb_url"])
+    assert full.format == thumb.format == "WEBP"
+    assert full.size == (1600, 800)
+    assert thumb.size == (320, 160)
+    assert thumb.getpixel((40, 80))[:3][0] > 200
+
+
+def test_small_images_are_not_upscaled():
+    out = render_variants(encode(half_red("RGB", (200, 100)), "PNG"), SIZES)
+    assert decode(out["image_url"]).size == (200, 100)
+    assert decode(out["image_thumb_url"]).size == (200, 100)
+
+
+def test_exif_orientation_is_applied_and_metadata_dropped():
+    exif = Image.Exif()
+    exif[0x0112] = 6  # rotate 90 degrees clockwise on display
+    exif[0x010F] = "TestCam"
+    out = render_variants(encode(half_red("RGB"), "JPEG", exif=exif.tobytes()), SIZES, fmt="JPEG")
+    full = decode(out["image_url"])
+    assert full.size == (800, 1600)
+    # The red left half ends up on top once rotated.
+    r, g, b = full.getpixel((400, 100))
+    assert r > 200 and b < 80
+    assert not full.getexif()
+
+
+def test_cmyk_jpeg_is_converted_to_rgb():
+    out = render_variants(encode(half_red("CMYK"), "JPEG"), SIZES, fmt="JPEG")
+    for data in out.values():
+        im = decode(data)
+        assert im.mode == "RGB"
+    r, g, b = decode(out["image_thumb_url"]).getpixel((40, 80))
+    assert r > 200 and b < 80
+
+
+def test_alpha_is_kept_for_webp_and_flattened_for_jpeg():
+    im = Image.new("RGBA", (400, 400), (0, 255, 0, 0))
+    assert decode(render_variants(encode(im, "PNG"), SIZES)["image_url"]).mode == "RGBA"
+    assert decode(render_variants(encode(im, "PNG"), SIZES, fmt="JPEG")["image_url"]).mode == "RGB"
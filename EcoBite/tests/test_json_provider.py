@@ -0,0 +1,46 @@
+import json
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+
+import pytest
+from flask import Flask
+
+from app import json_provider
+from app.json_provider import FastJSONProvider
+from app.utils import compact_rows
+
+
+@pytest.fixture(params=["orjson", "stdlib"])
+def provider(request, monkeypatch):
+    if request.param == "stdlib":
+        monkeypatch.setattr(json_provider, "orjson", None)
+    elif json_provider.orjson is None:
+        pytest.skip("orjson is not installed")
+    return FastJSONProvider(Flask(__name__))
+
+
+def test_naive_datetimes_carry_the_server_offset(provider, local_tz):
+    out = json.loads(provider.dumps({"at": datetime(2026, 1, 2, 3, 4, 5)}))
+    assert out["at"] == "2026-01-02T03:04:05+06:00"
+
+
+def test_aware_datetimes_keep_their_offset(provider):
+    at = datetime(2026, 1, 2, 3, 4, 5, tzinfo=timezone(timedelta(hours=6)))
+    assert json.loads(provider.dumps([at])) == ["2026-01-02T03:04:05+06:00"]
+
+
+def test_dates_decimals_and_bytes(provider):
+    out = json.loads(provider.dumps({"d": date(2026, 1, 2), "n": Decimal("1.50"), "b": b"\x00\xff"}))
+    assert out == {"d": "2026-01-02", "n": 1.5, "b": "AP8="}
+
+
+def test_compact_rows_encode_like_dicts(provider, local_tz):
+    rows = compact_rows([(1, datetime(2026, 1, 1))], [("id",), ("created_at",)])
+    assert json.loads(provider.dumps(rows)) == [{"id": 1, "created_at": "2026-01-01T00:00:00+06:00"}]
+
+
+def test_isoformat_filter_matches_the_api(app, local_tz):
+    at = datetime(2026, 5, 6, 7, 8, 9)
+    html = app.jinja_env.from_string('<time datetime="{{ at|isoformat }}">').render(at=at)
+    assert html == f'<time datetime="{json.loads(app.json.dumps(at))}">'
+    assert html == '<time datetime="2026-05-06T07:08:09+06:00">'
@@ -0,0 +1,58 @@
+import os
+
+from migrate_db import MIGRATIONS_DIR, discover, split_statements
+
+
+def test_splits_on_semicolons_and_drops_comments():
+    sql = """
+    -- first; not a statement
+    CREATE TABLE a (id INT); # trailing; comment
+    /* block; comment */ INSERT INTO a VALUES (1);
+    """
+    assert split_statements(sql) == ["CREATE TABLE a (id INT)", "INSERT INTO a VALUES (1)"]
+
+def test_keeps_semicolons_inside_literals():
+    sql = "INSERT INTO t VALUES ('a;b', \"c;d\", 'it''s; ok', 'x\\';y'); SELECT `we;ird` FROM t;"
+    assert split_statements(sql) == [
+        "INSERT INTO t VALUES ('a;b', \"c;d\", 'it''s; ok', 'x\\';y')",
+        "SELECT `we;ird` FROM t",
+    ]
+
+def test_delimiter_directive_for_procedure_bodies():
+    sql = """
+DELIMITER //
+CREATE PROCEDURE p()
+BEGIN
+  SELECT 1;
+  SELECT 2;
+END//
+DELIMITER ;
+SELECT 3;
+"""
+    assert split_statements(sql) == [
+        "CREATE PROCEDURE p()\nBEGIN\n  SELECT 1;\n  SELECT 2;\nEND",
+        "SELECT 3",
+    ]
+
+def test_double_dash_needs_whitespace_to_be_a_comment():
+    assert split_statements("SELECT 1--1;") == ["SELECT 1--1"]
+
+def test_version_comments_are_kept():
+    assert split_statements("CREATE TABLE t (id INT) /*!50100 ENGINE=InnoDB */;") == [
+        "CREATE TABLE t (id INT) /*!50100 ENGINE=InnoDB */"
+    ]
+
+def test_last_statement_needs_no_terminator():
+    assert split_statements("SELECT 1;\nSELECT 2") == ["SELECT 1", "SELECT 2"]
+
+def test_shipped_migrations_split_cleanly():
+    for _, _, path in discover():
+        if path.endswith(".sql"):
+            with open(path, encoding="utf-8") as f:
+                statements = split_statements(f.read())
+            assert statements, os.path.basename(path)
+            assert all(not s.startswith("--") for s in statements)
+
+def test_discover_orders_by_version():
+    versions = [v for v, _, _ in discover(MIGRATIONS_DIR)]
+    assert versions == sorted(versions)
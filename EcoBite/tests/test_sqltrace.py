@@ -0,0 +1,92 @@
+import pytest
+from flask import g
+
+from app.sqltrace import SQLTracer, normalize
+
+
+@pytest.mark.parametrize("sql,shape", [
+    ("SELECT * FROM posts WHERE id = 42", "SELECT * FROM posts WHERE id = ?"),
+    ("SELECT * FROM posts WHERE title = 'it''s' AND note = 'a\\'b'", "SELECT * FROM posts WHERE title = ? AND note = ?"),
+    ("SELECT * FROM claims WHERE post_id IN (?, ?, ?)", "SELECT * FROM claims WHERE post_id IN (...)"),
+    ("SELECT * FROM claims WHERE post_id IN (?)", "SELECT * FROM claims WHERE post_id IN (...)"),
+    ("INSERT INTO t (a, b) VALUES (?,?)", "INSERT INTO t (a, b) VALUES (...)"),
+    ("SELECT  t1.x\n  FROM t1\tWHERE w > 1.5", "SELECT t1.x FROM t1 WHERE w > ?"),
+])
+def test_normalize(sql, shape):
+    assert normalize(sql) == shape
+
+
+def test_statements_differing_only_in_parameters_share_a_shape():
+    assert normalize("SELECT * FROM t WHERE id IN (?, ?)") == normalize("SELECT * FROM t WHERE id IN (?,?,?,?)")
+    assert normalize("SELECT 1 FROM t LIMIT 20") == normalize("SELECT 2 FROM t LIMIT 500")
+
+
+class FakeCursor:
+    def __init__(self, rows=(), rowcount=-1, fail=False):
+        self.rows = list(rows)
+        self.rowcount = rowcount
+        self.fail = fail
+        self.description = [("id",)]
+
+    def execute(self, sql, params=()):
+        if self.fail:
+            raise RuntimeError("boom")
+
+    def fetchone(self):
+        return self.rows.pop(0) if self.rows else None
+
+    def fetchall(self):
+        rows, self.rows = self.rows, []
+        return rows
+
+
+def test_unbuffered_rows_are_counted_as_fetched(app):
+    tracer = SQLTracer()
+    with app.test_request_context():
+        cur = tracer.wrap(FakeCursor(rows=[(1,), (2,), (3,)]))
+        cur.execute("SELECT id FROM posts WHERE status = 'active'")
+        assert [r for r in cur] == [(1,), (2,), (3,)]
+        assert cur.description == [("id",)]
+        [statement] = g.sql_trace
+        assert statement.sql == "SELECT id FROM posts WHERE status = ?"
+        assert statement.rows == 3
+
+
+def test_affected_rows_and_failures_are_recorded(app):
+    tracer = SQLTracer()
+    with app.test_request_context():
+        tracer.wrap(FakeCursor(rowcount=2)).execute("UPDATE posts SET status='expired' WHERE id IN (?, ?)")
+        with pytest.raises(RuntimeError):
+            tracer.wrap(FakeCursor(fail=True)).execute("SELECT 1")
+        updated, failed = g.sql_trace
+        assert (updated.rows, updated.failed) == (2, False)
+        assert failed.failed
+
+
+def test_server_timing_and_repeated_shapes(app, capsys):
+    tracer = SQLTracer(repeat_threshold=3)
+    with app.test_request_context("/api/food-posts"):
+        for i in range(3):
+            tracer.wrap(FakeCursor(rows=[(i,)])).execute(f"SELECT * FROM claims WHERE post_id = {i}")
+        response = tracer.finish(app.response_class())
+    timing = response.headers["Server-Timing"]
+    assert timing.startswith("db;dur=")
+    assert '"3 queries, 0 rows"' in timing
+    assert 'db-repeated;desc="1 N+1 query shapes"' in timing
+    assert "3x SELECT * FROM claims WHERE post_id = ?" in capsys.readouterr().out
+
+
+def test_slow_statements_go_to_the_log(app, tmp_path):
+    log = tmp_path / "slow.log"
+    tracer = SQLTracer(slow_ms=0, slow_log=str(log))
+    with app.test_request_context("/api/stats/global"):
+        tracer.wrap(FakeCursor(rowcount=1)).execute("UPDATE impact_counters SET total_posts=total_posts+1 WHERE id=1")
+    line = log.read_text()
+    assert "rows=1 GET /api/stats/global UPDATE impact_counters SET total_posts=total_posts+? WHERE id=?" in line
+
+
+def test_requests_without_statements_get_no_header(app):
+    tracer = SQLTracer()
+    with app.test_request_context():
+        response = tracer.finish(app.response_class())
+    assert "Server-Timing" not in response.headers
@@ -0,0 +1,70 @@
+from app import stats
+
+
+class FakeCursor:
+    def __init__(self, rowcount=1):
+        self.statements = []
+        self.rowcount = rowcount
+
+    def execute(self, sql, params=()):
+        self.statements.append((" ".join(sql.split()), params))
+
+    def close(self):
+        pass
+
+
+class FakeConn:
+    def __init__(self, cur):
+        self.cur = cur
+
+    def cursor(self):
+        return self.cur
+
+    def commit(self):
+        pass
+
+
+def touches(cur):
+    return [params for sql, params in cur.statements if sql.startswith("UPDATE data_versions")]
+
+
+def test_transition_moves_buckets_and_bumps_the_stats_version():
+    cur = FakeCursor()
+    stats.record_transition(cur, "active", "claimed", weight=2.5)
+    sql, params = cur.statements[0]
+    assert sql == ("UPDATE impact_counters SET available_posts=available_posts-1, shared_posts=shared_posts+1, "
+                   "shared_weight_kg=shared_weight_kg+? WHERE id=1")
+    assert params == (2.5,)
+    assert touches(cur) == [("stats",)]
+
+
+def test_transition_within_a_bucket_writes_nothing():
+    cur = FakeCursor()
+    stats.record_transition(cur, "claimed", "completed")
+    assert cur.statements == []
+
+
+def test_new_post_counts_as_available():
+    cur = FakeCursor()
+    stats.record_post_created(cur)
+    assert cur.statements[0][0] == ("UPDATE impact_counters SET total_posts=total_posts+1, "
+                                     "available_posts=available_posts+1 WHERE id=1")
+    assert touches(cur) == [("stats",)]
+
+
+def test_reconcile_bumps_the_version_only_on_drift():
+    cur = FakeCursor(rowcount=0)
+    stats.reconcile(FakeConn(cur))
+    assert touches(cur) == []
+
+    cur = FakeCursor(rowcount=1)
+    stats.reconcile(FakeConn(cur))
+    assert touches(cur) == [("stats",)]
+
+
+def test_status_update_rejects_unknown_statuses(client):
+    with client.session_transaction() as session:
+        session["user_id"] = 1
+    response = client.patch("/api/food-posts/1/status", json={"status": "archived"})
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "Invalid status"}
@@ -0,0 +1,85 @@
+import io
+import os
+import time
+
+import pytest
+
+from app.storage import KEY, LocalStorage, Storage, collect
+
+
+def test_storage_is_abstract():
+    with pytest.raises(TypeError):
+        Storage()
+
+    class Partial(Storage):
+        def save(self, stream, ext):
+            return ""
+
+    with pytest.raises(TypeError):
+        Partial()
+
+
+def test_identical_content_is_stored_once(tmp_path):
+    storage = LocalStorage(str(tmp_path / "uploads"), "/static/uploads", str(tmp_path / "tmp"))
+    a = storage.save(io.BytesIO(b"photo"), ".JPG")
+    b = storage.save(io.BytesIO(b"photo"), ".jpg")
+    assert a == b
+    assert KEY.match(a)
+    assert list(storage.keys()) == [a]
+    with storage.open(a) as f:
+        assert f.read() == b"photo"
+
+
+def test_urls_round_trip_to_keys(tmp_path):
+    storage = LocalStorage(str(tmp_path / "uploads"), "/static/uploads/", str(tmp_path / "tmp"))
+    key = storage.save(io.BytesIO(b"x"), ".png")
+    assert storage.url(key) == f"/static/uploads/{key}"
+    assert storage.key_for_url(storage.url(key)) == key
+    assert storage.key_for_url("/static/uploads/12_1765302642.png") is None
+    assert storage.key_for_url("https://example.com/a.png") is None
+
+
+class FakeConn:
+    def __init__(self, urls):
+        self.urls = urls
+
+    def cursor(self):
+        conn = self
+
+        class Cursor:
+            def execute(self, sql, params=()):
+                pass
+
+            def fetchall(self):
+                return [(url, None) for url in conn.urls]
+
+        return Cursor()
+
+    def rollback(self):
+        pass
+
+
+def test_collect_deletes_unreferenced_objects_past_the_grace_period(tmp_path):
+    storage = LocalStorage(str(tmp_path / "uploads"), "/static/uploads", str(tmp_path / "tmp"))
+    kept, old, fresh = (storage.save(io.BytesIO(data), ".jpg") for data in (b"kept", b"old", b"fresh"))
+    past = time.time() - 3600
+    for key in (kept, old):
+        os.utime(storage._path(key), (past, past))
+
+    assert collect(FakeConn([storage.url(kept)]), storage, grace=600) == 1
+    assert sorted(storage.keys()) == sorted([kept, fresh])
+
+
+def test_stale_temporary_files_are_expired(tmp_path):
+    storage = LocalStorage(str(tmp_path / "uploads"), "/static/uploads", str(tmp_path / "tmp"))
+    assert storage.expire_temp(time.time()) == 0  # nothing uploaded yet
+
+    directory = tmp_path / "tmp"
+    directory.mkdir()
+    (directory / "old.upload").write_bytes(b"x")
+    (directory / "new.upload").write_bytes(b"x")
+    past = time.time() - 3600
+    os.utime(directory / "old.upload", (past, past))
+
+    assert storage.expire_temp(time.time() - 600) == 1
+    assert os.listdir(directory) == ["new.upload"]
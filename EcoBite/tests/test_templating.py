@@ -0,0 +1,24 @@
+from datetime import datetime
+
+from app.templating import post_card
+
+
+def post(**overrides):
+    row = {"id": 1, "title": "Soup", "description": "", "category": "Meals", "quantity": "2",
+           "location": "Hall", "status": "active", "image_url": None, "image_thumb_url": None,
+           "expires_at": datetime(2026, 5, 6, 7, 8), "created_at": datetime(2026, 5, 6), "owner_email": "a@x"}
+    row.update(overrides)
+    return row
+
+
+def test_card_expiry_is_a_time_element_for_app_js(app, local_tz):
+    with app.test_request_context():
+        html = str(post_card(post()))
+    assert '<time datetime="2026-05-06T07:08:00+06:00">06 May 2026, 07:08 +06</time>' in html
+
+
+def test_card_without_expiry(app):
+    with app.test_request_context():
+        html = str(post_card(post(id=2, expires_at=None)))
+    assert "Expires: -" in html
+    assert "<time" not in html
@@ -0,0 +1,95 @@
+import hashlib
+import io
+import os
+
+import pytest
+from flask import request
+
+from app.uploads import InvalidUpload, UploadSpool, UploadTooLarge, sniff
+
+JPEG = b"\xff\xd8\xff\xe0" + b"\x00" * 60
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 60
+WEBP = b"RIFF\x00\x00\x00\x00WEBPVP8 " + b"\x00" * 60
+
+
+@pytest.mark.parametrize("head,ext", [(JPEG, ".jpg"), (PNG, ".png"), (WEBP, ".webp"),
+                                      (b"GIF89a" + b"\x00" * 20, None), (b"<svg", None), (b"", None)])
+def test_sniff(head, ext):
+    assert sniff(head) == ext
+
+
+def test_spool_hashes_and_keeps_the_content(tmp_path):
+    spool = UploadSpool(str(tmp_path), max_size=1024)
+    spool.write(PNG[:5])
+    spool.write(PNG[5:])
+    spool.seek(0)
+    assert spool.ext == ".png"
+    assert spool.read() == PNG
+    assert spool.sha256 == hashlib.sha256(PNG).hexdigest()
+    spool.close()
+    assert os.listdir(tmp_path) == []
+
+
+def test_spool_rejects_other_formats_on_the_first_chunk(tmp_path):
+    spool = UploadSpool(str(tmp_path), max_size=1024)
+    with pytest.raises(InvalidUpload):
+        spool.write(b"%PDF-1.7" + b"\x00" * 20)
+    # Removed at once, not when the parser gets round to closing it.
+    assert spool.closed
+    assert os.listdir(tmp_path) == []
+    spool.close()
+
+
+def test_spool_rejects_oversized_files(tmp_path):
+    spool = UploadSpool(str(tmp_path), max_size=100)
+    spool.write(JPEG)
+    with pytest.raises(UploadTooLarge):
+        spool.write(JPEG)
+    assert os.listdir(tmp_path) == []
+    spool.close()
+
+
+def test_spool_checks_files_too_short_to_sniff_when_rewound(tmp_path):
+    spool = UploadSpool(str(tmp_path), max_size=100)
+    spool.write(b"\xff\xd8")
+    with pytest.raises(InvalidUpload):
+        spool.seek(0)
+    assert os.listdir(tmp_path) == []
+    spool.close()
+
+
+def test_empty_spool_is_no_file(tmp_path):
+    spool = UploadSpool(str(tmp_path), max_size=100)
+    assert spool.seek(0) == 0
+    assert spool.ext is None
+    spool.close()
+
+
+def multipart(app, **files):
+    data = {"title": "Soup"}
+    data.update(files)
+    return app.test_request_context("/api/food-posts", method="POST", data=data,
+                                    content_type="multipart/form-data")
+
+
+def test_blank_file_input_parses_as_no_file(app):
+    # What a browser sends for <input type="file"> left empty.
+    with multipart(app, photo=(io.BytesIO(b""), "")):
+        photo = request.files.get("photo")
+        assert request.form["title"] == "Soup"
+        assert not (photo and photo.filename and photo.stream.ext)
+
+
+def test_uploads_are_spooled_outside_the_static_tree(app):
+    with multipart(app, photo=(io.BytesIO(PNG), "a.png")):
+        photo = request.files["photo"]
+        assert photo.stream.ext == ".png"
+        assert os.path.dirname(photo.stream.path) == app.config["UPLOAD_TMP_FOLDER"]
+        assert not photo.stream.path.startswith(app.static_folder)
+
+
+def test_invalid_upload_is_rejected_while_parsing(app):
+    with multipart(app, photo=(io.BytesIO(b"not an image at all"), "a.png")):
+        with pytest.raises(InvalidUpload):
+            request.files
+        assert os.listdir(app.config["UPLOAD_TMP_FOLDER"]) == []
@@ -0,0 +1,138 @@
+import json
+
+from app.utils import batch_load, parse_tags, split_tags, stream_rows
+
+
+def test_split_tags_accepts_lists_json_and_commas():
+    assert split_tags(["vegan", " Halal "]) == ["Halal", "Vegan"]
+    assert split_tags('["VEGAN", "kosher"]') == ["Kosher", "Vegan"]
+    assert split_tags("vegan,gluten-free") == ["Gluten-Free", "Vegan"]
+
+def test_split_tags_keeps_unknown_tags():
+    assert split_tags("Foo, vegan, ,foo") == ["Foo", "Vegan", "foo"]
+
+def test_split_tags_ignores_non_lists():
+    assert split_tags("5") == []
+    assert split_tags(None) == []
+    assert split_tags("") == []
+
+def test_parse_tags_keeps_only_known_tags():
+    assert parse_tags(["Foo", "vegan", "Vegan"]) == ["Vegan"]
+    assert parse_tags("Foo") == []
+
+
+class TableCursor:
+    """Answers "... WHERE <key> IN (?, ...)" from a list of rows, recording each query's ids."""
+
+    def __init__(self, columns, rows, key):
+        self.description = [(c,) for c in columns]
+        self.rows = rows
+        self.index = columns.index(key)
+        self.calls = []
+
+    def execute(self, sql, params):
+        assert sql.count("?") == len(params)
+        self.calls.append(params)
+        self._result = [r for r in self.rows if r[self.index] in params]
+
+    def fetchall(self):
+        return self._result
+
+
+CLAIMS = [(1, 10, "pending"), (2, 10, "approved"), (3, 11, "pending"), (4, 13, "rejected")]
+
+
+def test_batch_load_groups_many_rows_per_id():
+    cur = TableCursor(["id", "post_id", "status"], CLAIMS, "post_id")
+    result = batch_load(cur, "SELECT * FROM claims WHERE post_id IN ({ids})", [10, 11, 12], "post_id", many=True)
+    assert [c["id"] for c in result[10]] == [1, 2]
+    assert [c["id"] for c in result[11]] == [3]
+    assert 12 not in result
+    assert len(cur.calls) == 1
+
+
+def test_batch_load_keeps_one_row_per_id():
+    cur = TableCursor(["id", "post_id", "status"], CLAIMS, "id")
+    result = batch_load(cur, "SELECT * FROM claims WHERE id IN ({ids})", [4, 1], "id")
+    assert result == {1: {"id": 1, "post_id": 10, "status": "pending"},
+                      4: {"id": 4, "post_id": 13, "status": "rejected"}}
+
+
+def test_batch_load_chunks_and_deduplicates_ids():
+    cur = TableCursor(["id", "post_id", "status"], CLAIMS, "post_id")
+    result = batch_load(cur, "SELECT * FROM claims WHERE post_id IN ({ids})", [10, 11, 10, 13, 11], "post_id",
+                        many=True, chunk_size=2)
+    assert cur.calls == [(10, 11), (13,)]
+    assert sorted(result) == [10, 11, 13]
+    assert len(result[10]) == 2
+
+
+def test_batch_load_without_ids_runs_no_query():
+    cur = TableCursor(["id"], [], "id")
+    assert batch_load(cur, "SELECT * FROM claims WHERE id IN ({ids})", [], "id") == {}
+    assert cur.calls == []
+
+
+class StreamCursor:
+    """An executed query for stream_rows(): fetchmany() batches, optionally failing after `fail_after` batches."""
+
+    def __init__(self, columns, rows, fail_after=None):
+        self.description = [(c,) for c in columns]
+        self.rows = list(rows)
+        self.fail_after = fail_after
+        self.batches = 0
+        self.closed = False
+
+    def fetchmany(self, size):
+        if self.fail_after is not None and self.batches == self.fail_after:
+            raise RuntimeError("connection lost")
+        self.batches += 1
+        batch, self.rows = self.rows[:size], self.rows[size:]
+        return batch
+
+    def close(self):
+        self.closed = True
+
+
+def streamed(app, cur, **kw):
+    with app.test_request_context():
+        return list(stream_rows(cur, **kw).response)
+
+
+ROWS = [(1, "bread"), (2, "soup"), (3, "rice")]
+
+
+def test_stream_rows_sends_a_json_array_in_batches(app):
+    cur = StreamCursor(("id", "name"), ROWS)
+    chunks = streamed(app, cur, batch_size=2)
+    assert chunks[0] == "["
+    assert len(chunks) == 4  # "[", two batches, "]"
+    assert json.loads("".join(chunks)) == [{"id": 1, "name": "bread"}, {"id": 2, "name": "soup"}, {"id": 3, "name": "rice"}]
+    assert cur.closed
+
+def test_stream_rows_applies_the_transform(app):
+    def upper(row):
+        row["name"] = row["name"].upper()
+        return row
+    body = "".join(streamed(app, StreamCursor(("id", "name"), ROWS), transform=upper, batch_size=10))
+    assert [r["name"] for r in json.loads(body)] == ["BREAD", "SOUP", "RICE"]
+
+def test_stream_rows_columnar(app):
+    chunks = streamed(app, StreamCursor(("id", "name"), ROWS), batch_size=2, columnar=True)
+    assert json.loads("".join(chunks)) == {"columns": ["id", "name"], "rows": [[1, "bread"], [2, "soup"], [3, "rice"]]}
+
+def test_stream_rows_empty_result(app):
+    assert json.loads("".join(streamed(app, StreamCursor(("id",), [])))) == []
+    assert json.loads("".join(streamed(app, StreamCursor(("id",), []), columnar=True))) == {"columns": ["id"], "rows": []}
+
+def test_stream_rows_error_leaves_the_array_open(app):
+    cur = StreamCursor(("id", "name"), ROWS, fail_after=1)
+    body = "".join(streamed(app, cur, batch_size=2))
+    # The client sees invalid JSON rather than a short but well-formed list.
+    assert body == '[{"id":1,"name":"bread"},{"id":2,"name":"soup"}'
+    assert cur.closed
+
+def test_stream_rows_columnar_error_leaves_the_object_open(app):
+    body = "".join(streamed(app, StreamCursor(("id",), [(1,), (2,)], fail_after=1), batch_size=1, columnar=True))
+    assert body.endswith("[1]")
+    assert not body.endswith("]}")